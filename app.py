@@ -1,25 +1,784 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from collections import defaultdict, deque
+from sqlalchemy import event, null, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from datetime import datetime, timezone
+import collections
+import contextlib
 import json
+import os
+import sqlite3
+import threading
+
+from clustering import CLUSTER_MODES, DEFAULT_PREFIX_DEPTH, Clustering, deepest_path
+from graph_layout import layered_layout
+from instrumentation import Instrumentation, serialization_timer
+from layering import levels_by_id
+from lineage_graph import LAYERS, LineageGraph
+from response_cache import (
+    DEFAULT_MAX_BYTES as DEFAULT_RESPONSE_CACHE_BYTES, DEFAULT_MAX_ENTRIES as DEFAULT_RESPONSE_CACHE_ENTRIES,
+    ResponseCache,
+)
+from schema_drift import SchemaDrift, column_diff
+from schema_store import SchemaEntry, SchemaStore
+from reachability import load_or_build
+from search_index import SEARCH_KINDS, SearchIndex
+from subgraph_cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, SubgraphCache
+from wire_format import COMPACT_MIMETYPE, encode_compact
 
 app = Flask(__name__)
 CORS(app)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///lineage.db'
+DATABASE_URI = os.environ.get('LINEAGE_DATABASE_URI', 'sqlite:///lineage.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if DATABASE_URI.startswith('sqlite:///') and ':memory:' not in DATABASE_URI:
+    # SQLAlchemy opens a new SQLite connection per checkout by default; pool them instead so
+    # each request thread reuses a warm page cache. The timeout is SQLite's busy timeout:
+    # readers wait out a writer's lock rather than failing with "database is locked"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'poolclass': QueuePool,
+        'pool_size': int(os.environ.get('LINEAGE_POOL_SIZE', 5)),
+        'max_overflow': 10,
+        'connect_args': {
+            'check_same_thread': False,
+            'timeout': float(os.environ.get('LINEAGE_BUSY_TIMEOUT', 5)),
+        },
+    }
+# Set by serve.py once the database is prepared, so workers can only read
+app.config['LINEAGE_READ_ONLY'] = os.environ.get('LINEAGE_READ_ONLY') == '1'
 db = SQLAlchemy(app)
+metrics = Instrumentation(app)
+
+@event.listens_for(Engine, 'connect')
+def _configure_connection(dbapi_connection, connection_record):
+    if app.config['LINEAGE_READ_ONLY'] and isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA query_only = ON')
 
 class Dataset(db.Model):
+    __table_args__ = (
+        # Serves lookups by path alone as well as by (path, type)
+        db.Index('ix_dataset_path_type', 'path', 'type'),
+        db.Index('ix_dataset_name_type', 'dataset_name', 'type'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     dataset_name = db.Column(db.String(200), nullable=False)
     type = db.Column(db.String(50), nullable=False)  # 'upstream' or 'downstream'
     path = db.Column(db.String(500), nullable=False)
 
 class SchemaInfo(db.Model):
+    __table_args__ = (
+        db.Index('uq_schema_info_dataset_path', 'dataset_path', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     dataset_path = db.Column(db.String(500), nullable=False)
     schema_definition = db.Column(db.Text, nullable=False)  # JSON string of schema information
+    # schema_store.schema_fingerprint of the definition; NULL until a writer that parses it fills it in
+    fingerprint = db.Column(db.String(32))
+
+class Node(db.Model):
+    # Each path and dataset name interned once; lineage is stored as integer edges between them
+    __table_args__ = (
+        db.Index('uq_node_kind_name', 'kind', 'name', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # 'path' or 'dataset'
+    name = db.Column(db.String(500), nullable=False)
+
+class Edge(db.Model):
+    # Points the way data flows: path -> dataset reading it, dataset -> path it writes
+    __table_args__ = (
+        db.Index('ix_edge_dst_src', 'dst_id', 'src_id'),
+        {'sqlite_with_rowid': False},
+    )
+
+    src_id = db.Column(db.Integer, db.ForeignKey('node.id'), primary_key=True)
+    dst_id = db.Column(db.Integer, db.ForeignKey('node.id'), primary_key=True)
+
+class DataVersion(db.Model):
+    # Single row whose counter is bumped by triggers on every write to the lineage tables (or once
+    # per transaction by bulk_write), so writers in other processes invalidate our indexes too.
+    # Only refresh_lineage_edges and apply_lineage_edge_changes keep node/edge in step with the
+    # dataset rows; a dataset write that bypasses them (the sqlite3 shell, say) also raises
+    # edges_stale, and the graph is then rebuilt from the dataset rows until the next refresh
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    edges_stale = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+
+class ChangeSet(db.Model):
+    # Row-level delta of one incremental sync (ingest.py --sync) taking the data from
+    # from_version to to_version, so running apps can patch their indexes instead of rebuilding
+    id = db.Column(db.Integer, primary_key=True)
+    from_version = db.Column(db.Integer, nullable=False)
+    to_version = db.Column(db.Integer, nullable=False, index=True)
+    changes = db.Column(db.Text)  # JSON; NULL when the delta was too large to be worth replaying
+
+class DatasetHistory(db.Model):
+    # Every distinct (dataset_name, type, path) the dataset table has held, valid for the data
+    # versions valid_from <= v < valid_to; valid_to stays NULL while the row is current
+    __table_args__ = (
+        db.Index('ix_dataset_history_current', 'dataset_name', 'type', 'path',
+                 sqlite_where=text('valid_to IS NULL')),
+        db.Index('ix_dataset_history_valid_from', 'valid_from'),
+        db.Index('ix_dataset_history_valid_to', 'valid_to'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    dataset_name = db.Column(db.String(200), nullable=False)
+    type = db.Column(db.String(50), nullable=False)
+    path = db.Column(db.String(500), nullable=False)
+    valid_from = db.Column(db.Integer, nullable=False)
+    valid_to = db.Column(db.Integer)
+
+class SchemaHistory(db.Model):
+    # Every definition a schema_info path has had, valid like DatasetHistory rows
+    __table_args__ = (
+        db.Index('ix_schema_history_path', 'dataset_path', 'valid_from'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    dataset_path = db.Column(db.String(500), nullable=False)
+    schema_definition = db.Column(db.Text, nullable=False)
+    valid_from = db.Column(db.Integer, nullable=False)
+    valid_to = db.Column(db.Integer)
+
+class Snapshot(db.Model):
+    # Manifest of the data versions the history tables were brought up to, one row per writer commit
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    created_at = db.Column(db.String(19), nullable=False, index=True)  # UTC, 'YYYY-MM-DD HH:MM:SS'
+    datasets = db.Column(db.Integer, nullable=False)  # current dataset history rows
+    schemas = db.Column(db.Integer, nullable=False)   # current schema history rows
+    added = db.Column(db.Integer, nullable=False)     # history rows opened by this snapshot
+    removed = db.Column(db.Integer, nullable=False)   # history rows closed by it
+
+VERSIONED_TABLES = ('dataset', 'schema_info')
+VERSION_TRIGGERS = {
+    f'{table}_{op.lower()}_version': (
+        f'CREATE TRIGGER {table}_{op.lower()}_version AFTER {op} ON {table} '
+        f'BEGIN UPDATE data_version SET version = version + 1'
+        f'{", edges_stale = 1" if table == "dataset" else ""} WHERE id = 1; END'
+    )
+    for table in VERSIONED_TABLES for op in ('INSERT', 'UPDATE', 'DELETE')
+}
+
+def install_data_version(connection):
+    DataVersion.__table__.create(connection, checkfirst=True)
+    ChangeSet.__table__.create(connection, checkfirst=True)
+    columns = {row[1] for row in connection.execute(text('PRAGMA table_info(data_version)'))}
+    if 'edges_stale' not in columns:
+        # Older triggers never raised it, so the tables are not known to be current yet
+        connection.execute(text('ALTER TABLE data_version ADD COLUMN edges_stale BOOLEAN NOT NULL DEFAULT 1'))
+    connection.execute(text('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)'))
+    if connection.info.get('bulk_write'):
+        return  # bulk_write puts the triggers back once it is done
+    installed = dict(connection.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")).all())
+    for name, sql in VERSION_TRIGGERS.items():
+        if installed.get(name) == sql:
+            continue
+        # Replaces the triggers of older versions in place
+        connection.execute(text(f'DROP TRIGGER IF EXISTS {name}'))
+        connection.execute(text(sql))
+
+@contextlib.contextmanager
+def bulk_write(connection):
+    """Write the versioned tables in bulk, inside the caller's open transaction.
+
+    The per-row version triggers are dropped for the duration, so rows cost no
+    extra UPDATE each; afterwards the version is bumped once if anything was
+    written and the triggers are put back. DDL is transactional in SQLite, so
+    other connections never see them missing.
+    """
+    install_data_version(connection)
+    for name in VERSION_TRIGGERS:
+        connection.execute(text(f'DROP TRIGGER IF EXISTS {name}'))
+    state = text('SELECT total_changes(), version FROM data_version WHERE id = 1')
+    changes, version = connection.execute(state).one()
+    connection.info['bulk_write'] = True
+    try:
+        yield
+    finally:
+        del connection.info['bulk_write']
+    changes_after, version_after = connection.execute(state).one()
+    # refresh_lineage_edges and apply_lineage_edge_changes bump it themselves
+    if changes_after != changes and version_after == version:
+        connection.execute(text('UPDATE data_version SET version = version + 1 WHERE id = 1'))
+    install_data_version(connection)
+
+def install_schema_fingerprints(connection):
+    """Add ``schema_info.fingerprint`` to databases created before it, and the trigger that
+    clears a fingerprint whenever its definition is rewritten by a writer that did not parse it."""
+    columns = {row[1] for row in connection.execute(text('PRAGMA table_info(schema_info)'))}
+    if 'fingerprint' not in columns:
+        connection.execute(text('ALTER TABLE schema_info ADD COLUMN fingerprint VARCHAR(32)'))
+    connection.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS schema_info_fingerprint_stale '
+        'AFTER UPDATE OF schema_definition ON schema_info '
+        'WHEN NEW.schema_definition IS NOT OLD.schema_definition '
+        'BEGIN UPDATE schema_info SET fingerprint = NULL WHERE id = NEW.id; END'
+    ))
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_data_version(target, connection, **kw):
+    install_data_version(connection)
+    install_schema_fingerprints(connection)
+
+def refresh_lineage_edges(connection):
+    """Rebuild the node and edge tables from the dataset rows.
+
+    Anything that writes the dataset table should call this in the same
+    transaction so readers never see the two layouts disagree.
+    """
+    # Databases created before the normalized layout get it on first write
+    Node.__table__.create(connection, checkfirst=True)
+    Edge.__table__.create(connection, checkfirst=True)
+    install_data_version(connection)
+
+    connection.execute(text("""
+        INSERT OR IGNORE INTO node (kind, name)
+        SELECT 'dataset', dataset_name FROM dataset GROUP BY dataset_name ORDER BY MIN(id)
+    """))
+    connection.execute(text("""
+        INSERT OR IGNORE INTO node (kind, name)
+        SELECT 'path', path FROM dataset GROUP BY path ORDER BY MIN(id)
+    """))
+    connection.execute(text('DELETE FROM edge'))
+    connection.execute(text("""
+        INSERT OR IGNORE INTO edge (src_id, dst_id)
+        SELECT CASE WHEN d.type = 'upstream' THEN p.id ELSE n.id END,
+               CASE WHEN d.type = 'upstream' THEN n.id ELSE p.id END
+        FROM dataset d
+        JOIN node n ON n.kind = 'dataset' AND n.name = d.dataset_name
+        JOIN node p ON p.kind = 'path' AND p.name = d.path
+        ORDER BY 1, 2
+    """))
+    connection.execute(text("""
+        DELETE FROM node
+        WHERE id NOT IN (SELECT src_id FROM edge) AND id NOT IN (SELECT dst_id FROM edge)
+    """))
+    connection.execute(text('UPDATE data_version SET version = version + 1, edges_stale = 0 WHERE id = 1'))
+
+def apply_lineage_edge_changes(connection, inserted=(), removed=()):
+    """Patch the node and edge tables for ``(dataset_name, type, path)`` rows added or removed.
+
+    The incremental counterpart of refresh_lineage_edges; call it after the
+    dataset rows themselves have been written, in the same transaction.
+    """
+    # Data flows path -> reading dataset and dataset -> written path
+    endpoints = """
+        CASE WHEN :type = 'upstream' THEN p.id ELSE n.id END,
+        CASE WHEN :type = 'upstream' THEN n.id ELSE p.id END
+        FROM node n, node p
+        WHERE n.kind = 'dataset' AND n.name = :name AND p.kind = 'path' AND p.name = :path
+    """
+    removed = [{'name': name, 'type': type_, 'path': path} for name, type_, path in removed]
+    inserted = [{'name': name, 'type': type_, 'path': path} for name, type_, path in inserted]
+    if not removed and not inserted:
+        return
+    if removed:
+        connection.execute(text(f"""
+            DELETE FROM edge WHERE (src_id, dst_id) = (SELECT {endpoints})
+            AND NOT EXISTS (
+                SELECT 1 FROM dataset
+                WHERE dataset_name = :name AND type = :type AND path = :path
+            )
+        """), removed)
+    if inserted:
+        connection.execute(text("INSERT OR IGNORE INTO node (kind, name) VALUES ('dataset', :name)"), inserted)
+        connection.execute(text("INSERT OR IGNORE INTO node (kind, name) VALUES ('path', :path)"), inserted)
+        connection.execute(text(f'INSERT OR IGNORE INTO edge (src_id, dst_id) SELECT {endpoints}'), inserted)
+    if removed:
+        connection.execute(text("""
+            DELETE FROM node
+            WHERE id NOT IN (SELECT src_id FROM edge) AND id NOT IN (SELECT dst_id FROM edge)
+        """))
+    connection.execute(text('UPDATE data_version SET version = version + 1 WHERE id = 1'))
+
+# Close the current history rows no longer in the live table, then open one for each live row
+# without a current history row; {key} narrows a statement to the keys of a change set
+DATASET_HISTORY_CLOSE = """
+    UPDATE dataset_history SET valid_to = :version
+    WHERE valid_to IS NULL {key} AND NOT EXISTS (
+        SELECT 1 FROM dataset d
+        WHERE d.dataset_name = dataset_history.dataset_name AND d.type = dataset_history.type
+        AND d.path = dataset_history.path
+    )
+"""
+DATASET_HISTORY_OPEN = """
+    INSERT INTO dataset_history (dataset_name, type, path, valid_from)
+    SELECT DISTINCT dataset_name, type, path, :version FROM dataset d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM dataset_history h
+        WHERE h.valid_to IS NULL AND h.dataset_name = d.dataset_name AND h.type = d.type AND h.path = d.path
+    ) {key}
+"""
+DATASET_HISTORY_KEY = 'AND {table}dataset_name = :name AND {table}type = :type AND {table}path = :path'
+SCHEMA_HISTORY_CLOSE = """
+    UPDATE schema_history SET valid_to = :version
+    WHERE valid_to IS NULL {key} AND NOT EXISTS (
+        SELECT 1 FROM schema_info s
+        WHERE s.dataset_path = schema_history.dataset_path
+        AND s.schema_definition = schema_history.schema_definition
+    )
+"""
+SCHEMA_HISTORY_OPEN = """
+    INSERT INTO schema_history (dataset_path, schema_definition, valid_from)
+    SELECT dataset_path, schema_definition, :version FROM schema_info s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM schema_history h
+        WHERE h.valid_to IS NULL AND h.dataset_path = s.dataset_path
+        AND h.schema_definition = s.schema_definition
+    ) {key}
+    ORDER BY s.id
+"""
+SCHEMA_HISTORY_KEY = 'AND {table}dataset_path = :path'
+
+def record_snapshot(connection, from_version=None, changes=None):
+    """Bring the history tables up to the dataset and schema_info rows and add a manifest entry.
+
+    Anything that writes those tables should call this last in the same
+    transaction. Only rows differing from the current history rows are
+    written, so history grows with the changes rather than the catalog. Given
+    the ``changes`` applied since ``from_version`` (as recorded in a change
+    set), only their keys are compared, provided the previous snapshot is of
+    ``from_version``; otherwise the tables are compared whole.
+    """
+    for model in (DatasetHistory, SchemaHistory, Snapshot):
+        model.__table__.create(connection, checkfirst=True)
+    version = connection.execute(text('SELECT version FROM data_version WHERE id = 1')).scalar()
+    previous = connection.execute(text(
+        'SELECT version, datasets, schemas FROM snapshot ORDER BY version DESC LIMIT 1'
+    )).first()
+    if previous is not None and previous.version == version:
+        return
+
+    dataset_keys = schema_keys = None
+    if changes is not None and previous is not None and previous.version == from_version:
+        dataset_keys = [
+            {'name': name, 'type': type_, 'path': path}
+            for rows in changes['datasets'].values() for name, type_, path in rows
+        ]
+        schema_keys = [{'path': path} for paths in changes['schemas'].values() for path in paths]
+
+    def write(statement, key, keys):
+        if keys is None:
+            return connection.execute(text(statement.format(key='')), {'version': version}).rowcount
+        if not keys:
+            return 0
+        return connection.execute(
+            text(statement.format(key=key)), [{**params, 'version': version} for params in keys]
+        ).rowcount
+
+    closed = (write(DATASET_HISTORY_CLOSE, DATASET_HISTORY_KEY.format(table=''), dataset_keys),
+              write(SCHEMA_HISTORY_CLOSE, SCHEMA_HISTORY_KEY.format(table=''), schema_keys))
+    opened = (write(DATASET_HISTORY_OPEN, DATASET_HISTORY_KEY.format(table='d.'), dataset_keys),
+              write(SCHEMA_HISTORY_OPEN, SCHEMA_HISTORY_KEY.format(table='s.'), schema_keys))
+    connection.execute(Snapshot.__table__.insert().values(created_at=text("datetime('now')")), {
+        'version': version,
+        'datasets': (previous.datasets if previous else 0) + opened[0] - closed[0],
+        'schemas': (previous.schemas if previous else 0) + opened[1] - closed[1],
+        'added': sum(opened),
+        'removed': sum(closed),
+    })
+
+def pending_change_sets(since_version, version):
+    """Decoded change sets leading from ``since_version`` to ``version``.
+
+    Returns None when the gap is not fully covered by replayable change sets,
+    i.e. some other writer touched the tables and a full rebuild is needed.
+    """
+    try:
+        rows = db.session.query(
+            ChangeSet.from_version, ChangeSet.to_version, ChangeSet.changes
+        ).filter(ChangeSet.to_version > since_version).order_by(ChangeSet.from_version).all()
+    except OperationalError:
+        db.session.rollback()
+        return None
+    change_sets = []
+    for from_version, to_version, changes in rows:
+        if from_version != since_version or changes is None:
+            return None
+        change_sets.append(json.loads(changes))
+        since_version = to_version
+    return change_sets if since_version == version else None
+
+def current_data_version():
+    try:
+        return db.session.execute(text('SELECT version FROM data_version WHERE id = 1')).scalar()
+    except OperationalError:
+        # Database predates the version counter and edge tables; install them in place
+        db.session.rollback()
+        with db.engine.begin() as connection:
+            db.metadata.create_all(connection)
+            refresh_lineage_edges(connection)
+            record_snapshot(connection)
+        return db.session.execute(text('SELECT version FROM data_version WHERE id = 1')).scalar()
+
+# Graph views answer in the compact wire format when the Accept header asks for it
+response_cache = ResponseCache(
+    current_data_version, vary=('Accept',),
+    max_entries=int(os.environ.get('LINEAGE_RESPONSE_CACHE_SIZE', DEFAULT_RESPONSE_CACHE_ENTRIES)),
+    max_bytes=int(os.environ.get('LINEAGE_RESPONSE_CACHE_BYTES', DEFAULT_RESPONSE_CACHE_BYTES)),
+)
+
+_lineage_graph = None
+_lineage_graph_lock = threading.Lock()
+
+def get_lineage_graph():
+    """Return the process-wide lineage graph, rebuilding it when the tables have changed."""
+    global _lineage_graph
+    version = current_data_version()
+    graph = _lineage_graph
+    if graph is not None and graph.version == version:
+        return graph
+    with _lineage_graph_lock:
+        graph = _lineage_graph
+        if graph is not None and graph.version < version:
+            change_sets = pending_change_sets(graph.version, version)
+            if change_sets is not None:
+                # Patch a copy so requests still reading the old graph are unaffected
+                graph = graph.copy()
+                for changes in change_sets:
+                    graph.apply(
+                        inserted=changes['datasets']['inserted'],
+                        removed=changes['datasets']['removed'],
+                    )
+                graph.version = version
+                _lineage_graph = graph
+        if _lineage_graph is None or _lineage_graph.version != version:
+            _lineage_graph = load_lineage_graph()
+        return _lineage_graph
+
+def load_lineage_graph():
+    """Build the lineage graph of the current version from the node and edge tables, after
+    bringing them up to date if a writer left them behind the dataset rows.
+
+    Read-only processes cannot refresh them and build from the dataset rows instead.
+    """
+    try:
+        stale = db.session.execute(text('SELECT edges_stale FROM data_version WHERE id = 1')).scalar()
+    except OperationalError:
+        # Predates the flag, so nothing vouches for the tables
+        db.session.rollback()
+        stale = True
+    if stale and not app.config['LINEAGE_READ_ONLY']:
+        try:
+            with db.engine.begin() as connection:
+                refresh_lineage_edges(connection)
+            stale = False
+        except OperationalError:
+            app.logger.warning('Could not refresh the lineage edge tables; reading the dataset rows')
+    version = current_data_version()
+    if stale:
+        rows = db.session.execute(text(
+            'SELECT dataset_name, type, path FROM dataset GROUP BY dataset_name, type, path ORDER BY MIN(id)'
+        ))
+        return LineageGraph.from_rows(rows, version)
+    nodes = {
+        node_id: (kind, name)
+        for node_id, kind, name in db.session.query(Node.id, Node.kind, Node.name)
+    }
+    edges = db.session.query(Edge.src_id, Edge.dst_id).all()
+    return LineageGraph.from_edges(nodes, edges, version)
+
+def snapshot_version(as_of):
+    """The snapshot an ``?as_of=`` value names: the latest one at or before a data version
+    (an integer) or a UTC ISO 8601 date or time; None when the history starts later.
+
+    Raises ValueError for a value that is neither.
+    """
+    try:
+        condition, params = 'version <= :version', {'version': int(as_of)}
+    except ValueError:
+        moment = datetime.fromisoformat(as_of)
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        condition, params = 'created_at <= :created_at', {'created_at': moment.strftime('%Y-%m-%d %H:%M:%S')}
+    try:
+        return db.session.execute(text(f'SELECT MAX(version) FROM snapshot WHERE {condition}'), params).scalar()
+    except OperationalError:
+        # Nothing has recorded a snapshot yet
+        db.session.rollback()
+        return None
+
+# Past graphs of the snapshot versions last asked for by ?as_of=; history never changes
+# once recorded, so they stay valid for good
+_history_graphs = collections.OrderedDict()
+_history_graphs_lock = threading.Lock()
+HISTORY_CACHE_SIZE = int(os.environ.get('LINEAGE_HISTORY_CACHE_SIZE', 4))
+
+def history_rows(condition, params):
+    return db.session.execute(text(
+        f'SELECT dataset_name, type, path FROM dataset_history WHERE {condition} ORDER BY id'
+    ), params).all()
+
+def graph_as_of(version):
+    """The lineage graph as of snapshot ``version``.
+
+    When the live graph's version has a snapshot, a copy of it is patched back
+    with just the history rows opened or closed since ``version``, found
+    through the valid_from and valid_to indexes; otherwise the graph is built
+    from the history rows valid at ``version``.
+    """
+    current = get_lineage_graph()
+    if version >= current.version:
+        return current
+    with _history_graphs_lock:
+        graph = _history_graphs.get(version)
+        if graph is not None:
+            _history_graphs.move_to_end(version)
+            return graph
+
+    params = {'version': version, 'current': current.version}
+    if db.session.execute(text('SELECT 1 FROM snapshot WHERE version = :current'), params).first():
+        graph = current.copy()
+        graph.apply(
+            inserted=history_rows('valid_to > :version AND valid_to <= :current AND valid_from <= :version', params),
+            removed=history_rows(
+                'valid_from > :version AND valid_from <= :current AND (valid_to IS NULL OR valid_to > :current)',
+                params),
+        )
+        graph.version = version
+    else:
+        graph = LineageGraph.from_rows(
+            history_rows('valid_from <= :version AND (valid_to IS NULL OR valid_to > :version)', params), version)
+    with _history_graphs_lock:
+        _history_graphs[version] = graph
+        while len(_history_graphs) > HISTORY_CACHE_SIZE:
+            _history_graphs.popitem(last=False)
+    return graph
+
+def requested_graph():
+    """The graph a lineage request is about: the live one, or the past one ``?as_of=`` names.
+
+    Returns ``(graph, as_of, None)`` or ``(None, None, error response)``, ``as_of``
+    being True for a past graph, which the live indexes must not answer for.
+    """
+    as_of = request.args.get('as_of')
+    if as_of is None:
+        return get_lineage_graph(), False, None
+    try:
+        version = snapshot_version(as_of)
+    except ValueError:
+        return None, None, (jsonify({'error': 'as_of must be a data version or an ISO 8601 timestamp'}), 400)
+    if version is None:
+        return None, None, (jsonify({'error': f'No lineage history as of {as_of}'}), 404)
+    current = get_lineage_graph()
+    if version >= current.version:
+        return current, False, None
+    return graph_as_of(version), True, None
+
+def schemas_as_of(paths, version):
+    """``{dataset_path: SchemaEntry}`` of the schemas ``paths`` had as of snapshot ``version``."""
+    rows = db.session.query(
+        SchemaHistory.id, SchemaHistory.dataset_path, SchemaHistory.schema_definition
+    ).filter(
+        SchemaHistory.dataset_path.in_(paths),
+        SchemaHistory.valid_from <= version,
+        or_(SchemaHistory.valid_to.is_(None), SchemaHistory.valid_to > version),
+    ).order_by(SchemaHistory.id)
+    entries = {}
+    for id, path, definition in rows:
+        entries.setdefault(path, SchemaEntry(id, path, definition))
+    return entries
+
+_schema_store = SchemaStore()
+_schema_store_lock = threading.Lock()
+
+def schema_rows(paths=None):
+    """``(id, dataset_path, schema_definition, fingerprint)`` rows in id order, of ``paths`` only if given."""
+    def query(fingerprint):
+        rows = db.session.query(SchemaInfo.id, SchemaInfo.dataset_path, SchemaInfo.schema_definition, fingerprint)
+        if paths is not None:
+            rows = rows.filter(SchemaInfo.dataset_path.in_(paths))
+        return rows.order_by(SchemaInfo.id).all()
+
+    try:
+        return query(SchemaInfo.fingerprint)
+    except OperationalError:
+        # Database predates stored fingerprints; add the column, or do without it when read-only
+        db.session.rollback()
+        if app.config['LINEAGE_READ_ONLY']:
+            return query(null())
+        with db.engine.begin() as connection:
+            install_schema_fingerprints(connection)
+        return query(SchemaInfo.fingerprint)
+
+def get_schema_store():
+    """Return the parsed schemas, re-parsing only the paths whose definition changed."""
+    version = current_data_version()
+    if _schema_store.version == version:
+        return _schema_store
+    with _schema_store_lock:
+        if _schema_store.version is not None and _schema_store.version < version:
+            change_sets = pending_change_sets(_schema_store.version, version)
+            if change_sets is not None:
+                changed = set()
+                for changes in change_sets:
+                    schema_changes = changes['schemas']
+                    changed.update(*schema_changes.values())
+                _schema_store.apply(schema_rows(changed), changed, version)
+        if _schema_store.version != version:
+            _schema_store.refresh(schema_rows(), version)
+        return _schema_store
+
+# Clusterings of the current graph by (by, prefix_depth), the least recently used dropped first
+_clusterings = collections.OrderedDict()
+_clusterings_version = None
+_clusterings_deepest_path = None
+_clusterings_lock = threading.Lock()
+CLUSTERING_CACHE_SIZE = int(os.environ.get('LINEAGE_CLUSTERING_CACHE_SIZE', 8))
+
+def get_clustering(by, prefix_depth=DEFAULT_PREFIX_DEPTH, graph=None, as_of=False):
+    """Return the clustering of ``graph`` (the current one by default), computing the
+    current graph's once per data version; past graphs (``as_of``) are clustered afresh.
+
+    ``prefix_depth`` only counts for ``by='prefix'`` and is capped at the deepest
+    path, so depths that would cluster alike share one entry.
+    """
+    global _clusterings_version, _clusterings_deepest_path
+    if graph is None:
+        graph = get_lineage_graph()
+    with _clusterings_lock:
+        if not as_of and (_clusterings_version is None or _clusterings_version < graph.version):
+            _clusterings.clear()
+            _clusterings_version = graph.version
+            _clusterings_deepest_path = None
+        if as_of or _clusterings_version != graph.version:
+            # A past graph, or one the cache has already moved past, is clustered but not kept
+            if by == 'prefix':
+                prefix_depth = min(prefix_depth, deepest_path(graph))
+            return Clustering.build(graph, by, prefix_depth)
+        if by == 'prefix':
+            if _clusterings_deepest_path is None:
+                _clusterings_deepest_path = deepest_path(graph)
+            prefix_depth = min(prefix_depth, _clusterings_deepest_path)
+        else:
+            prefix_depth = None
+        key = (by, prefix_depth)
+        clustering = _clusterings.get(key)
+        if clustering is not None:
+            _clusterings.move_to_end(key)
+            return clustering
+        clustering = _clusterings[key] = Clustering.build(graph, by, prefix_depth)
+        while len(_clusterings) > CLUSTERING_CACHE_SIZE:
+            _clusterings.popitem(last=False)
+        return clustering
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+def get_search_index():
+    """Return the search index of the current data, rebuilding it when the tables have changed."""
+    global _search_index
+    graph = get_lineage_graph()
+    schemas = get_schema_store()
+    with _search_index_lock:
+        if _search_index is None or _search_index.version != graph.version:
+            _search_index = SearchIndex.build(graph, schemas, graph.version)
+        return _search_index
+
+_schema_drift = None
+_schema_drift_lock = threading.Lock()
+
+def get_schema_drift():
+    """Return the drifted lineage edges of the current data, sweeping them once per data version."""
+    global _schema_drift
+    graph = get_lineage_graph()
+    schemas = get_schema_store()
+    with _schema_drift_lock:
+        if _schema_drift is None or _schema_drift.version != graph.version:
+            _schema_drift = SchemaDrift.build(graph, schemas, graph.version)
+        return _schema_drift
+
+_reachability_index = None
+_reachability_index_lock = threading.Lock()
+
+def reachability_index_file():
+    """Where the reachability index is kept: beside the SQLite file, e.g. lineage.reach.npz."""
+    database = db.engine.url.database
+    if db.engine.url.get_backend_name() != 'sqlite' or not database or database == ':memory:':
+        return None
+    return os.path.splitext(database)[0] + '.reach.npz'
+
+def get_reachability_index():
+    """Return the reachability index of the current graph, loading the saved one when it
+    was built for the same edges and otherwise rebuilding (and saving) it."""
+    global _reachability_index
+    graph = get_lineage_graph()
+    with _reachability_index_lock:
+        if _reachability_index is None or _reachability_index.version != graph.version:
+            _reachability_index = load_or_build(
+                graph, reachability_index_file(), save=not app.config['LINEAGE_READ_ONLY'])
+            stats = _reachability_index.stats()
+            app.logger.info(
+                'Reachability index for %d paths: %d label entries, %.1f MiB, %s',
+                stats['paths'], stats['label_entries'], stats['bytes'] / 2**20,
+                f"loaded from {stats['loaded_from']}" if stats['loaded_from']
+                else f"built in {stats['build_seconds']:.2f}s"
+            )
+        return _reachability_index
+
+# Closures and dependency views of recently requested paths, kept across data versions
+# for as long as no change touches them
+subgraph_cache = SubgraphCache(
+    max_entries=int(os.environ.get('LINEAGE_SUBGRAPH_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+    max_bytes=int(os.environ.get('LINEAGE_SUBGRAPH_CACHE_BYTES', DEFAULT_MAX_BYTES)),
+)
+_subgraph_cache_lock = threading.Lock()
+
+def get_subgraph_cache():
+    """Return the lineage graph and the subgraph cache brought up to its version."""
+    graph = get_lineage_graph()
+
+    def behind():
+        return subgraph_cache.version is None or subgraph_cache.version < graph.version
+
+    # A request still holding an older graph leaves the cache where it is; the
+    # version checks in get and put keep it from reading or writing entries there
+    if not behind():
+        return graph, subgraph_cache
+    with _subgraph_cache_lock:
+        if behind():
+            touched = None
+            if subgraph_cache.version is not None:
+                change_sets = pending_change_sets(subgraph_cache.version, graph.version)
+                if change_sets is not None:
+                    touched = set()
+                    for changes in change_sets:
+                        touched |= graph.touched_paths(
+                            inserted=changes['datasets']['inserted'],
+                            removed=changes['datasets']['removed'],
+                        )
+            subgraph_cache.advance(graph.version, touched)
+    return graph, subgraph_cache
+
+def cached_closure(graph, cache, path, direction, depth=None):
+    """``graph.closure`` of ``path``, served from the subgraph cache when possible."""
+    if cache is None:
+        return graph.closure(path, direction, depth)
+    key = ('closure', path, direction, depth)
+    hops = cache.get(key, graph.version)
+    if hops is None:
+        hops = graph.closure(path, direction, depth)
+        cache.put(key, graph.version, hops, [path, *hops])
+    return hops
+
+def resolve_path(graph, dataset_path):
+    # Routes strip the leading slash of local paths; URI-style paths (abfs://...) have none
+    if '/' + dataset_path in graph.paths or dataset_path not in graph.paths:
+        return '/' + dataset_path
+    return dataset_path
+
+def find_path(graph, path):
+    """``path`` as known to ``graph``, given with or without its leading slash; None if unknown."""
+    if path not in graph.paths:
+        path = resolve_path(graph, path.lstrip('/'))
+    return path if path in graph.paths else None
 
 @app.route('/')
 def index():
@@ -31,346 +790,426 @@ def schema_view():
 
 @app.route('/api/schema/<path:dataset_path>')
 def get_schema(dataset_path):
+    graph, as_of, error = requested_graph()
+    if error:
+        return error
     # Normalize the path
-    dataset_path = '/' + dataset_path
+    dataset_path = resolve_path(graph, dataset_path)
     
     # Get schema info
-    schema_info = SchemaInfo.query.filter_by(dataset_path=dataset_path).first()
+    if not as_of:
+        schema_info = get_schema_store().get(dataset_path)
+    else:
+        schema_info = schemas_as_of([dataset_path], graph.version).get(dataset_path)
     if not schema_info:
         return jsonify({'error': 'Schema not found'}), 404
+    if schema_info.error:
+        return jsonify({'error': f'Invalid schema definition: {schema_info.error}'}), 500
     
     # Get upstream DAGs (datasets that this path depends on)
     upstream_dags = []
-    dataset = Dataset.query.filter_by(path=dataset_path, type='downstream').first()
-    if dataset:
-        upstream_datasets = Dataset.query.filter_by(
-            dataset_name=dataset.dataset_name,
-            type='upstream'
-        ).all()
-        upstream_dags = [{'name': d.dataset_name, 'path': d.path} for d in upstream_datasets]
+    producer = graph.first_producer(dataset_path)
+    if producer is not None:
+        upstream_dags = [
+            {'name': producer, 'path': path}
+            for type_, path in graph.rows_by_name[producer] if type_ == 'upstream'
+        ]
     
     return jsonify({
-        'schema': json.loads(schema_info.schema_definition),
+        'schema': schema_info.schema,
         'upstream_dags': upstream_dags
     })
 
 @app.route('/api/schemas')
+@response_cache.cached
 def get_all_schemas():
-    schemas = SchemaInfo.query.all()
-    formatted_schemas = []
-    
-    for schema in schemas:
-        schema_def = json.loads(schema.schema_definition)
-        formatted_schema = {}
-        
-        # Extract fields from the schema definition
-        if isinstance(schema_def, dict):
-            for field_name, field_info in schema_def.items():
-                # Skip special fields like domainMetadata, remove, metaData, etc.
-                if field_name in ['domainMetadata', 'remove', 'metaData', 'txn', 'add', 'protocol']:
-                    continue
-                    
-                # Get the type information
-                field_type = str(field_info) if isinstance(field_info, str) else 'object'
-                
-                formatted_schema[field_name] = {
-                    'type': field_type,
-                    'description': ''  # We can add descriptions later if needed
-                }
-        
-        formatted_schemas.append({
-            'path': schema.dataset_path,
-            'schema': formatted_schema
-        })
-    
-    return jsonify(formatted_schemas)
+    return jsonify([
+        {'path': schema.path, 'schema': schema.fields}
+        for schema in get_schema_store().entries.values()
+    ])
+
+@app.route('/api/columns/<field_name>')
+@response_cache.cached
+def get_column_paths(field_name):
+    """Paths whose schema has column ``field_name`` (of ?type=), optionally only those
+    ?upstream_of= or ?downstream_of= a path, within ?depth= hops."""
+    field_type = request.args.get('type')
+    upstream_of = request.args.get('upstream_of')
+    downstream_of = request.args.get('downstream_of')
+    if upstream_of and downstream_of:
+        return jsonify({'error': 'give either upstream_of or downstream_of, not both'}), 400
+    depth = request.args.get('depth', type=int)
+    if depth is not None and depth < 0:
+        return jsonify({'error': 'depth must be a non-negative integer'}), 400
+
+    typed_paths = get_schema_store().paths_with_column(field_name)
+    if field_type is not None:
+        typed_paths = {path: type_ for path, type_ in typed_paths.items() if type_ == field_type}
+
+    related = upstream_of or downstream_of
+    if related:
+        graph, cache = get_subgraph_cache()
+        related = resolve_path(graph, related)
+        if related not in graph.paths:
+            return jsonify({'error': 'Dataset not found'}), 404
+        hops = cached_closure(graph, cache, related, 'upstream' if upstream_of else 'downstream', depth)
+        # Probe the smaller side against the larger
+        if len(hops) < len(typed_paths):
+            matches = [path for path in hops if path in typed_paths]
+        else:
+            matches = [path for path in typed_paths if path in hops]
+        paths = [
+            {'path': path, 'type': typed_paths[path], 'hops': hops[path]}
+            for path in sorted(matches, key=lambda path: (hops[path], path))
+        ]
+    else:
+        paths = [{'path': path, 'type': typed_paths[path]} for path in sorted(typed_paths)]
+
+    if not paths:
+        # Misses are answered but not kept, so probing arbitrary names cannot churn the cache
+        response_cache.skip()
+    return jsonify({'field': field_name, 'count': len(paths), 'paths': paths})
+
+DRIFT_LIMIT = 100
+DRIFT_MAX_LIMIT = 1000
+
+@app.route('/api/schemas/drift')
+@response_cache.cached
+def get_drifted_edges():
+    """Lineage edges whose upstream and downstream schemas differ, with their column diffs,
+    optionally only those ?from_layer= ?to_layer=, paged by ?limit= and ?offset=."""
+    from_layer = request.args.get('from_layer')
+    to_layer = request.args.get('to_layer')
+    if any(layer is not None and layer not in LAYERS for layer in (from_layer, to_layer)):
+        return jsonify({'error': f'layers must be one of {", ".join(LAYERS)}'}), 400
+    limit = request.args.get('limit', DRIFT_LIMIT, type=int)
+    if not 0 < limit <= DRIFT_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {DRIFT_MAX_LIMIT}'}), 400
+    offset = request.args.get('offset', 0, type=int)
+    if offset < 0:
+        return jsonify({'error': 'offset must be a non-negative integer'}), 400
+
+    drift = get_schema_drift()
+    drifted = drift.select(from_layer, to_layer)
+    # Only the edges on this page get their columns compared
+    results = [
+        {'from': upstream, 'to': downstream, 'datasets': names, **drift.diff(upstream, downstream)}
+        for upstream, downstream, names in drifted[offset:offset + limit]
+    ]
+    return jsonify({
+        'edges': drift.edges,
+        'unknown': drift.unknown,
+        'drifted': len(drifted),
+        'offset': offset,
+        'limit': limit,
+        'results': results,
+    })
+
+# Not response-cached: any two paths make a key, and diffing two parsed schemas takes about a millisecond
+@app.route('/api/schemas/diff')
+def get_schema_diff():
+    """Column-level difference between the schemas of ?from= and ?to=."""
+    source, target = request.args.get('from'), request.args.get('to')
+    if not source or not target:
+        return jsonify({'error': 'from and to are required'}), 400
+    schemas = get_schema_store()
+    entries = []
+    for path in (source, target):
+        entry = schemas.get(path) or schemas.get('/' + path.lstrip('/'))
+        if entry is None:
+            return jsonify({'error': f'Schema not found: {path}'}), 404
+        if entry.columns is None:
+            return jsonify({'error': f'Invalid schema definition: {entry.error}'}), 500
+        entries.append(entry)
+    before, after = entries
+    return jsonify({
+        'from': before.path,
+        'to': after.path,
+        'from_fingerprint': before.fingerprint,
+        'to_fingerprint': after.fingerprint,
+        'identical': before.fingerprint == after.fingerprint,
+        **column_diff(before.columns, after.columns),
+    })
+
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# Not response-cached: free text makes nearly every query a new key, and the index
+# answers each in a few milliseconds anyway
+@app.route('/api/search')
+def search():
+    """Ranked substring matches for ?q= over dataset names, paths and schema field names."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    limit = request.args.get('limit', SEARCH_LIMIT, type=int)
+    if not 0 < limit <= SEARCH_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {SEARCH_MAX_LIMIT}'}), 400
+    kinds = request.args.getlist('kind') or SEARCH_KINDS
+    unknown = [kind for kind in kinds if kind not in SEARCH_KINDS]
+    if unknown:
+        return jsonify({'error': f'kind must be one of {", ".join(SEARCH_KINDS)}'}), 400
+
+    results, total = get_search_index().search(query, limit, kinds)
+    return jsonify({'query': query, 'results': results, 'total': total})
 
 def get_topological_levels(nodes, edges):
-    # Create adjacency list
-    graph = defaultdict(list)
-    in_degree = defaultdict(int)
-    
-    # Build the graph and calculate in-degrees
-    for edge in edges:
-        from_node = edge['from']
-        to_node = edge['to']
-        graph[from_node].append(to_node)
-        in_degree[to_node] += 1
-        # Ensure both nodes are in the graph
-        if from_node not in graph:
-            graph[from_node] = []
-        if to_node not in graph:
-            graph[to_node] = []
-
-    # Find nodes with no incoming edges (sources/raw data)
-    queue = deque()
-    for node in graph:
-        if in_degree[node] == 0:
-            queue.append(node)
-
-    # Perform topological sort and assign levels
-    levels = defaultdict(int)
-    current_level = 0
-    
-    while queue:
-        level_size = len(queue)
-        for _ in range(level_size):
-            node = queue.popleft()
-            levels[node] = current_level
-            
-            # Process neighbors
-            for neighbor in graph[node]:
-                in_degree[neighbor] -= 1
-                if in_degree[neighbor] == 0:
-                    queue.append(neighbor)
-        
-        current_level += 1
+    """Longest-path level per node id; the members of a cycle share one level."""
+    return levels_by_id(
+        (node['id'] for node in nodes),
+        [(edge['from'], edge['to']) for edge in edges]
+    )
+
+# ?layout= value -> direction the levels run in; positioned responses are cached like any other
+LAYOUTS = {'hierarchical': 'UD', 'layered': 'LR'}
 
-    return levels
+GRAPH_FORMATS = ('json', 'compact')
+
+def invalid_graph_options():
+    layout = request.args.get('layout')
+    if layout is not None and layout not in LAYOUTS:
+        return jsonify({'error': f'layout must be one of {", ".join(LAYOUTS)}'}), 400
+    graph_format = request.args.get('format')
+    if graph_format is not None and graph_format not in GRAPH_FORMATS:
+        return jsonify({'error': f'format must be one of {", ".join(GRAPH_FORMATS)}'}), 400
+    return None
+
+def apply_layout(nodes, edges, levels=None):
+    """Give every node the level and x/y position of the requested ?layout=, if any;
+    ``levels`` from get_topological_levels saves layering the graph again."""
+    layout = request.args.get('layout')
+    if layout is None:
+        return
+    positions = layered_layout(
+        (node['id'] for node in nodes),
+        [(edge['from'], edge['to']) for edge in edges],
+        LAYOUTS[layout],
+        levels=levels
+    )
+    for node in nodes:
+        node['level'], node['x'], node['y'] = positions[node['id']]
+
+def dataset_node(graph, dataset_name):
+    upstream_paths = graph.inputs.get(dataset_name, {})
+    downstream_paths = graph.outputs.get(dataset_name, {})
+
+    # Determine layer based on paths
+    layer = graph.layer(dataset_name)
+
+    return {
+        'id': f'dataset_{dataset_name}',
+        'label': dataset_name,
+        'group': f'{layer}_dataset' if layer else 'dataset',
+        'title': f'Dataset: {dataset_name}\n'
+                f'Layer: {layer}\n'
+                f'Upstream Paths: {len(upstream_paths)}\n'
+                f'Downstream Paths: {len(downstream_paths)}'
+    }
+
+def graph_response(nodes, edges):
+    """vis.js nodes/edges as JSON, or in the compact wire format when asked for by
+    ?format=compact or an Accept header preferring it."""
+    graph_format = request.args.get('format')
+    if graph_format is None:
+        best = request.accept_mimetypes.best_match(['application/json', COMPACT_MIMETYPE])
+        graph_format = 'compact' if best == COMPACT_MIMETYPE else 'json'
+    if graph_format == 'compact':
+        with serialization_timer():
+            body = json.dumps(encode_compact(nodes, edges), separators=(',', ':'))
+        return app.response_class(body, mimetype=COMPACT_MIMETYPE)
+    return jsonify({'nodes': nodes, 'edges': edges})
 
 @app.route('/api/lineage')
+@response_cache.cached
 def get_lineage():
+    error = invalid_graph_options()
+    if error:
+        return error
+    graph, _, error = requested_graph()
+    if error:
+        return error
     try:
-        print('Fetching lineage data...')
-        datasets = Dataset.query.all()
-        print(f'Found {len(datasets)} datasets')
-        
-        if not datasets:
-            print('No datasets found in database')
+        if not len(graph):
             return jsonify({'error': 'No data available'}), 404
 
-        # First, collect all unique datasets and their relationships
-        dataset_info = {}  # dataset_name -> {node_id, upstream_paths, downstream_paths}
-        dataset_relationships = defaultdict(set)  # dataset_name -> set of upstream dataset names
-
-        # First pass: collect dataset information and relationships
-        for dataset in datasets:
-            # Initialize dataset info if not exists
-            if dataset.dataset_name not in dataset_info:
-                dataset_info[dataset.dataset_name] = {
-                    'node_id': f'dataset_{dataset.dataset_name}',
-                    'upstream_paths': set(),
-                    'downstream_paths': set()
-                }
-
-            # Track paths by type
-            if dataset.type == 'upstream':
-                dataset_info[dataset.dataset_name]['upstream_paths'].add(dataset.path)
-            else:  # downstream
-                dataset_info[dataset.dataset_name]['downstream_paths'].add(dataset.path)
-                # Find upstream datasets for this downstream dataset
-                upstreams = Dataset.query.filter_by(
-                    path=dataset.path,
-                    type='upstream'
-                ).all()
-                for upstream in upstreams:
-                    dataset_relationships[dataset.dataset_name].add(upstream.dataset_name)
-
-        # Create nodes and edges
         nodes = []
         edges = []
-        processed_edges = set()
 
         # Create nodes
-        for dataset_name, info in dataset_info.items():
-            # Determine dataset type based on relationships
-            is_source = len(info['upstream_paths']) == 0 and len(info['downstream_paths']) > 0
-            is_target = len(info['upstream_paths']) > 0 and len(info['downstream_paths']) == 0
-            group = 'source' if is_source else 'target' if is_target else 'intermediate'
-
-            # Determine layer based on paths
-            layer = None
-            for path in info['upstream_paths'].union(info['downstream_paths']):
-                if '/bronze/' in path:
-                    layer = 'bronze'
-                    break
-                elif '/silver/' in path:
-                    layer = 'silver'
-                    break
-                elif '/gold/' in path:
-                    layer = 'gold'
-                    break
-            
-            nodes.append({
-                'id': info['node_id'],
-                'label': dataset_name,
-                'group': f'{layer}_dataset' if layer else 'dataset',
-                'title': f'Dataset: {dataset_name}\n'
-                        f'Layer: {layer}\n'
-                        f'Upstream Paths: {len(info["upstream_paths"])}\n'
-                        f'Downstream Paths: {len(info["downstream_paths"])}'
+        for dataset_name in graph.names:
+            nodes.append(dataset_node(graph, dataset_name))
+
+        # Create edges: the dataset writing a path points at each dataset reading it
+        for producer, consumer in graph.dataset_edges():
+            edges.append({
+                'from': f'dataset_{producer}',
+                'to': f'dataset_{consumer}',
+                'arrows': 'to'
             })
 
-        # Create edges based on relationships
-        for downstream_name, upstream_names in dataset_relationships.items():
-            downstream_id = dataset_info[downstream_name]['node_id']
-            for upstream_name in upstream_names:
-                upstream_id = dataset_info[upstream_name]['node_id']
-                edge_key = (downstream_id, upstream_id)  # Flipped direction
-                if edge_key not in processed_edges:
-                    edges.append({
-                        'from': downstream_id,  # Downstream dataset is now the source
-                        'to': upstream_id,      # Upstream dataset is now the target
-                        'arrows': 'to'
-                    })
-                    processed_edges.add(edge_key)
-
-        result = {'nodes': nodes, 'edges': edges}
-        print(f'Returning {len(nodes)} nodes and {len(edges)} edges')
-        return jsonify(result)
+        apply_layout(nodes, edges)
+        return graph_response(nodes, edges)
 
     except Exception as e:
-        print(f'Error in get_lineage: {str(e)}')
+        app.logger.exception('Error in get_lineage')
         return jsonify({'error': str(e)}), 500
 
-    except Exception as e:
-        print(f'Error in get_lineage: {str(e)}')
-        return jsonify({'error': str(e)}), 500
+@app.route('/api/lineage/clusters')
+@response_cache.cached
+def get_clustered_lineage():
+    """Dataset lineage collapsed into clusters, ?by=layer|prefix|component.
 
-    except Exception as e:
-        print(f'Error in get_lineage: {str(e)}')
-        return jsonify({'error': str(e)}), 500
+    Every ?expand=<cluster> (repeatable) is replaced by its member datasets;
+    edges are aggregated with their dataset-edge count as ``value``.
+    """
+    by = request.args.get('by', 'layer')
+    if by not in CLUSTER_MODES:
+        return jsonify({'error': f'by must be one of {", ".join(CLUSTER_MODES)}'}), 400
+    prefix_depth = request.args.get('prefix_depth', DEFAULT_PREFIX_DEPTH, type=int)
+    if prefix_depth < 1:
+        return jsonify({'error': 'prefix_depth must be a positive integer'}), 400
+    error = invalid_graph_options()
+    if error:
+        return error
+
+    graph, as_of, error = requested_graph()
+    if error:
+        return error
+    if not len(graph):
+        return jsonify({'error': 'No data available'}), 404
+    clustering = get_clustering(by, prefix_depth, graph, as_of)
+    expanded = request.args.getlist('expand')
+    unknown = [key for key in expanded if key not in clustering]
+    if unknown:
+        return jsonify({'error': f'Cluster not found: {unknown[0]}'}), 404
+
+    clusters, datasets, aggregated = clustering.view(expanded)
+    nodes = []
+    for key in clusters:
+        size = len(clustering.members[key])
+        nodes.append({
+            'id': f'cluster_{key}',
+            'label': f'{key} ({size})',
+            'group': 'cluster',
+            'cluster': key,
+            'value': size,
+            'title': f'Cluster: {key}\nDatasets: {size}'
+        })
+    for dataset_name in datasets:
+        node = dataset_node(graph, dataset_name)
+        node['cluster'] = clustering.keys[dataset_name]
+        nodes.append(node)
+
+    edges = []
+    for ((source_kind, source), (target_kind, target)), count in aggregated.items():
+        edges.append({
+            'from': f'{source_kind}_{source}',
+            'to': f'{target_kind}_{target}',
+            'arrows': 'to',
+            'value': count,
+            'title': f'{count} dataset edge{"" if count == 1 else "s"}'
+        })
+
+    apply_layout(nodes, edges)
+    return graph_response(nodes, edges)
 
 @app.route('/api/lineage/dataset/<dataset_name>')
 def get_dataset_details(dataset_name):
+    graph, as_of, error = requested_graph()
+    if error:
+        return error
     try:
-        print(f'Fetching details for dataset: {dataset_name}')
         # Get all paths for this dataset
-        dataset_paths = Dataset.query.filter_by(dataset_name=dataset_name).all()
+        dataset_paths = graph.rows_by_name.get(dataset_name)
         
         if not dataset_paths:
-            print(f'No paths found for dataset: {dataset_name}')
             return jsonify({'error': 'Dataset not found'}), 404
 
+        if not as_of:
+            schemas = get_schema_store()
+        else:
+            schemas = schemas_as_of([path for _, path in dataset_paths], graph.version)
+
         # Organize paths by type
         paths = {'upstream': [], 'downstream': []}
         
-        for path in dataset_paths:
-            print(f'Processing path: {path.path} (type: {path.type})')
-            # Get schema for this path
-            schema_info = SchemaInfo.query.filter_by(dataset_path=path.path).first()
-            
-            if schema_info:
-                try:
-                    schema = json.loads(schema_info.schema_definition)
-                    print(f'Found schema for path: {path.path}')
-                except json.JSONDecodeError as e:
-                    print(f'Error decoding schema for path {path.path}: {str(e)}')
-                    schema = None
-            else:
-                print(f'No schema found for path: {path.path}')
-                schema = None
+        for path_type, path in dataset_paths:
+            schema_info = schemas.get(path)
+            schema = schema_info.schema if schema_info is not None else None
             
             path_info = {
-                'path': path.path,
+                'path': path,
                 'schema': schema
             }
-            paths[path.type].append(path_info)
+            paths[path_type].append(path_info)
 
         result = {
             'dataset_name': dataset_name,
             'paths': paths
         }
-        
-        print(f'Returning details for dataset {dataset_name} with {len(paths["upstream"])} upstream and {len(paths["downstream"])} downstream paths')
         return jsonify(result)
 
     except Exception as e:
-        print(f'Error in get_dataset_details: {str(e)}')
-        return jsonify({'error': str(e)}), 500
-
-    except Exception as e:
-        print(f'Error in get_dataset_details: {str(e)}')
+        app.logger.exception('Error in get_dataset_details')
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/lineage/dependencies/<path:dataset_path>')
 def get_dataset_dependencies(dataset_path):
+    graph, as_of, error = requested_graph()
+    if error:
+        return error
+    # Views of past versions (?as_of=) are not cached
+    cache = None
+    if not as_of:
+        graph, cache = get_subgraph_cache()
     # Normalize the path
-    dataset_path = '/' + dataset_path
-
-    def get_upstream_paths(path, visited=None):
-        if visited is None:
-            visited = set()
-        if path in visited:
-            return set()
-        visited.add(path)
-        
-        upstream_datasets = Dataset.query.filter_by(
-            dataset_name=Dataset.query.filter_by(path=path).first().dataset_name,
-            type='upstream'
-        ).all()
-        
-        paths = {d.path for d in upstream_datasets}
-        for upstream_path in list(paths):
-            paths.update(get_upstream_paths(upstream_path, visited))
-        return paths
-
-    def get_downstream_paths(path, visited=None):
-        if visited is None:
-            visited = set()
-        if path in visited:
-            return set()
-        visited.add(path)
-        
-        downstream_datasets = Dataset.query.filter(
-            Dataset.type == 'upstream',
-            Dataset.path == path
-        ).all()
-        
-        paths = {d.dataset_name for d in downstream_datasets}
-        downstream_paths = set()
-        for dataset_name in paths:
-            downstream_path = Dataset.query.filter_by(
-                dataset_name=dataset_name,
-                type='downstream'
-            ).first()
-            if downstream_path:
-                downstream_paths.add(downstream_path.path)
-                downstream_paths.update(get_downstream_paths(downstream_path.path, visited))
-        return downstream_paths
+    dataset_path = resolve_path(graph, dataset_path)
+    if dataset_path not in graph.paths:
+        return jsonify({'error': 'Dataset not found'}), 404
 
+    depth = request.args.get('depth', type=int)
+    if depth is not None and depth < 0:
+        return jsonify({'error': 'depth must be a non-negative integer'}), 400
+    error = invalid_graph_options()
+    if error:
+        return error
+
+    if cache is None:
+        return graph_response(*dependency_subgraph(graph, cache, dataset_path, depth))
+    key = ('dependencies', dataset_path, 'both', depth, request.args.get('layout'))
+    subgraph = cache.get(key, graph.version)
+    if subgraph is None:
+        subgraph = dependency_subgraph(graph, cache, dataset_path, depth)
+        nodes, _ = subgraph
+        cache.put(key, graph.version, subgraph, [node['id'] for node in nodes])
+    return graph_response(*subgraph)
+
+def dependency_subgraph(graph, cache, dataset_path, depth):
     # Get upstream and downstream paths
-    upstream_paths = get_upstream_paths(dataset_path)
-    downstream_paths = get_downstream_paths(dataset_path)
-    all_paths = {dataset_path} | upstream_paths | downstream_paths
+    upstream_paths = cached_closure(graph, cache, dataset_path, 'upstream', depth)
+    downstream_paths = cached_closure(graph, cache, dataset_path, 'downstream', depth)
+    all_paths = {dataset_path} | upstream_paths.keys() | downstream_paths.keys()
 
-    # Get all relevant datasets
-    datasets = Dataset.query.filter(Dataset.path.in_(all_paths)).all()
-    
     nodes = []
     edges = []
-    processed_nodes = set()
-    processed_edges = set()
 
-    # Create nodes
-    for dataset in datasets:
-        if dataset.path not in processed_nodes:
-            nodes.append({
-                'id': dataset.path,
-                'label': dataset.dataset_name,
-                'group': 'default',
-                'path': dataset.path
-            })
-            processed_nodes.add(dataset.path)
-
-    # Create edges
-    for dataset in datasets:
-        if dataset.type == 'downstream':
-            upstreams = Dataset.query.filter_by(
-                dataset_name=dataset.dataset_name,
-                type='upstream'
-            ).all()
-            
-            for upstream in upstreams:
-                if upstream.path in all_paths:  # Only include edges between selected nodes
-                    edge_key = (dataset.path, upstream.path)
-                    if edge_key not in processed_edges:
-                        edges.append({
-                            'from': dataset.path,
-                            'to': upstream.path,
-                            'arrows': 'to'
-                        })
-                        processed_edges.add(edge_key)
+    # Create nodes, labelled with the dataset writing the path (or reading it, for raw sources)
+    for path in all_paths:
+        label = graph.first_producer(path) or min(graph.consumers.get(path, ()), default=None)
+        nodes.append({
+            'id': path,
+            'label': label,
+            'group': 'default',
+            'path': path
+        })
+
+    # Create edges from each path to the paths its producers read
+    for path, upstream_path in graph.induced_edges(all_paths):
+        edges.append({
+            'from': path,
+            'to': upstream_path,
+            'arrows': 'to'
+        })
 
     # Get levels for the filtered graph
     levels = get_topological_levels(nodes, edges)
@@ -389,46 +1228,154 @@ def get_dataset_dependencies(dataset_path):
             # This shouldn't happen but just in case
             node['group'] = 'default'
 
-    return jsonify({'nodes': nodes, 'edges': edges})
+    apply_layout(nodes, edges, levels)
+    return nodes, edges
+
+IMPACT_DIRECTIONS = ('downstream', 'upstream')
+IMPACT_MAX_SOURCES = 1000
+
+@app.route('/api/lineage/impact', methods=['POST'])
+def get_lineage_impact():
+    """Combined closure of many paths in one traversal.
+
+    Takes ``{"paths": [...], "direction": "downstream"|"upstream", "depth": n}``
+    and returns every reached path with its distance from the nearest source
+    and the sources reaching it, plus how much each source reaches.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({'error': 'expected a JSON object body'}), 400
+    requested = body.get('paths')
+    if not isinstance(requested, list) or not requested or not all(isinstance(path, str) for path in requested):
+        return jsonify({'error': 'paths must be a non-empty list of strings'}), 400
+    if len(requested) > IMPACT_MAX_SOURCES:
+        return jsonify({'error': f'at most {IMPACT_MAX_SOURCES} paths per request'}), 400
+    direction = body.get('direction', 'downstream')
+    if direction not in IMPACT_DIRECTIONS:
+        return jsonify({'error': f'direction must be one of {", ".join(IMPACT_DIRECTIONS)}'}), 400
+    depth = body.get('depth')
+    if depth is not None and (type(depth) is not int or depth < 0):
+        return jsonify({'error': 'depth must be a non-negative integer'}), 400
+
+    graph, _, error = requested_graph()
+    if error:
+        return error
+    sources = []
+    unknown = []
+    for requested_path in dict.fromkeys(requested):
+        path = find_path(graph, requested_path)
+        if path is None:
+            unknown.append(requested_path)
+        else:
+            sources.append(path)
+    sources = list(dict.fromkeys(sources))
+
+    reached = graph.multi_closure(sources, direction, depth)
+    counts = [0] * len(sources)
+    paths = []
+    for path, (hops, bits) in sorted(reached.items(), key=lambda item: (item[1][0], item[0])):
+        reaching = []
+        while bits:
+            low = bits & -bits
+            i = low.bit_length() - 1
+            counts[i] += 1
+            reaching.append(sources[i])
+            bits ^= low
+        paths.append({'path': path, 'hops': hops, 'sources': reaching})
+
+    return jsonify({
+        'direction': direction,
+        'depth': depth,
+        'sources': [{'path': path, 'reached': count} for path, count in zip(sources, counts)],
+        'unknown': unknown,
+        'count': len(paths),
+        'paths': paths,
+    })
+
+REACHABLE_MAX_PAIRS = 100000
+
+@app.route('/api/lineage/reachable')
+def get_reachable():
+    """Whether data written to ?from= flows, through any chain of datasets, into ?to=."""
+    source, target = request.args.get('from'), request.args.get('to')
+    if not source or not target:
+        return jsonify({'error': 'from and to are required'}), 400
+    graph, as_of, error = requested_graph()
+    if error:
+        return error
+    source_path, target_path = find_path(graph, source), find_path(graph, target)
+    for requested_path, path in ((source, source_path), (target, target_path)):
+        if path is None:
+            return jsonify({'error': f'Dataset not found: {requested_path}'}), 404
+    if not as_of:
+        index = get_reachability_index()
+        reachable = index.reachable(index.position[source_path], index.position[target_path])
+    else:
+        # Past versions (?as_of=) have no index; walk the graph instead
+        reachable = target_path in graph.closure(source_path, 'downstream')
+    return jsonify({'from': source_path, 'to': target_path, 'reachable': reachable})
+
+@app.route('/api/lineage/reachable/batch', methods=['POST'])
+def get_reachable_batch():
+    """Answer ``{"pairs": [[from, to], ...]}`` in one go; unknown paths answer null."""
+    body = request.get_json(silent=True)
+    pairs = body.get('pairs') if isinstance(body, dict) else None
+    if not isinstance(pairs, list) or not all(
+            isinstance(pair, list) and len(pair) == 2 and all(isinstance(path, str) for path in pair)
+            for pair in pairs):
+        return jsonify({'error': 'pairs must be a list of [from, to] path pairs'}), 400
+    if len(pairs) > REACHABLE_MAX_PAIRS:
+        return jsonify({'error': f'at most {REACHABLE_MAX_PAIRS} pairs per request'}), 400
+
+    graph, as_of, error = requested_graph()
+    if error:
+        return error
+    found = {path: find_path(graph, path) for path in {path for pair in pairs for path in pair}}
+    known = [i for i, (source, target) in enumerate(pairs)
+             if found[source] is not None and found[target] is not None]
+    if not as_of:
+        index = get_reachability_index()
+        answers = index.reachable_many(
+            [index.position[found[pairs[i][0]]] for i in known],
+            [index.position[found[pairs[i][1]]] for i in known]).tolist()
+    else:
+        # Past versions (?as_of=) have no index; walk the graph once per source
+        closures = {}
+        answers = []
+        for i in known:
+            source, target = found[pairs[i][0]], found[pairs[i][1]]
+            if source not in closures:
+                closures[source] = graph.closure(source, 'downstream')
+            answers.append(target in closures[source])
+    results = [{'from': source, 'to': target, 'reachable': None} for source, target in pairs]
+    for i, reachable in zip(known, answers):
+        results[i]['reachable'] = reachable
+    return jsonify({
+        'results': results,
+        'unknown': sorted(path for path, resolved in found.items() if resolved is None),
+    })
 
 @app.route('/api/lineage/path_view')
+@response_cache.cached
 def get_path_centric_lineage():
+    error = invalid_graph_options()
+    if error:
+        return error
+    graph, _, error = requested_graph()
+    if error:
+        return error
     try:
-        print('Fetching path-centric lineage data...')
-        datasets = Dataset.query.all()
-        print(f'Found {len(datasets)} datasets')
-        
-        if not datasets:
-            print('No datasets found in database')
+        if not len(graph):
             return jsonify({'error': 'No data available'}), 404
 
-        # First, collect all unique paths and datasets
-        unique_paths = {}
-        unique_datasets = {}
-        dataset_to_paths = defaultdict(list)  # dataset_name -> [(path, type), ...]
-
-        for dataset in datasets:
-            # Track unique paths
-            if dataset.path not in unique_paths:
-                unique_paths[dataset.path] = f'path_{dataset.path}'
-            
-            # Track unique datasets
-            dataset_key = dataset.dataset_name
-            if dataset_key not in unique_datasets:
-                unique_datasets[dataset_key] = f'dataset_{dataset.dataset_name}'
-            
-            # Track which paths each dataset appears in
-            dataset_to_paths[dataset.dataset_name].append((dataset.path, dataset.type))
-
         # Create nodes and edges
         nodes = []
         edges = []
-        processed_edges = set()
 
         # Create path nodes
-        for path, path_id in unique_paths.items():
+        for path in graph.paths:
             nodes.append({
-                'id': path_id,
+                'id': f'path_{path}',
                 'label': path,
                 'group': 'path',
                 'shape': 'box',
@@ -436,9 +1383,9 @@ def get_path_centric_lineage():
             })
 
         # Create dataset nodes
-        for dataset_name, dataset_id in unique_datasets.items():
+        for dataset_name in graph.names:
             nodes.append({
-                'id': dataset_id,
+                'id': f'dataset_{dataset_name}',
                 'label': dataset_name,
                 'group': 'dataset',
                 'shape': 'ellipse',
@@ -446,66 +1393,157 @@ def get_path_centric_lineage():
             })
 
         # Create edges to show the flow
-        for dataset_name, paths_and_types in dataset_to_paths.items():
-            dataset_id = unique_datasets[dataset_name]
-            
-            # Group paths by type
-            upstream_paths = [p for p, t in paths_and_types if t == 'upstream']
-            downstream_paths = [p for p, t in paths_and_types if t == 'downstream']
+        for dataset_name in graph.names:
+            dataset_id = f'dataset_{dataset_name}'
             
             # Connect upstream paths to dataset
-            for path in upstream_paths:
-                path_id = unique_paths[path]
-                edge_key = (path_id, dataset_id)
-                if edge_key not in processed_edges:
-                    edges.append({
-                        'from': path_id,
-                        'to': dataset_id,
-                        'arrows': 'to'
-                    })
-                    processed_edges.add(edge_key)
+            for path in graph.inputs.get(dataset_name, ()):
+                edges.append({
+                    'from': f'path_{path}',
+                    'to': dataset_id,
+                    'arrows': 'to'
+                })
             
             # Connect dataset to downstream paths
-            for path in downstream_paths:
-                path_id = unique_paths[path]
-                edge_key = (dataset_id, path_id)
-                if edge_key not in processed_edges:
-                    edges.append({
-                        'from': dataset_id,
-                        'to': path_id,
-                        'arrows': 'to'
-                    })
-                    processed_edges.add(edge_key)
-
-        result = {'nodes': nodes, 'edges': edges}
-        print(f'Returning {len(nodes)} nodes and {len(edges)} edges')
-        return jsonify(result)
+            for path in graph.outputs.get(dataset_name, ()):
+                edges.append({
+                    'from': dataset_id,
+                    'to': f'path_{path}',
+                    'arrows': 'to'
+                })
+
+        apply_layout(nodes, edges)
+        return graph_response(nodes, edges)
 
     except Exception as e:
-        print(f'Error in get_path_centric_lineage: {str(e)}')
+        app.logger.exception('Error in get_path_centric_lineage')
         return jsonify({'error': str(e)}), 500
 
-        result = {'nodes': nodes, 'edges': edges}
-        print(f'Returning {len(nodes)} nodes and {len(edges)} edges')
-        return jsonify(result)
+SNAPSHOT_LIMIT = 100
+SNAPSHOT_MAX_LIMIT = 1000
 
-        result = {'nodes': nodes, 'edges': edges}
-        print(f'Returning {len(nodes)} nodes and {len(edges)} edges')
-        return jsonify(result)
+@app.route('/api/lineage/snapshots')
+@response_cache.cached
+def get_snapshots():
+    """The snapshot manifest, newest first: the versions and times ``?as_of=`` can name."""
+    limit = request.args.get('limit', SNAPSHOT_LIMIT, type=int)
+    if not 0 < limit <= SNAPSHOT_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {SNAPSHOT_MAX_LIMIT}'}), 400
+    offset = request.args.get('offset', 0, type=int)
+    if offset < 0:
+        return jsonify({'error': 'offset must be a non-negative integer'}), 400
+    try:
+        rows = db.session.query(
+            Snapshot.version, Snapshot.created_at, Snapshot.datasets, Snapshot.schemas,
+            Snapshot.added, Snapshot.removed
+        ).order_by(Snapshot.version.desc()).limit(limit).offset(offset).all()
+    except OperationalError:
+        # Nothing has recorded a snapshot yet
+        db.session.rollback()
+        rows = []
+    return jsonify({
+        'offset': offset,
+        'limit': limit,
+        'snapshots': [dict(row._mapping) for row in rows],
+    })
 
-        result = {'nodes': nodes, 'edges': edges}
-        print(f'Returning {len(nodes)} nodes and {len(edges)} edges')
-        return jsonify(result)
+# Export name -> (table, columns) for the paginated and streamed raw data views
+RAW_DATA_TABLES = {
+    'datasets': ('dataset', ('id', 'dataset_name', 'type', 'path')),
+    'schemas': ('schema_info', ('id', 'dataset_path', 'schema_definition')),
+}
+RAW_DATA_PAGE_SIZE = 1000
+RAW_DATA_MAX_PAGE_SIZE = 10000
+RAW_DATA_STREAM_BATCH = 1000
 
-    except Exception as e:
-        print(f'Error in get_path_centric_lineage: {str(e)}')
-        return jsonify({'error': str(e)}), 500
+def raw_data_query(table_name, after_id, limit=None):
+    table, columns = RAW_DATA_TABLES[table_name]
+    sql = f'SELECT {", ".join(columns)} FROM {table} WHERE id > :after_id ORDER BY id'
+    params = {'after_id': after_id}
+    if limit is not None:
+        sql += ' LIMIT :limit'
+        params['limit'] = limit
+    return text(sql), params
 
 @app.route('/api/raw_data')
 def get_raw_data():
+    """Full export by default; ?after_id=&limit= pages one table, ?format=ndjson streams rows."""
+    table_name = request.args.get('table')
+    if table_name is not None and table_name not in RAW_DATA_TABLES:
+        return jsonify({'error': f'table must be one of {", ".join(RAW_DATA_TABLES)}'}), 400
+    after_id = request.args.get('after_id', 0, type=int)
+
+    if request.args.get('format') == 'ndjson':
+        tables = [table_name] if table_name else list(RAW_DATA_TABLES)
+        return Response(stream_with_context(stream_raw_data(tables, after_id)),
+                        mimetype='application/x-ndjson')
+    if 'limit' in request.args or 'after_id' in request.args:
+        limit = request.args.get('limit', RAW_DATA_PAGE_SIZE, type=int)
+        if not 0 < limit <= RAW_DATA_MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {RAW_DATA_MAX_PAGE_SIZE}'}), 400
+        return get_raw_data_page(table_name or 'datasets', after_id, limit)
+    return get_full_raw_data()
+
+def raw_schema_entry(schemas, id, path, definition):
+    """The parsed entry of a ``schema_info`` row, from the schema store when it holds that row."""
+    entry = schemas.get(path)
+    if entry is None or entry.id != id or entry.definition != definition:
+        # A later duplicate of a path, or a row written since the store was read
+        entry = SchemaEntry(id, path, definition)
+    return entry
+
+def raw_schema_row(entry):
+    # Invalid definitions export as null, with the parse error alongside
+    row = {'id': entry.id, 'dataset_path': entry.path, 'schema_definition': entry.schema}
+    if entry.schema is None and entry.error is not None:
+        row['error'] = entry.error
+    return row
+
+def stream_schema_line(entry):
+    if entry.schema is not None and '\n' not in entry.definition:
+        # Valid single-line JSON already; emit it verbatim rather than re-encoding
+        return (f'{{"table": "schemas", "id": {entry.id}, "dataset_path": {json.dumps(entry.path)}, '
+                f'"schema_definition": {entry.definition.strip()}}}\n')
+    # Multi-line definitions would split the record across lines, so they are re-encoded compactly
+    return json.dumps({'table': 'schemas', **raw_schema_row(entry)}, separators=(',', ':')) + '\n'
+
+def get_raw_data_page(table_name, after_id, limit):
+    sql, params = raw_data_query(table_name, after_id, limit)
+    if table_name == 'schemas':
+        schemas = get_schema_store()
+        rows = [raw_schema_row(raw_schema_entry(schemas, *row)) for row in db.session.execute(sql, params)]
+    else:
+        rows = [dict(row) for row in db.session.execute(sql, params).mappings()]
+    return jsonify({
+        table_name: rows,
+        # Pass back as ?after_id= for the next page; null once the table is exhausted
+        'next_after_id': rows[-1]['id'] if len(rows) == limit else None
+    })
+
+def stream_raw_data(tables, after_id):
+    """Yield one JSON line per row straight off a database cursor."""
+    schemas = get_schema_store() if 'schemas' in tables else None
+    with db.engine.connect() as connection:
+        connection = connection.execution_options(stream_results=True)
+        for table_name in tables:
+            sql, params = raw_data_query(table_name, after_id)
+            for batch in connection.execute(sql, params).partitions(RAW_DATA_STREAM_BATCH):
+                if table_name == 'schemas':
+                    lines = [stream_schema_line(raw_schema_entry(schemas, *row)) for row in batch]
+                else:
+                    lines = [
+                        json.dumps({'table': table_name, **dict(row._mapping)}) + '\n'
+                        for row in batch
+                    ]
+                yield ''.join(lines)
+
+@response_cache.cached
+def get_full_raw_data():
     try:
         # Get all datasets
-        datasets = Dataset.query.all()
+        datasets = db.session.query(
+            Dataset.id, Dataset.dataset_name, Dataset.type, Dataset.path
+        ).order_by(Dataset.id)
         dataset_list = [{
             'id': dataset.id,
             'dataset_name': dataset.dataset_name,
@@ -514,21 +1552,29 @@ def get_raw_data():
         } for dataset in datasets]
 
         # Get all schema information
-        schemas = SchemaInfo.query.all()
-        schema_list = [{
-            'id': schema.id,
-            'dataset_path': schema.dataset_path,
-            'schema_definition': json.loads(schema.schema_definition)
-        } for schema in schemas]
+        schema_list = [raw_schema_row(schema) for schema in get_schema_store().entries.values()]
 
         return jsonify({
             'datasets': dataset_list,
             'schemas': schema_list
         })
     except Exception as e:
-        print(f'Error fetching raw data: {str(e)}')
+        app.logger.exception('Error fetching raw data')
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics')
+def get_metrics():
+    """Request metrics of this process as JSON, or ?format=prometheus for a scraper."""
+    if request.args.get('format') == 'prometheus':
+        return app.response_class(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+    snapshot = metrics.snapshot()
+    snapshot['response_cache'] = response_cache.stats()
+    snapshot['subgraph_cache'] = subgraph_cache.stats()
+    # Reported once built; /metrics itself never triggers the build
+    if _reachability_index is not None:
+        snapshot['reachability_index'] = _reachability_index.stats()
+    return jsonify(snapshot)
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
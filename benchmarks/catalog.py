@@ -0,0 +1,219 @@
+"""Synthetic medallion-architecture catalogs for the benchmarks.
+
+Write one as NDJSON files that ``ingest.py`` loads::
+
+    python -m benchmarks.catalog --rows 100000 --out-dir /tmp/catalog
+    python ingest.py datasets /tmp/catalog/datasets.ndjson
+    python ingest.py schemas /tmp/catalog/schemas.ndjson
+
+Datasets are arranged in ``depth`` tiers: the first reads shared bronze
+sources (``/bronze/path1/``, a few of them read by many datasets), the
+middle ones read mostly the tier before them, and the last is gold. Each
+dataset reads ``fan_in`` and writes ``fan_out`` paths, and every path has a
+schema of ``columns`` columns, derived ones inheriting most of their
+columns from what they read.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+
+# Outputs a dataset picks its inputs among, around its own position in the tier before
+NEIGHBOURHOOD = 200
+# Share of a dataset's inputs read from any earlier tier rather than the one just before
+SKIP_TIER_INPUTS = 0.1
+# Share of a derived schema's columns carried over from its inputs
+INHERITED_COLUMNS = 0.7
+COLUMN_WORDS = (
+    'event', 'user', 'advertiser', 'campaign', 'creative', 'site', 'placement', 'device',
+    'browser', 'country', 'city', 'region', 'publisher', 'order', 'line_item', 'deal',
+    'auction', 'bid', 'impression', 'click', 'conversion', 'revenue', 'cost', 'session',
+)
+COLUMN_SUFFIXES = (
+    ('id', 'int64'), ('name', 'string'), ('count', 'int64'), ('time', 'timestamp'),
+    ('amount', 'double'), ('type', 'string'), ('flag', 'bool'), ('code', 'int32'),
+)
+VOCABULARY = [
+    (f'{word}_{suffix}', column_type)
+    for word in COLUMN_WORDS for suffix, column_type in COLUMN_SUFFIXES
+]
+
+
+class Catalog:
+    """Dataset rows ``(name, type, path)`` plus one schema per path, kept as
+    vocabulary positions and only rendered to JSON on demand."""
+
+    def __init__(self, dataset_rows, names, sources, outputs, schema_columns):
+        self.dataset_rows = dataset_rows
+        self.names = names
+        self.sources = sources
+        self.outputs = outputs
+        # path -> tuple of positions in VOCABULARY
+        self.schema_columns = schema_columns
+
+    @property
+    def paths(self):
+        return self.sources + self.outputs
+
+    def schema_rows(self):
+        """``(path, schema JSON)`` for every path, in the order the paths were created."""
+        for path in self.paths:
+            yield path, json.dumps(dict(VOCABULARY[i] for i in self.schema_columns[path]))
+
+
+def _inherit(rng, inherited, columns):
+    # Most columns come from the inputs, the rest are new; sorted so siblings look alike
+    size = rng.randint(*columns)
+    kept = rng.sample(inherited, min(len(inherited), int(size * INHERITED_COLUMNS)))
+    chosen = set(kept)
+    while len(chosen) < size:
+        chosen.add(rng.randrange(len(VOCABULARY)))
+    return tuple(sorted(chosen))
+
+
+def generate_catalog(rows, fan_in=(1, 4), fan_out=(1, 2), depth=3, columns=(5, 40),
+                     bronze_sources=None, seed=0):
+    """A catalog of roughly ``rows`` dataset rows.
+
+    ``fan_in``, ``fan_out`` and ``columns`` are inclusive ``(low, high)``
+    ranges; ``bronze_sources`` defaults to one per ten datasets.
+    """
+    if depth < 1:
+        raise ValueError('depth must be at least 1')
+    if columns[1] > len(VOCABULARY):
+        raise ValueError(f'at most {len(VOCABULARY)} columns per schema')
+    rng = random.Random(seed)
+    rows_per_dataset = (sum(fan_in) + sum(fan_out)) / 2
+    datasets = max(1, round(rows / rows_per_dataset))
+    if bronze_sources is None:
+        bronze_sources = max(1, datasets // 10)
+
+    sources = [f'/bronze/path{i}/' for i in range(1, bronze_sources + 1)]
+    schema_columns = {
+        source: tuple(sorted(rng.sample(range(len(VOCABULARY)), rng.randint(*columns))))
+        for source in sources
+    }
+    dataset_rows = []
+    names = []
+    outputs = []
+    tiers = [sources]
+    for tier in range(depth):
+        layer = 'gold' if tier == depth - 1 and depth > 1 else 'silver'
+        size = datasets // depth + (tier < datasets % depth)
+        previous = tiers[-1]
+        earlier = [path for paths in tiers[:-1] for path in paths]
+        written = []
+        for i in range(size):
+            number = len(names) + 1
+            name = f'{layer.capitalize()}Dataset{number}'
+            inputs = set()
+            for _ in range(rng.randint(*fan_in)):
+                if tier == 0:
+                    # Squaring skews reads towards a few heavily shared sources
+                    inputs.add(previous[int(len(previous) * rng.random() ** 2)])
+                elif earlier and rng.random() < SKIP_TIER_INPUTS:
+                    inputs.add(rng.choice(earlier))
+                else:
+                    centre = i * len(previous) // size
+                    low = max(0, centre - NEIGHBOURHOOD // 2)
+                    inputs.add(previous[rng.randrange(low, min(len(previous), low + NEIGHBOURHOOD))])
+            inherited = sorted({column for path in inputs for column in schema_columns[path]})
+            count = rng.randint(*fan_out)
+            for k in range(count):
+                path = f'/{layer}/path{number}/' if count == 1 else f'/{layer}/path{number}.{k}/'
+                schema_columns[path] = _inherit(rng, inherited, columns)
+                written.append(path)
+                dataset_rows.append((name, 'downstream', path))
+            dataset_rows.extend((name, 'upstream', path) for path in sorted(inputs))
+            names.append(name)
+        outputs.extend(written)
+        # A tier too small to read from leaves the next one reading the tier before it
+        if written:
+            tiers.append(written)
+    return Catalog(dataset_rows, names, sources, outputs, schema_columns)
+
+
+def write_sqlite(catalog, db_file):
+    """Write the bare ``dataset`` and ``schema_info`` tables, without any indexes."""
+    connection = sqlite3.connect(db_file)
+    connection.executescript("""
+        CREATE TABLE dataset (
+            id INTEGER NOT NULL PRIMARY KEY,
+            dataset_name VARCHAR(200) NOT NULL,
+            type VARCHAR(50) NOT NULL,
+            path VARCHAR(500) NOT NULL
+        );
+        CREATE TABLE schema_info (
+            id INTEGER NOT NULL PRIMARY KEY,
+            dataset_path VARCHAR(500) NOT NULL,
+            schema_definition TEXT NOT NULL
+        );
+    """)
+    connection.executemany('INSERT INTO dataset (dataset_name, type, path) VALUES (?, ?, ?)',
+                           catalog.dataset_rows)
+    connection.executemany('INSERT INTO schema_info (dataset_path, schema_definition) VALUES (?, ?)',
+                           catalog.schema_rows())
+    connection.commit()
+    connection.close()
+
+
+def write_ndjson(catalog, directory):
+    """Write ``datasets.ndjson`` and ``schemas.ndjson`` into ``directory``; returns their paths."""
+    datasets_file = os.path.join(directory, 'datasets.ndjson')
+    schemas_file = os.path.join(directory, 'schemas.ndjson')
+    with open(datasets_file, 'w') as f:
+        for name, type_, path in catalog.dataset_rows:
+            f.write(json.dumps({'name': name, 'type': type_, 'path': path}) + '\n')
+    with open(schemas_file, 'w') as f:
+        for path, schema in catalog.schema_rows():
+            f.write(json.dumps({'path': path, 'schema': schema}) + '\n')
+    return datasets_file, schemas_file
+
+
+def build_catalog(db_file, rows, seed=0):
+    """Write a default catalog of roughly ``rows`` dataset rows to ``db_file``;
+    returns its dataset names and the paths they write."""
+    catalog = generate_catalog(rows, seed=seed)
+    write_sqlite(catalog, db_file)
+    return catalog.names, catalog.outputs
+
+
+def range_argument(value):
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+
+def add_catalog_arguments(parser):
+    parser.add_argument('--fan-in', type=range_argument, default=(1, 4), help='paths read per dataset, e.g. 1-4')
+    parser.add_argument('--fan-out', type=range_argument, default=(1, 2), help='paths written per dataset')
+    parser.add_argument('--depth', type=int, default=3, help='tiers of datasets after bronze')
+    parser.add_argument('--columns', type=range_argument, default=(5, 40), help='columns per schema')
+    parser.add_argument('--bronze-sources', type=int, help='shared bronze paths (default: datasets / 10)')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def catalog_options(args):
+    return {
+        'fan_in': args.fan_in, 'fan_out': args.fan_out, 'depth': args.depth,
+        'columns': args.columns, 'bronze_sources': args.bronze_sources, 'seed': args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--out-dir', required=True)
+    add_catalog_arguments(parser)
+    args = parser.parse_args()
+
+    catalog = generate_catalog(args.rows, **catalog_options(args))
+    os.makedirs(args.out_dir, exist_ok=True)
+    for file_path in write_ndjson(catalog, args.out_dir):
+        print(f'Wrote {file_path}')
+    print(f'{len(catalog.dataset_rows)} dataset rows, {len(catalog.names)} datasets, '
+          f'{len(catalog.paths)} paths ({len(catalog.sources)} bronze sources)')
+
+
+if __name__ == '__main__':
+    main()
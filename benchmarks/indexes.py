@@ -0,0 +1,93 @@
+"""Per-endpoint latency before and after ``migrate_db.py`` on a synthetic catalog.
+
+Run from the repository root::
+
+    python -m benchmarks.indexes --rows 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from sqlalchemy import text
+from urllib.parse import quote
+
+from benchmarks.catalog import build_catalog
+
+
+def time_calls(fn, args):
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': statistics.median(samples), 'max_ms': max(samples), 'calls': len(samples)}
+
+
+def run_scenarios(app_module, names, paths, samples):
+    client = app_module.app.test_client()
+    rng = random.Random(1)
+    some_paths = rng.sample(paths, samples)
+    some_names = rng.sample(names, samples)
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+
+    def query(sql, params):
+        return lambda arg: app_module.db.session.execute(text(sql), params(arg)).fetchall()
+
+    get('/api/lineage')  # warm the lineage graph so endpoints measure lookups only
+    return {
+        'GET /api/schema/<path>': time_calls(get, [f'/api/schema/{quote(p[1:])}' for p in some_paths]),
+        'GET /api/lineage/dataset/<name>': time_calls(get, [f'/api/lineage/dataset/{quote(n)}' for n in some_names]),
+        'GET /api/lineage/dependencies/<path>?depth=2': time_calls(
+            get, [f'/api/lineage/dependencies/{quote(p[1:])}?depth=2' for p in some_paths]),
+        'SQL dataset.path': time_calls(
+            query('SELECT id FROM dataset WHERE path = :p', lambda p: {'p': p}), some_paths),
+        'SQL dataset.(path, type)': time_calls(
+            query("SELECT id FROM dataset WHERE path = :p AND type = 'upstream'", lambda p: {'p': p}), some_paths),
+        'SQL dataset.(dataset_name, type)': time_calls(
+            query("SELECT path FROM dataset WHERE dataset_name = :n AND type = 'upstream'", lambda n: {'n': n}),
+            some_names),
+        'SQL schema_info.dataset_path': time_calls(
+            query('SELECT schema_definition FROM schema_info WHERE dataset_path = :p', lambda p: {'p': p}),
+            some_paths),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--samples', type=int, default=50)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='lineage-bench-')
+    db_file = os.path.join(workdir, 'lineage.db')
+    names, paths = build_catalog(db_file, args.rows)
+    os.environ['LINEAGE_DATABASE_URI'] = f'sqlite:///{db_file}'
+
+    import app as app_module
+    import migrate_db
+
+    with app_module.app.app_context():
+        before = run_scenarios(app_module, names, paths, args.samples)
+        app_module.db.session.remove()
+        migrate_db.migrate()
+        after = run_scenarios(app_module, names, paths, args.samples)
+
+    print(f"\n{'scenario':<48}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for scenario, result in before.items():
+        b, a = result['median_ms'], after[scenario]['median_ms']
+        print(f'{scenario:<48}{b:>12.3f}{a:>12.3f}{b / a:>9.1f}x')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': args.rows, 'before': before, 'after': after}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Requests per second of ``serve.py`` as the number of workers grows.
+
+Run from the repository root::
+
+    python -m benchmarks.load --rows 20000 --workers 1 2 4 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+from benchmarks.catalog import build_catalog
+
+PORT = 5099
+
+
+def request_mix(names, paths, count, seed=0):
+    """A shuffled list of URLs: mostly uncached dependency walks, plus cached views."""
+    rng = random.Random(seed)
+    urls = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.5:
+            urls.append(f'/api/lineage/dependencies/{quote(rng.choice(paths).lstrip("/"))}?depth=3')
+        elif roll < 0.7:
+            urls.append(f'/api/lineage/dataset/{quote(rng.choice(names))}')
+        elif roll < 0.9:
+            urls.append(f'/api/search?q={quote(rng.choice(names)[-5:])}')
+        else:
+            urls.append('/api/lineage')
+    return urls
+
+
+def client(args):
+    """Issue requests over one keep-alive connection until the deadline."""
+    urls, deadline = args
+    connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+    done = errors = 0
+    i = 0
+    while time.time() < deadline:
+        connection.request('GET', urls[i % len(urls)], headers={'Accept-Encoding': 'gzip'})
+        response = connection.getresponse()
+        response.read()
+        if response.status == 200:
+            done += 1
+        else:
+            errors += 1
+        i += 1
+    connection.close()
+    return done, errors
+
+
+def wait_until_up(server, timeout=120):
+    start = time.time()
+    while time.time() - start < timeout:
+        if server.poll() is not None:
+            raise SystemExit('serve.py exited during start-up')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=5)
+            connection.request('GET', '/api/search?q=warm')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit('serve.py did not come up in time')
+
+
+def run(db_file, workers, threads, clients, seconds, urls):
+    env = dict(os.environ, LINEAGE_DATABASE_URI=f'sqlite:///{db_file}')
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--bind', f'127.0.0.1:{PORT}',
+         '--workers', str(workers), '--threads', str(threads)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(server)
+        deadline = time.time() + seconds
+        with multiprocessing.Pool(clients) as pool:
+            chunks = [(urls[i::clients], deadline) for i in range(clients)]
+            results = pool.map(client, chunks)
+    finally:
+        server.terminate()
+        server.wait()
+    done = sum(done for done, _ in results)
+    errors = sum(errors for _, errors in results)
+    return {'workers': workers, 'threads': threads, 'clients': clients,
+            'requests': done, 'errors': errors, 'rps': done / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client processes')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'lineage.db')
+        names, paths = build_catalog(db_file, args.rows)
+        urls = request_mix(names, paths, 10_000)
+        results = []
+        for workers in args.workers:
+            result = run(db_file, workers, args.threads, args.clients, args.seconds, urls)
+            results.append(result)
+            print(f"{workers} workers x {args.threads} threads: {result['rps']:,.0f} req/s "
+                  f"({result['errors']} errors)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': args.rows, 'seconds': args.seconds, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""How the lineage endpoints and ingestion scale with the size of the catalog.
+
+Run from the repository root; each size runs in a fresh process against its
+own generated catalog (see ``benchmarks/catalog.py`` for the knobs)::
+
+    python -m benchmarks.suite --rows 1000 10000 100000 --output results/HEAD.json
+    python -m benchmarks.suite --rows 1000000 --max-time 10 --output results/HEAD-1m.json
+
+Results carry the commit they were measured at; compare two runs with::
+
+    python -m benchmarks.suite --compare results/before.json results/after.json
+
+Endpoint scenarios clear the response cache before each round, so they time
+building and serializing the response rather than replaying cached bytes.
+"""
+import argparse
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from benchmarks.catalog import add_catalog_arguments, catalog_options, generate_catalog, write_ndjson
+
+DEFAULT_ROWS = (1_000, 10_000, 100_000)
+# A median this much slower than the baseline is reported as a regression
+REGRESSION_RATIO = 1.10
+
+
+def bench(fn, setup=None, min_rounds=5, max_rounds=1000, max_time=2.0):
+    """Time ``fn()`` over repeated rounds, ``setup()`` running untimed before each.
+
+    Stops after ``max_rounds`` or once ``max_time`` seconds have been spent
+    and at least ``min_rounds`` rounds are in.
+    """
+    samples = []
+    spent = 0.0
+    while len(samples) < max_rounds and (len(samples) < min_rounds or spent < max_time):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        spent += elapsed
+    return summarize(samples)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    quartiles = statistics.quantiles(ordered, n=4) if len(ordered) > 1 else [ordered[0]] * 3
+    return {
+        'rounds': len(ordered),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': statistics.fmean(ordered),
+        'stddev': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        'median': statistics.median(ordered),
+        'iqr': quartiles[2] - quartiles[0],
+        'ops': len(ordered) / sum(ordered),
+    }
+
+
+def run_size(rows, catalog_kwargs, max_time, samples):
+    """Every scenario against a fresh catalog of ``rows`` dataset rows.
+
+    Runs in its own process: ``app`` binds its database when first imported.
+    """
+    workdir = tempfile.mkdtemp(prefix='lineage-suite-')
+    try:
+        return _run_size(workdir, rows, catalog_kwargs, max_time, samples)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_size(workdir, rows, catalog_kwargs, max_time, samples):
+    catalog = generate_catalog(rows, **catalog_kwargs)
+    datasets_file, schemas_file = write_ndjson(catalog, workdir)
+    os.environ['LINEAGE_DATABASE_URI'] = f'sqlite:///{os.path.join(workdir, "lineage.db")}'
+
+    import app as app_module
+    import ingest
+
+    scenarios = {}
+    with app_module.app.app_context():
+        # Big loads get fewer rounds; each one replaces the whole table
+        scenarios['ingest datasets'] = bench(
+            lambda: ingest.ingest('datasets', datasets_file), min_rounds=1, max_time=max_time)
+        scenarios['ingest schemas'] = bench(
+            lambda: ingest.ingest('schemas', schemas_file), min_rounds=1, max_time=max_time)
+        app_module.get_lineage_graph()
+        app_module.get_schema_store()
+        app_module.db.session.remove()
+
+    client = app_module.app.test_client()
+    sizes = {}
+
+    def endpoint(urls):
+        urls = iter(urls)
+
+        def call():
+            url = next(urls)
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+            sizes[url.split('?')[0]] = len(response.get_data())
+        return call
+
+    rng = random.Random(1)
+    paths = rng.sample(catalog.paths, min(samples, len(catalog.paths)))
+
+    uncached = app_module.response_cache.clear
+    endpoints = {
+        'GET /api/lineage': itertools.cycle(['/api/lineage']),
+        'GET /api/lineage/path_view': itertools.cycle(['/api/lineage/path_view']),
+        'GET /api/lineage/dependencies/<path>?depth=3': itertools.cycle(
+            [f'/api/lineage/dependencies/{quote(path.lstrip("/"))}?depth=3' for path in paths]),
+        'GET /api/lineage/dependencies/<path>': itertools.cycle(
+            [f'/api/lineage/dependencies/{quote(path.lstrip("/"))}' for path in paths]),
+        'GET /api/schemas': itertools.cycle(['/api/schemas']),
+    }
+    for name, urls in endpoints.items():
+        scenarios[name] = bench(endpoint(urls), setup=uncached, max_time=max_time)
+
+    return {
+        'requested_rows': rows,
+        'rows': len(catalog.dataset_rows),
+        'datasets': len(catalog.names),
+        'paths': len(catalog.paths),
+        'response_bytes': sizes,
+        'scenarios': scenarios,
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit.strip(), bool(dirty.strip())
+
+
+def compare(before_file, after_file, threshold=REGRESSION_RATIO):
+    """Print the median of every scenario in both runs; returns the number of regressions."""
+    with open(before_file) as f:
+        before = json.load(f)
+    with open(after_file) as f:
+        after = json.load(f)
+    baseline = {result['requested_rows']: result['scenarios'] for result in before['results']}
+    print(f"{before.get('commit') or before_file} -> {after.get('commit') or after_file}")
+    print(f"\n{'rows':>9}  {'scenario':<46}{'before ms':>12}{'after ms':>12}{'ratio':>8}")
+    regressions = 0
+    for result in after['results']:
+        scenarios = baseline.get(result['requested_rows'])
+        if scenarios is None:
+            continue
+        for name, stats in result['scenarios'].items():
+            if name not in scenarios:
+                continue
+            b, a = scenarios[name]['median'], stats['median']
+            ratio = a / b
+            flag = ''
+            if ratio > threshold:
+                regressions += 1
+                flag = '  slower'
+            print(f"{result['requested_rows']:>9}  {name:<46}{b * 1000:>12.3f}{a * 1000:>12.3f}{ratio:>7.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=list(DEFAULT_ROWS))
+    parser.add_argument('--max-time', type=float, default=2.0, help='seconds to spend per scenario')
+    parser.add_argument('--samples', type=int, default=50, help='distinct paths for the dependency scenarios')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_RATIO,
+                        help='with --compare, exit non-zero if a median grows by more than this ratio')
+    add_catalog_arguments(parser)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    commit, dirty = git_commit()
+    options = catalog_options(args)
+    results = []
+    for rows in args.rows:
+        # A fresh interpreter per size keeps one catalog's caches out of the next
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            result = pool.submit(run_size, rows, options, args.max_time, args.samples).result()
+        results.append(result)
+        print(f"\n{result['rows']:,} rows, {result['datasets']:,} datasets, {result['paths']:,} paths")
+        for name, stats in result['scenarios'].items():
+            print(f"  {name:<46}{stats['median'] * 1000:>12.3f} ms median over {stats['rounds']} rounds")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({
+                'commit': commit,
+                'dirty': dirty,
+                'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'machine': {
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count(),
+                },
+                'catalog': options,
+                'max_time': args.max_time,
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Schemas re-validated per second by ``validate_schemas.py`` as worker processes are added.
+
+Run from the repository root::
+
+    python -m benchmarks.validation --schemas 200000 --workers 1 2 4 8
+
+A ``--delta-share`` of the schemas are stored as Delta-log actions with
+their columns in ``metaData.schemaString``, the rest as plain columns. Runs
+are dry runs, so every worker count validates the same table.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.catalog import VOCABULARY, Catalog, write_sqlite
+
+
+def delta_log_schema(columns):
+    """The Delta-log actions a schema of ``{column: type}`` is exported as."""
+    struct = {
+        'type': 'struct',
+        'fields': [
+            {'name': name, 'type': column_type, 'nullable': True, 'metadata': {}}
+            for name, column_type in columns.items()
+        ],
+    }
+    return {
+        'protocol': {'minReaderVersion': 1, 'minWriterVersion': 2},
+        'metaData': {
+            'id': '00000000-0000-0000-0000-000000000000',
+            'format': {'provider': 'parquet', 'options': {}},
+            'schemaString': json.dumps(struct),
+            'partitionColumns': [],
+            'configuration': {},
+        },
+    }
+
+
+def build_schemas(db_file, count, delta_share, columns=(5, 40), seed=0):
+    rng = random.Random(seed)
+    paths = [f'/silver/path{i}/' for i in range(1, count + 1)]
+    schema_columns = {
+        path: tuple(sorted(rng.sample(range(len(VOCABULARY)), rng.randint(*columns)))) for path in paths
+    }
+    write_sqlite(Catalog([], [], paths, [], schema_columns), db_file)
+    delta_paths = rng.sample(paths, int(count * delta_share))
+    connection = sqlite3.connect(db_file)
+    # As migrate_db.py leaves it; rewrites look schemas up by path
+    connection.execute('CREATE UNIQUE INDEX uq_schema_info_dataset_path ON schema_info (dataset_path)')
+    connection.executemany('UPDATE schema_info SET schema_definition = ? WHERE dataset_path = ?', [
+        (json.dumps(delta_log_schema(dict(VOCABULARY[i] for i in schema_columns[path]))), path)
+        for path in delta_paths
+    ])
+    connection.commit()
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--schemas', type=int, default=200_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--delta-share', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per worker count; the median is kept')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'lineage.db')
+        build_schemas(db_file, args.schemas, args.delta_share)
+        os.environ['LINEAGE_DATABASE_URI'] = f'sqlite:///{db_file}'
+        # app binds its database when first imported
+        from validate_schemas import validate_schemas
+
+        results = []
+        for workers in args.workers:
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                report = validate_schemas(workers, dry_run=True)
+                samples.append(time.perf_counter() - start)
+            seconds = statistics.median(samples)
+            results.append({'workers': workers, 'seconds': seconds, 'schemas_per_second': args.schemas / seconds,
+                            'counts': report.counts})
+            speedup = results[0]['seconds'] / seconds
+            print(f'{workers} workers: {seconds:.2f}s, {args.schemas / seconds:,.0f} schemas/s '
+                  f'({speedup:.2f}x the first)')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'schemas': args.schemas, 'delta_share': args.delta_share, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Delete schema and dataset rows matching cleanup rules in one transaction.
+
+    python cleanup.py --empty-schemas --dry-run
+    python cleanup.py --schema-path-like '%pump%' --dataset-name-like 'pump%'
+
+The doomed keys are collected set-based into temp tables in one pass over
+each table and then removed with one DELETE per table, so the cost does not
+grow with a round trip per record.
+"""
+import argparse
+
+from sqlalchemy import text
+
+from app import bulk_write, db, record_snapshot, refresh_lineage_edges
+from schema_store import SPECIAL_FIELDS
+
+SAMPLE_SIZE = 5
+
+# Mirrors schema_store.is_empty_schema in SQL (JSON1) so definitions never leave SQLite:
+# falsy JSON values and objects holding only Delta-log keys count as empty
+_SPECIAL_FIELDS_SQL = ', '.join(f"'{field}'" for field in sorted(SPECIAL_FIELDS))
+EMPTY_SCHEMA_SQL = f"""
+    CASE
+        WHEN NOT json_valid(schema_definition) THEN 0
+        WHEN json_type(schema_definition) = 'object' THEN NOT EXISTS (
+            SELECT 1 FROM json_each(schema_definition) WHERE key NOT IN ({_SPECIAL_FIELDS_SQL})
+        )
+        WHEN json_type(schema_definition) = 'array' THEN json_array_length(schema_definition) = 0
+        WHEN json_type(schema_definition) IN ('null', 'false') THEN 1
+        WHEN json_type(schema_definition) IN ('integer', 'real') THEN json_extract(schema_definition, '$') = 0
+        WHEN json_type(schema_definition) = 'text' THEN json_extract(schema_definition, '$') = ''
+        ELSE 0
+    END
+"""
+
+class CleanupReport:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.invalid_schemas = 0
+        self.schema_paths = []
+        self.dataset_names = []
+        self.deleted_schemas = 0
+        self.deleted_datasets = 0
+
+    def __str__(self):
+        verb = 'Would delete' if self.dry_run else 'Deleted'
+        lines = []
+        if self.invalid_schemas:
+            lines.append(f'Warning: {self.invalid_schemas} schemas hold invalid JSON and were left alone')
+        lines.append(f'{verb} {self.deleted_schemas} records from SchemaInfo table '
+                     f'({len(self.schema_paths)} paths)')
+        lines += [f'- {path}' for path in self.schema_paths[:SAMPLE_SIZE]]
+        lines.append(f'{verb} {self.deleted_datasets} records from Dataset table '
+                     f'({len(self.dataset_names)} dataset names)')
+        lines += [f'- {name}' for name in self.dataset_names[:SAMPLE_SIZE]]
+        return '\n'.join(lines)
+
+def dataset_name_for_path(path):
+    # The dataset writing a path is conventionally named after its last segment
+    return path.rstrip('/').split('/')[-1]
+
+def collect_doomed(connection, report, empty_schemas, schema_path_like, dataset_name_like):
+    connection.execute(text('CREATE TEMP TABLE IF NOT EXISTS doomed_schema (path TEXT PRIMARY KEY)'))
+    connection.execute(text('CREATE TEMP TABLE IF NOT EXISTS doomed_dataset (name TEXT PRIMARY KEY)'))
+
+    schema_rules = [f'dataset_path LIKE :schema_like_{i}' for i in range(len(schema_path_like))]
+    params = {f'schema_like_{i}': pattern for i, pattern in enumerate(schema_path_like)}
+    if empty_schemas:
+        schema_rules.append(EMPTY_SCHEMA_SQL)
+        report.invalid_schemas = connection.execute(text(
+            'SELECT COUNT(*) FROM schema_info WHERE NOT json_valid(schema_definition)'
+        )).scalar()
+    if schema_rules:
+        connection.execute(text(f"""
+            INSERT OR IGNORE INTO doomed_schema (path)
+            SELECT dataset_path FROM schema_info WHERE {' OR '.join(f'({rule})' for rule in schema_rules)}
+        """), params)
+    report.schema_paths = [path for path, in connection.execute(text('SELECT path FROM doomed_schema'))]
+
+    if empty_schemas:
+        # Datasets named after an emptied path go with it, as delete_empty_schemas.py always did
+        names = {dataset_name_for_path(path) for path in report.schema_paths} - {''}
+        if names:
+            connection.execute(text('INSERT OR IGNORE INTO doomed_dataset (name) VALUES (:name)'),
+                               [{'name': name} for name in names])
+    for i, pattern in enumerate(dataset_name_like):
+        connection.execute(text("""
+            INSERT OR IGNORE INTO doomed_dataset (name)
+            SELECT DISTINCT dataset_name FROM dataset WHERE dataset_name LIKE :pattern
+        """), {'pattern': pattern})
+    report.dataset_names = [name for name, in connection.execute(text('SELECT name FROM doomed_dataset'))]
+
+def cleanup(empty_schemas=False, schema_path_like=(), dataset_name_like=(), dry_run=False):
+    """Apply the cleanup rules; with ``dry_run`` everything is rolled back after counting."""
+    report = CleanupReport(dry_run)
+    with db.engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            collect_doomed(connection, report, empty_schemas, schema_path_like, dataset_name_like)
+            with bulk_write(connection):
+                report.deleted_schemas = connection.execute(text(
+                    'DELETE FROM schema_info WHERE dataset_path IN (SELECT path FROM doomed_schema)'
+                )).rowcount
+                report.deleted_datasets = connection.execute(text(
+                    'DELETE FROM dataset WHERE dataset_name IN (SELECT name FROM doomed_dataset)'
+                )).rowcount
+                if report.deleted_datasets:
+                    refresh_lineage_edges(connection)
+            record_snapshot(connection)
+        except Exception:
+            transaction.rollback()
+            raise
+        else:
+            if dry_run:
+                transaction.rollback()
+            else:
+                transaction.commit()
+        finally:
+            # Temp tables outlive the transaction on this connection
+            connection.execute(text('DROP TABLE IF EXISTS temp.doomed_schema'))
+            connection.execute(text('DROP TABLE IF EXISTS temp.doomed_dataset'))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Delete schema and dataset rows matching cleanup rules')
+    parser.add_argument('--empty-schemas', action='store_true',
+                        help='schemas that are empty or hold only Delta-log keys, plus datasets named after them')
+    parser.add_argument('--schema-path-like', action='append', default=[], metavar='PATTERN',
+                        help='SQL LIKE pattern on schema dataset_path (repeatable)')
+    parser.add_argument('--dataset-name-like', action='append', default=[], metavar='PATTERN',
+                        help='SQL LIKE pattern on dataset_name (repeatable)')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be deleted without deleting')
+    args = parser.parse_args()
+    if not (args.empty_schemas or args.schema_path_like or args.dataset_name_like):
+        parser.error('give at least one cleanup rule')
+    print(cleanup(args.empty_schemas, args.schema_path_like, args.dataset_name_like, args.dry_run))
+
+if __name__ == '__main__':
+    main()
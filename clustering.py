@@ -0,0 +1,130 @@
+from collections import Counter, defaultdict
+
+CLUSTER_MODES = ('layer', 'prefix', 'component')
+DEFAULT_PREFIX_DEPTH = 2
+
+
+def _segments(path):
+    """``(scheme or None, [segment, ...])`` of ``path``."""
+    scheme, separator, rest = path.partition('://')
+    segments = [segment for segment in (rest if separator else path).split('/') if segment]
+    return (scheme if separator else None), segments
+
+
+def path_prefix(path, depth=DEFAULT_PREFIX_DEPTH):
+    """The first ``depth`` segments of ``path``, keeping any URI scheme."""
+    scheme, segments = _segments(path)
+    prefix = '/'.join(segments[:depth])
+    return f'{scheme}://{prefix}' if scheme is not None else f'/{prefix}'
+
+
+def deepest_path(graph):
+    """The most segments any path of ``graph`` has; prefixes any deeper are the whole path."""
+    return max((len(_segments(path)[1]) for path in graph.paths), default=1)
+
+
+def connected_components(graph):
+    """``{dataset_name: component key}`` over the dataset edges, ignoring direction.
+
+    Datasets linked to no other dataset share the single ``'isolated'`` key
+    rather than each becoming a cluster of one.
+    """
+    parent = {name: name for name in graph.names}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for producer, consumer in graph.dataset_edges():
+        a, b = find(producer), find(consumer)
+        if a != b:
+            parent[b] = a
+    roots = {name: find(name) for name in graph.names}
+    sizes = Counter(roots.values())
+    numbers = {}
+    keys = {}
+    for name, root in roots.items():
+        if sizes[root] == 1:
+            keys[name] = 'isolated'
+        else:
+            keys[name] = f'component-{numbers.setdefault(root, len(numbers) + 1)}'
+    return keys
+
+
+class Clustering:
+    """Datasets of one graph version grouped into clusters, with the dataset edges
+    split into those inside a cluster and those crossing between two."""
+
+    def __init__(self, by, keys, version=None):
+        self.by = by
+        self.version = version
+        # dataset_name -> cluster key
+        self.keys = keys
+        # cluster key -> [dataset_name, ...] in graph order
+        self.members = defaultdict(list)
+        for name, key in keys.items():
+            self.members[key].append(name)
+        self.internal_edges = defaultdict(list)
+        # cluster key -> [(producer, consumer), ...] with one end in another cluster
+        self.boundary_edges = defaultdict(list)
+        # (from cluster, to cluster) -> number of dataset edges between them
+        self.cluster_edges = Counter()
+
+    @classmethod
+    def build(cls, graph, by='layer', prefix_depth=DEFAULT_PREFIX_DEPTH):
+        if by == 'layer':
+            keys = {name: graph.layer(name) or 'unlayered' for name in graph.names}
+        elif by == 'prefix':
+            # A dataset belongs where it writes; sinks-only datasets where they read
+            keys = {
+                name: path_prefix(next(iter(graph.outputs.get(name) or graph.inputs[name])), prefix_depth)
+                for name in graph.names
+            }
+        elif by == 'component':
+            keys = connected_components(graph)
+        else:
+            raise ValueError(f'cannot cluster by {by!r}')
+
+        clustering = cls(by, keys, graph.version)
+        for producer, consumer in graph.dataset_edges():
+            source, target = keys[producer], keys[consumer]
+            if source == target:
+                clustering.internal_edges[source].append((producer, consumer))
+            else:
+                clustering.cluster_edges[source, target] += 1
+                clustering.boundary_edges[source].append((producer, consumer))
+                clustering.boundary_edges[target].append((producer, consumer))
+        return clustering
+
+    def __contains__(self, key):
+        return key in self.members
+
+    def view(self, expanded=()):
+        """Collapsed clusters plus the members of ``expanded`` ones.
+
+        Returns ``(clusters, datasets, edges)``: the keys still shown as one
+        node, the dataset names shown individually, and ``{(from, to): count}``
+        where each end is ``('cluster', key)`` or ``('dataset', name)``.
+        """
+        expanded = set(expanded)
+        clusters = [key for key in self.members if key not in expanded]
+        datasets = [name for key in self.members if key in expanded for name in self.members[key]]
+
+        def end(name):
+            key = self.keys[name]
+            return ('dataset', name) if key in expanded else ('cluster', key)
+
+        edges = Counter()
+        for (source, target), count in self.cluster_edges.items():
+            if source not in expanded and target not in expanded:
+                edges[('cluster', source), ('cluster', target)] += count
+        crossing = set()
+        for key in expanded:
+            for producer, consumer in self.internal_edges[key]:
+                edges[('dataset', producer), ('dataset', consumer)] += 1
+            crossing.update(self.boundary_edges[key])
+        for producer, consumer in crossing:
+            edges[end(producer), end(consumer)] += 1
+        return clusters, datasets, edges
@@ -0,0 +1,345 @@
+"""Bulk-load datasets or schemas from Excel, CSV, Parquet or NDJSON files.
+
+    python ingest.py datasets DAGs_io_paths.xlsx
+    python ingest.py schemas Schema.xlsx --chunk-size 5000
+
+Dataset sources need ``name``, ``type`` and ``path`` columns; schema sources
+need ``path`` and ``schema``. Rows are streamed in chunks and written with
+executemany inside one transaction that replaces the table's contents.
+
+With ``--sync`` the source is diffed against the table instead and only the
+inserted, removed and changed rows are written; the resulting change set is
+recorded so running apps can patch their indexes rather than rebuild them.
+
+With ``--normalize``, schemas are parsed on a pool of ``--workers``
+processes before they are written: those exported from Delta logs are
+rewritten to the columns in their ``metaData.schemaString``, and every
+readable one is stored with its fingerprint.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from app import (
+    db, ChangeSet, Dataset, SchemaInfo, apply_lineage_edge_changes, bulk_write, record_snapshot,
+    refresh_lineage_edges,
+)
+from schema_validation import NORMALIZED, validate_chunks
+
+DATASET_TYPES = frozenset({'upstream', 'downstream'})
+DEFAULT_CHUNK_SIZE = 10000
+MAX_REPORTED_ERRORS = 10
+# Larger deltas are recorded without row detail; readers then simply rebuild
+MAX_REPLAYED_CHANGES = 10000
+KEPT_CHANGE_SETS = 100
+
+def read_csv(file_path):
+    with open(file_path, newline='') as f:
+        yield from csv.DictReader(f)
+
+def read_ndjson(file_path):
+    with open(file_path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def read_excel(file_path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise SystemExit('Reading Excel files requires openpyxl (pip install openpyxl)')
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() for cell in next(rows)]
+        for row in rows:
+            yield dict(zip(header, row))
+    finally:
+        workbook.close()
+
+def read_parquet(file_path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit('Reading Parquet files requires pyarrow (pip install pyarrow)')
+    for batch in pq.ParquetFile(file_path).iter_batches(batch_size=DEFAULT_CHUNK_SIZE):
+        yield from batch.to_pylist()
+
+READERS = {
+    '.csv': read_csv,
+    '.ndjson': read_ndjson,
+    '.jsonl': read_ndjson,
+    '.xlsx': read_excel,
+    '.xlsm': read_excel,
+    '.parquet': read_parquet,
+}
+
+def read_records(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in READERS:
+        raise SystemExit(f'Unsupported file type {extension!r}; expected one of {", ".join(READERS)}')
+    return READERS[extension](file_path)
+
+def _text(record, column):
+    value = record.get(column)
+    if not isinstance(value, str):
+        if value is None or value != value:  # missing or NaN
+            raise ValueError(f'missing {column!r}')
+        value = str(value)
+    value = value.strip()
+    if not value:
+        raise ValueError(f'empty {column!r}')
+    return value
+
+def validate_dataset(record):
+    dataset_type = _text(record, 'type').lower()
+    if dataset_type not in DATASET_TYPES:
+        raise ValueError(f"type must be 'upstream' or 'downstream', got {dataset_type!r}")
+    return _text(record, 'name'), dataset_type, _text(record, 'path')
+
+def validate_schema(record):
+    # The fingerprint is only known once the schema is parsed, i.e. with --normalize
+    return _text(record, 'path'), _text(record, 'schema'), None
+
+# kind -> (model, columns filled from each validated row tuple, row validator)
+TARGETS = {
+    'datasets': (Dataset, ('dataset_name', 'type', 'path'), validate_dataset),
+    'schemas': (SchemaInfo, ('dataset_path', 'schema_definition', 'fingerprint'), validate_schema),
+}
+
+class IngestReport:
+    def __init__(self, kind):
+        self.kind = kind
+        self.read = 0
+        self.written = 0
+        self.rejected = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    def reject(self, line, error):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'row {line}: {error}')
+
+    def __str__(self):
+        rate = self.read / self.seconds if self.seconds else 0
+        lines = [
+            f'Ingested {self.kind}: {self.read} rows read, {self.written} written, '
+            f'{self.rejected} rejected in {self.seconds:.2f}s ({rate:,.0f} rows/s)'
+        ]
+        lines += [f'  - {error}' for error in self.errors]
+        if self.rejected > len(self.errors):
+            lines.append(f'  ... and {self.rejected - len(self.errors)} more')
+        return '\n'.join(lines)
+
+def validated_chunks(records, validate, report, chunk_size):
+    """Group valid rows into lists of ``chunk_size``, recording rejects on the report."""
+    def rows():
+        for line, record in enumerate(records, start=2):  # line 1 is the header
+            report.read += 1
+            try:
+                yield validate(record)
+            except ValueError as e:
+                report.reject(line, e)
+
+    iterator = rows()
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def normalized_schemas(chunks, workers=None):
+    """Chunks of ``(path, schema, fingerprint)`` rows with Delta-log schemas replaced
+    by their columns and every readable schema fingerprinted."""
+    for chunk, results in validate_chunks(chunks, workers):
+        for position, status, rewritten, fingerprint, _ in results:
+            path, schema, _ = chunk[position]
+            chunk[position] = (path, rewritten if status == NORMALIZED else schema, fingerprint)
+        yield chunk
+
+def source_chunks(kind, file_path, report, chunk_size, normalize, workers):
+    _, _, validate = TARGETS[kind]
+    chunks = validated_chunks(read_records(file_path), validate, report, chunk_size)
+    return normalized_schemas(chunks, workers) if normalize else chunks
+
+def tune_connection(connection):
+    # WAL lets the API keep reading while we write; NORMAL is durable enough under WAL
+    connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+    connection.exec_driver_sql('PRAGMA synchronous=NORMAL')
+    connection.exec_driver_sql('PRAGMA temp_store=MEMORY')
+    connection.exec_driver_sql('PRAGMA cache_size=-65536')  # 64 MiB
+
+def ingest(kind, file_path, chunk_size=DEFAULT_CHUNK_SIZE, normalize=False, workers=None):
+    """Replace the ``kind`` table with the rows of ``file_path`` in one transaction."""
+    model, columns, _ = TARGETS[kind]
+    table = model.__table__
+    # Raw DB-API executemany skips per-row statement compilation; duplicate schema
+    # paths keep the first definition, matching what the API serves
+    insert = (f'INSERT OR IGNORE INTO {table.name} ({", ".join(columns)}) '
+              f'VALUES ({", ".join("?" * len(columns))})')
+    report = IngestReport(kind)
+    start = time.perf_counter()
+
+    with db.engine.connect() as connection:
+        tune_connection(connection)
+        with connection.begin():
+            db.metadata.create_all(connection)
+            with bulk_write(connection):
+                connection.execute(table.delete())
+                # Unique indexes back INSERT OR IGNORE and must exist during the load; the others
+                # are cheaper to build once afterwards than to maintain row by row
+                deferred = [index for index in table.indexes if not index.unique]
+                for index in table.indexes:
+                    if index.unique:
+                        connection.execute(CreateIndex(index, if_not_exists=True))
+                    else:
+                        connection.execute(DropIndex(index, if_exists=True))
+                for chunk in source_chunks(kind, file_path, report, chunk_size, normalize, workers):
+                    report.written += connection.exec_driver_sql(insert, chunk).rowcount
+                for index in deferred:
+                    connection.execute(CreateIndex(index))
+                if model is Dataset:
+                    refresh_lineage_edges(connection)
+            record_snapshot(connection)
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+def empty_change_set():
+    return {
+        'datasets': {'inserted': [], 'removed': []},
+        'schemas': {'inserted': [], 'updated': [], 'removed': []},
+    }
+
+def diff_datasets(connection, source_rows):
+    current = set(map(tuple, connection.exec_driver_sql('SELECT dataset_name, type, path FROM dataset')))
+    source = set(source_rows)
+    inserted = sorted(source - current)
+    removed = sorted(current - source)
+    if removed:
+        connection.exec_driver_sql(
+            'DELETE FROM dataset WHERE dataset_name = ? AND type = ? AND path = ?', removed)
+    if inserted:
+        connection.exec_driver_sql(
+            'INSERT INTO dataset (dataset_name, type, path) VALUES (?, ?, ?)', inserted)
+    apply_lineage_edge_changes(connection, inserted, removed)
+    return {'inserted': inserted, 'removed': removed}
+
+def diff_schemas(connection, source_rows):
+    current = {}
+    for path, definition, fingerprint in connection.exec_driver_sql(
+            'SELECT dataset_path, schema_definition, fingerprint FROM schema_info ORDER BY id'):
+        current.setdefault(path, (definition, fingerprint))
+    source = {}
+    for path, definition, fingerprint in source_rows:
+        source.setdefault(path, (definition, fingerprint))  # first definition per path wins
+
+    def changed(path):
+        (definition, fingerprint), (current_definition, current_fingerprint) = source[path], current[path]
+        return definition != current_definition or fingerprint not in (None, current_fingerprint)
+
+    inserted = sorted(source.keys() - current.keys())
+    removed = sorted(current.keys() - source.keys())
+    updated = sorted(path for path in source.keys() & current.keys() if changed(path))
+    if removed:
+        connection.exec_driver_sql('DELETE FROM schema_info WHERE dataset_path = ?',
+                                   [(path,) for path in removed])
+    if inserted:
+        connection.exec_driver_sql(
+            'INSERT INTO schema_info (dataset_path, schema_definition, fingerprint) VALUES (?, ?, ?)',
+            [(path, *source[path]) for path in inserted])
+    if updated:
+        connection.exec_driver_sql('UPDATE schema_info SET schema_definition = ? WHERE dataset_path = ?',
+                                   [(source[path][0], path) for path in updated])
+        # Separately, as rewriting a definition clears its fingerprint
+        fingerprinted = [(source[path][1], path) for path in updated if source[path][1] is not None]
+        if fingerprinted:
+            connection.exec_driver_sql('UPDATE schema_info SET fingerprint = ? WHERE dataset_path = ?',
+                                       fingerprinted)
+    return {'inserted': inserted, 'updated': updated, 'removed': removed}
+
+def record_change_set(connection, from_version, changes):
+    to_version = connection.execute(text('SELECT version FROM data_version WHERE id = 1')).scalar()
+    if to_version == from_version:
+        return
+    size = sum(len(rows) for table in changes.values() for rows in table.values())
+    connection.execute(ChangeSet.__table__.insert(), {
+        'from_version': from_version,
+        'to_version': to_version,
+        'changes': json.dumps(changes) if size <= MAX_REPLAYED_CHANGES else None,
+    })
+    connection.execute(text(
+        'DELETE FROM change_set WHERE id <= (SELECT MAX(id) FROM change_set) - :keep'
+    ), {'keep': KEPT_CHANGE_SETS})
+
+def sync(kind, file_path, chunk_size=DEFAULT_CHUNK_SIZE, normalize=False, workers=None):
+    """Bring the ``kind`` table in line with ``file_path`` by writing only the delta.
+
+    Returns the report and the change set that was applied and recorded.
+    """
+    report = IngestReport(kind)
+    start = time.perf_counter()
+    source_rows = [
+        row for chunk in source_chunks(kind, file_path, report, chunk_size, normalize, workers)
+        for row in chunk
+    ]
+
+    changes = empty_change_set()
+    with db.engine.connect() as connection:
+        tune_connection(connection)
+        with connection.begin():
+            db.metadata.create_all(connection)
+            # Take the write lock up front so the version we diff against cannot move
+            connection.exec_driver_sql('UPDATE data_version SET version = version WHERE id = 1')
+            from_version = connection.execute(text('SELECT version FROM data_version WHERE id = 1')).scalar()
+            with bulk_write(connection):
+                if kind == 'datasets':
+                    changes['datasets'] = diff_datasets(connection, source_rows)
+                else:
+                    changes['schemas'] = diff_schemas(connection, source_rows)
+            record_change_set(connection, from_version, changes)
+            record_snapshot(connection, from_version, changes)
+
+    report.written = sum(len(rows) for rows in changes[kind].values())
+    report.seconds = time.perf_counter() - start
+    return report, changes
+
+def summarize_changes(changes):
+    return ', '.join(
+        f'{table} {op}: {len(rows)}'
+        for table, ops in changes.items() for op, rows in ops.items() if rows
+    ) or 'no changes'
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-load datasets or schemas into lineage.db')
+    parser.add_argument('kind', choices=sorted(TARGETS))
+    parser.add_argument('file', help='.xlsx, .csv, .parquet or .ndjson source')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--sync', action='store_true',
+                        help='apply only the difference against the current table instead of replacing it')
+    parser.add_argument('--changes-out', help='with --sync, also write the change set as JSON to this file')
+    parser.add_argument('--normalize', action='store_true',
+                        help='schemas only: rewrite Delta-log schemas to the columns in metaData.schemaString')
+    parser.add_argument('--workers', type=int, help='with --normalize, worker processes (default: one per core)')
+    args = parser.parse_args()
+    if args.normalize and args.kind != 'schemas':
+        parser.error('--normalize applies to schemas only')
+    if not args.sync:
+        print(ingest(args.kind, args.file, args.chunk_size, args.normalize, args.workers))
+        return
+    report, changes = sync(args.kind, args.file, args.chunk_size, args.normalize, args.workers)
+    print(report)
+    print(f'Change set: {summarize_changes(changes)}')
+    if args.changes_out:
+        with open(args.changes_out, 'w') as f:
+            json.dump(changes, f)
+
+if __name__ == '__main__':
+    main()
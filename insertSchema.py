@@ -1,24 +1,7 @@
-import pandas as pd
-from app import db, Dataset, SchemaInfo
-import json
+from ingest import ingest
 
-# Clear existing data
-db.session.query(SchemaInfo).delete()
-db.session.commit()
-
-# Load the Excel file
+# Load the Excel file (replaces the current schema rows)
 file_path = "Schema.xlsx"  # Update with the correct path if needed
-df = pd.read_excel(file_path)
-
-# Insert data using SQLAlchemy
-for _, row in df.iterrows():
-    schema_info = SchemaInfo(
-        dataset_path=row['path'],
-        schema_definition=row['schema']
-    )
-    db.session.add(schema_info)
-
-# Commit the changes
-db.session.commit()
+print(ingest('schemas', file_path))
 
 print("Data inserted successfully!")
@@ -1,4 +1,4 @@
-from app import db, Dataset, SchemaInfo
+from app import db, Dataset, SchemaInfo, record_snapshot, refresh_lineage_edges
 import json
 
 # Clear existing data
@@ -85,6 +85,9 @@ for path in paths:
         schema_definition=json.dumps(schema)
     ))
 
+db.session.flush()
+refresh_lineage_edges(db.session.connection())
+record_snapshot(db.session.connection())
 db.session.commit()
 
 print("Sample data and schema information has been inserted successfully!")
@@ -0,0 +1,238 @@
+"""Per-request timing, SQL and payload metrics, kept in memory per process.
+
+Every request is attributed to its route (``GET /api/lineage``, with the URL
+rule rather than the concrete path so all datasets share one series) and
+recorded into fixed-bucket histograms: wall-clock latency, the number and
+total duration of SQL statements it executed, time spent serializing JSON
+and the size of the body sent. Requests carrying ``X-Lineage-Profile: 1``
+also get the same breakdown back as a ``Server-Timing`` header.
+"""
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask.json import JSONEncoder
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_HEADER = 'X-Lineage-Profile'
+
+# Upper bounds of the histogram buckets; anything larger lands in a final +Inf bucket
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+PAYLOAD_BUCKETS_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile; None if it is the +Inf one."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def cumulative(self):
+        """``[(upper bound, observations at or below it), ...]`` ending with ``('+Inf', count)``."""
+        buckets = []
+        seen = 0
+        for bound, count in zip((*self.bounds, '+Inf'), self.counts):
+            seen += count
+            buckets.append((bound, seen))
+        return buckets
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': self.cumulative(),
+        }
+
+
+class EndpointMetrics:
+    # Histogram attribute -> (bounds, unit suffix used in the exported names)
+    HISTOGRAMS = {
+        'latency': (LATENCY_BUCKETS_MS, 'ms'),
+        'sql_queries': (QUERY_COUNT_BUCKETS, 'count'),
+        'sql_time': (LATENCY_BUCKETS_MS, 'ms'),
+        'serialize_time': (LATENCY_BUCKETS_MS, 'ms'),
+        'payload_size': (PAYLOAD_BUCKETS_BYTES, 'bytes'),
+    }
+
+    def __init__(self):
+        self.statuses = Counter()
+        for name, (bounds, _) in self.HISTOGRAMS.items():
+            setattr(self, name, Histogram(bounds))
+
+    def snapshot(self):
+        snapshot = {'requests': self.latency.count, 'statuses': dict(self.statuses)}
+        for name, (_, unit) in self.HISTOGRAMS.items():
+            snapshot[f'{name}_{unit}'] = getattr(self, name).snapshot()
+        return snapshot
+
+
+class RequestTimer:
+    """What one request has spent so far; lives on ``flask.g``."""
+    __slots__ = ('start', 'sql_queries', 'sql_time', 'serialize_time')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+
+
+def _current_timer():
+    return g.get('_request_timer') if has_request_context() else None
+
+
+@contextmanager
+def serialization_timer():
+    """Count the enclosed block as serialization time of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer = _current_timer()
+        if timer is not None:
+            timer.serialize_time += time.perf_counter() - start
+
+
+class TimedJSONEncoder(JSONEncoder):
+    """Flask's encoder, timing every ``jsonify`` of the current request."""
+
+    def encode(self, o):
+        with serialization_timer():
+            return super().encode(o)
+
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    start = connection.info['_query_start'].pop()
+    timer = _current_timer()
+    if timer is not None:
+        timer.sql_queries += 1
+        timer.sql_time += time.perf_counter() - start
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    starts = context.connection.info.get('_query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+class Instrumentation:
+    """Flask extension recording :class:`EndpointMetrics` for every request."""
+
+    def __init__(self, app=None):
+        self.endpoints = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.json_encoder = TimedJSONEncoder
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.started = time.time()
+
+    def _before_request(self):
+        g._request_timer = RequestTimer()
+
+    def _after_request(self, response):
+        timer = g.pop('_request_timer', None)
+        if timer is None:
+            return response
+        elapsed = time.perf_counter() - timer.start
+        rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        key = f'{request.method} {rule}'
+        # Streamed bodies are still being produced; their size (and duration) is unknown here
+        size = None if response.is_streamed else response.calculate_content_length()
+
+        with self._lock:
+            metrics = self.endpoints.get(key)
+            if metrics is None:
+                metrics = self.endpoints[key] = EndpointMetrics()
+            metrics.statuses[str(response.status_code)] += 1
+            metrics.latency.observe(elapsed * 1000)
+            metrics.sql_queries.observe(timer.sql_queries)
+            metrics.sql_time.observe(timer.sql_time * 1000)
+            metrics.serialize_time.observe(timer.serialize_time * 1000)
+            if size is not None:
+                metrics.payload_size.observe(size)
+
+        if request.headers.get(PROFILE_HEADER) == '1':
+            response.headers['Server-Timing'] = ', '.join((
+                f'total;dur={elapsed * 1000:.2f}',
+                f'sql;dur={timer.sql_time * 1000:.2f};desc="{timer.sql_queries} queries"',
+                f'serialize;dur={timer.serialize_time * 1000:.2f}',
+            ))
+        return response
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {key: metrics.snapshot() for key, metrics in sorted(self.endpoints.items())}
+        return {
+            # Each worker process keeps its own metrics
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started, 3),
+            'endpoints': endpoints,
+        }
+
+    def prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            lines = []
+            for name, (_, unit) in EndpointMetrics.HISTOGRAMS.items():
+                metric = f'lineage_{name}_{unit}'
+                lines.append(f'# TYPE {metric} histogram')
+                for key, metrics in endpoints:
+                    histogram = getattr(metrics, name)
+                    label = f'endpoint="{key}"'
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                    lines.append(f'{metric}_sum{{{label}}} {histogram.sum:.3f}')
+                    lines.append(f'{metric}_count{{{label}}} {histogram.count}')
+            lines.append('# TYPE lineage_responses_total counter')
+            for key, metrics in endpoints:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'lineage_responses_total{{endpoint="{key}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,138 @@
+import numpy as np
+
+
+def encode_edges(node_ids, edges):
+    """Integer-encode ``(from, to)`` pairs against ``node_ids``.
+
+    Returns the ``src`` and ``dst`` index arrays; node ``i`` is ``node_ids[i]``.
+    """
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    src = np.fromiter((index[u] for u, _ in edges), dtype=np.int64, count=len(edges))
+    dst = np.fromiter((index[v] for _, v in edges), dtype=np.int64, count=len(edges))
+    return src, dst
+
+
+def csr(src, dst, n):
+    """Compressed sparse row adjacency: the successors of ``i`` are
+    ``targets[indptr[i]:indptr[i + 1]]``."""
+    order = np.argsort(src, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order]
+
+
+def _successors(indptr, targets, frontier):
+    """Concatenated successor lists of every node in ``frontier``."""
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return targets[:0]
+    # Position k of the output reads targets[starts[j] + (k - offset of j)]
+    offsets = np.cumsum(counts) - counts
+    return targets[np.repeat(starts - offsets, counts) + np.arange(total)]
+
+
+def peel(src, dst, n):
+    """Kahn's algorithm as vectorized frontier sweeps.
+
+    Returns each node's longest-path distance from a source, or -1 for nodes
+    that are never freed because they sit on or below a cycle.
+    """
+    indptr, targets = csr(src, dst, n)
+    in_degree = np.bincount(dst, minlength=n)
+    levels = np.full(n, -1, dtype=np.int64)
+    frontier = np.flatnonzero(in_degree == 0)
+    level = 0
+    while frontier.size:
+        levels[frontier] = level
+        reached, hits = np.unique(_successors(indptr, targets, frontier), return_counts=True)
+        in_degree[reached] -= hits
+        frontier = reached[in_degree[reached] == 0]
+        level += 1
+    return levels
+
+
+def _tarjan(nodes, src, dst, components):
+    """Label the strongly connected components among ``nodes`` in ``components``.
+
+    Iterative so long cycles cannot hit the recursion limit; ``src``/``dst``
+    must only hold edges between ``nodes``.
+    """
+    successors = {node: [] for node in nodes}
+    for u, v in zip(src, dst):
+        successors[u].append(v)
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    for root in nodes:
+        if root in index:
+            continue
+        work = [(root, iter(successors[root]))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors[child])))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        components[member] = node
+                        if member == node:
+                            break
+
+
+def strongly_connected_components(src, dst, n, forward=None):
+    """Component representative per node; nodes on no cycle represent themselves.
+
+    ``forward`` may pass in an already computed ``peel(src, dst, n)``.
+    """
+    if forward is None:
+        forward = peel(src, dst, n)
+    components = np.arange(n)
+    # A node on a cycle can be freed neither from the sources nor from the sinks,
+    # so only that (usually tiny) remainder needs the per-node search
+    tangled = (forward < 0) & (peel(dst, src, n) < 0)
+    if tangled.any():
+        inside = tangled[src] & tangled[dst]
+        _tarjan(np.flatnonzero(tangled).tolist(), src[inside].tolist(), dst[inside].tolist(), components)
+    return components
+
+
+def topological_levels(src, dst, n):
+    """Longest-path level of every node, counting from 0 at the sources.
+
+    Each cycle is collapsed to a single node first, so all of its members share
+    one level and everything below it is still layered.
+    """
+    levels = peel(src, dst, n)
+    if levels.min(initial=0) >= 0:
+        return levels  # acyclic, the common case
+    components = strongly_connected_components(src, dst, n, levels)
+    representatives, condensed = np.unique(components, return_inverse=True)
+    csrc, cdst = condensed[src], condensed[dst]
+    between = csrc != cdst
+    return peel(csrc[between], cdst[between], len(representatives))[condensed]
+
+
+def levels_by_id(node_ids, edges):
+    """``{node_id: level}`` for ``(from, to)`` pairs over ``node_ids``."""
+    node_ids = list(node_ids)
+    src, dst = encode_edges(node_ids, edges)
+    return dict(zip(node_ids, topological_levels(src, dst, len(node_ids)).tolist()))
@@ -0,0 +1,249 @@
+from collections import defaultdict
+
+# Medallion layers, recognised by a path segment of the same name
+LAYERS = ('bronze', 'silver', 'gold')
+
+
+class LineageGraph:
+    """In-memory adjacency index over the rows of the ``dataset`` table.
+
+    A row ``(name, 'upstream', path)`` means dataset ``name`` reads ``path``;
+    a row ``(name, 'downstream', path)`` means it writes ``path``. The graph
+    keeps both directions so every lineage endpoint can answer with dict
+    lookups instead of issuing one query per row.
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+        # path -> {dataset_name: None}; dicts are used as insertion-ordered sets
+        self.producers = defaultdict(dict)
+        self.consumers = defaultdict(dict)
+        # dataset_name -> {path: None}
+        self.inputs = defaultdict(dict)
+        self.outputs = defaultdict(dict)
+        # dataset_name -> {(type, path): None} in order of first appearance; repeated rows
+        # collapse into one, as they do in the node/edge tables from_edges reads
+        self.rows_by_name = {}
+        # every known path, in order of first appearance
+        self.paths = {}
+
+    @classmethod
+    def from_rows(cls, rows, version=None):
+        """Build the graph from ``(dataset_name, type, path)`` tuples in O(rows)."""
+        graph = cls(version)
+        for name, type_, path in rows:
+            graph.add(name, type_, path)
+        return graph
+
+    @classmethod
+    def from_edges(cls, nodes, edges, version=None):
+        """Build the graph from the normalized ``node``/``edge`` tables.
+
+        ``nodes`` maps a node id to ``(kind, name)`` with kind ``'path'`` or
+        ``'dataset'``; ``edges`` yields ``(src_id, dst_id)`` pairs in the
+        direction data flows (path -> reading dataset -> written path).
+        """
+        graph = cls(version)
+
+        def dataset_first(edge):
+            src_id, dst_id = edge
+            return (dst_id, src_id) if nodes[src_id][0] == 'path' else edge
+
+        for src_id, dst_id in sorted(edges, key=dataset_first):
+            (src_kind, src), (_, dst) = nodes[src_id], nodes[dst_id]
+            if src_kind == 'path':
+                graph.add(dst, 'upstream', src)
+            else:
+                graph.add(src, 'downstream', dst)
+        return graph
+
+    def copy(self):
+        graph = LineageGraph(self.version)
+        for attr in ('producers', 'consumers', 'inputs', 'outputs'):
+            target = getattr(graph, attr)
+            for key, members in getattr(self, attr).items():
+                target[key] = dict(members)
+        graph.rows_by_name = {name: dict(rows) for name, rows in self.rows_by_name.items()}
+        graph.paths = dict(self.paths)
+        return graph
+
+    def __len__(self):
+        return len(self.rows_by_name)
+
+    @property
+    def names(self):
+        return self.rows_by_name.keys()
+
+    def add(self, name, type_, path):
+        self.rows_by_name.setdefault(name, {})[(type_, path)] = None
+        self.paths.setdefault(path, None)
+        if type_ == 'upstream':
+            self.consumers[path][name] = None
+            self.inputs[name][path] = None
+        else:
+            self.producers[path][name] = None
+            self.outputs[name][path] = None
+
+    def remove(self, name, type_, path):
+        """Drop the ``(name, type, path)`` row, pruning the maps it was the last witness for."""
+        rows = self.rows_by_name.get(name)
+        if not rows or (type_, path) not in rows:
+            return
+        del rows[(type_, path)]
+        by_path, by_name = ((self.consumers, self.inputs) if type_ == 'upstream'
+                            else (self.producers, self.outputs))
+        _discard(by_path, path, name)
+        _discard(by_name, name, path)
+        if not rows:
+            del self.rows_by_name[name]
+        if path not in self.producers and path not in self.consumers:
+            self.paths.pop(path, None)
+
+    def apply(self, inserted=(), removed=()):
+        """Patch the graph in place from row-level change lists."""
+        for name, type_, path in removed:
+            self.remove(name, type_, path)
+        for name, type_, path in inserted:
+            self.add(name, type_, path)
+
+    def touched_paths(self, inserted=(), removed=()):
+        """Paths whose neighbours may differ before and after the row changes.
+
+        Call on the patched graph. A row changes the edges between its path
+        and every other path of its dataset; the dataset's paths from before
+        the change are the ones it still has plus those in ``removed``.
+        """
+        touched = set()
+        for name, _, path in [*inserted, *removed]:
+            touched.add(path)
+            touched.update(self.inputs.get(name, ()))
+            touched.update(self.outputs.get(name, ()))
+        return touched
+
+    def first_producer(self, path):
+        """Name of the dataset that writes ``path``, the first by name when several do.
+
+        Ordered by name rather than by row, so the answer is the same however
+        the graph was built or patched.
+        """
+        return min(self.producers.get(path, ()), default=None)
+
+    def layer(self, name):
+        """Medallion layer of dataset ``name``: the first of its paths (by name) naming one wins."""
+        for path in sorted({*self.inputs.get(name, ()), *self.outputs.get(name, ())}):
+            layer = path_layer(path)
+            if layer is not None:
+                return layer
+        return None
+
+    def upstream_of(self, path):
+        """Paths read by the datasets that write ``path``."""
+        return {
+            upstream_path
+            for producer in self.producers.get(path, ())
+            for upstream_path in self.inputs.get(producer, ())
+        }
+
+    def downstream_of(self, path):
+        """Paths written by the datasets that read ``path``."""
+        return {
+            downstream_path
+            for consumer in self.consumers.get(path, ())
+            for downstream_path in self.outputs.get(consumer, ())
+        }
+
+    def closure(self, path, direction='upstream', depth=None):
+        """Breadth-first walk from ``path``, returning ``{reached_path: hops}``.
+
+        The start path itself is not included unless a cycle leads back to it.
+        ``depth`` limits the walk to that many hops; ``None`` walks to the end.
+        """
+        step = self.upstream_of if direction == 'upstream' else self.downstream_of
+        hops = {}
+        frontier = [path]
+        level = 0
+        while frontier and (depth is None or level < depth):
+            level += 1
+            next_frontier = []
+            for current in frontier:
+                for neighbor in step(current):
+                    if neighbor not in hops:
+                        hops[neighbor] = level
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return hops
+
+    def multi_closure(self, paths, direction='downstream', depth=None):
+        """:meth:`closure` of every path in ``paths`` at once.
+
+        Returns ``{reached_path: (hops, sources)}`` where ``hops`` is the
+        distance from the nearest source and ``sources`` is a bitset: bit
+        ``i`` is set when ``paths[i]`` reaches the path within ``depth``.
+        The sources walk level by level together, each carrying its bit, so
+        a path is expanded once per level at which new sources arrive rather
+        than once per source.
+        """
+        step = self.upstream_of if direction == 'upstream' else self.downstream_of
+        # A path is revisited when sources reach it at different levels; look its neighbours up once
+        neighbors = {}
+        hops = {}
+        seen = {}
+        frontier = {}
+        for i, path in enumerate(paths):
+            frontier[path] = frontier.get(path, 0) | (1 << i)
+        level = 0
+        while frontier and (depth is None or level < depth):
+            level += 1
+            next_frontier = {}
+            for current, bits in frontier.items():
+                following = neighbors.get(current)
+                if following is None:
+                    following = neighbors[current] = step(current)
+                for neighbor in following:
+                    known = seen.get(neighbor)
+                    if known is None:
+                        hops[neighbor] = level
+                        seen[neighbor] = new = bits
+                    else:
+                        new = bits & ~known
+                        if not new:
+                            continue
+                        seen[neighbor] = known | new
+                    pending = next_frontier.get(neighbor)
+                    next_frontier[neighbor] = new if pending is None else pending | new
+            frontier = next_frontier
+        return {path: (hops[path], bits) for path, bits in seen.items()}
+
+    def induced_edges(self, paths):
+        """Yield ``(path, upstream_path)`` pairs with both ends in ``paths``."""
+        for path in paths:
+            for upstream_path in self.upstream_of(path):
+                if upstream_path in paths:
+                    yield path, upstream_path
+
+    def dataset_edges(self):
+        """Yield unique ``(producer, consumer)`` dataset-name pairs joined on a shared path."""
+        seen = set()
+        for name in self.rows_by_name:
+            for path in self.outputs.get(name, ()):
+                for consumer in self.consumers.get(path, ()):
+                    if (name, consumer) not in seen:
+                        seen.add((name, consumer))
+                        yield name, consumer
+
+
+def path_layer(path):
+    """Medallion layer named by a segment of ``path``, if any."""
+    for layer in LAYERS:
+        if f'/{layer}/' in path:
+            return layer
+    return None
+
+
+def _discard(mapping, key, value):
+    members = mapping.get(key)
+    if members is None:
+        return
+    members.pop(value, None)
+    if not members:
+        del mapping[key]
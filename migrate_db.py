@@ -0,0 +1,74 @@
+import argparse
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+from app import (
+    db, SchemaInfo, bulk_write, install_data_version, install_schema_fingerprints, record_snapshot,
+    refresh_lineage_edges,
+)
+
+# Schema rows other than the oldest of their path; the API only ever serves that one
+DUPLICATE_SCHEMAS = 'FROM schema_info WHERE id NOT IN (SELECT MIN(id) FROM schema_info GROUP BY dataset_path)'
+
+def count_duplicate_schemas(connection):
+    return connection.execute(text(f'SELECT COUNT(*) {DUPLICATE_SCHEMAS}')).scalar()
+
+def dedupe_schemas(connection):
+    """Keep only the oldest schema row per path so the unique index can be built"""
+    return connection.execute(text(f'DELETE {DUPLICATE_SCHEMAS}')).rowcount
+
+def migrate(dedupe=False):
+    """Bring an existing lineage.db up to the current models; safe to run repeatedly.
+
+    Duplicate schema rows are only reported, and the unique index on their
+    path left out, unless ``dedupe`` is given to delete all but the oldest.
+    """
+    with db.engine.begin() as connection:
+        # Without these the node/edge tables cannot be known to match the dataset rows
+        existing = set(inspect(connection).get_table_names())
+        edges_known = {'node', 'edge', 'data_version'} <= existing
+        # Create any tables that do not exist yet (with their indexes)
+        db.metadata.create_all(connection)
+
+        duplicates = count_duplicate_schemas(connection)
+        if duplicates and dedupe:
+            with bulk_write(connection):
+                removed = dedupe_schemas(connection)
+            print(f"Removed {removed} duplicate schema rows")
+            duplicates = 0
+        elif duplicates:
+            print(f"Found {duplicates} duplicate schema rows; skipping the unique index on their path "
+                  f"(run migrate_db.py --dedupe to keep only the oldest row per path)")
+
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if duplicates and index.unique and table is SchemaInfo.__table__:
+                    continue
+                connection.execute(CreateIndex(index, if_not_exists=True))
+                print(f"Ensured index {index.name} on {table.name}")
+
+        install_data_version(connection)
+        install_schema_fingerprints(connection)
+        # Refreshing bumps the data version, so a restart over current tables must not
+        stale = connection.execute(text('SELECT edges_stale FROM data_version WHERE id = 1')).scalar()
+        if stale or not edges_known:
+            refresh_lineage_edges(connection)
+        # The first run starts the history from the tables as they are; later ones add a
+        # snapshot only when the data version moved since the last
+        record_snapshot(connection)
+
+        # Refresh planner statistics so the new indexes are used
+        connection.execute(text("ANALYZE"))
+
+    print("Database migrated successfully!")
+
+def main():
+    parser = argparse.ArgumentParser(description='Bring an existing lineage.db up to the current models')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='delete all but the oldest schema row of each path, so its unique index can be built')
+    args = parser.parse_args()
+    migrate(args.dedupe)
+
+if __name__ == '__main__':
+    main()
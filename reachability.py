@@ -0,0 +1,260 @@
+"""Reachability labels over the lineage graph, for "does data flow from X to Y?".
+
+Paths and datasets are the nodes and every ``dataset`` row an edge, in the
+direction data flows. Cycles are condensed into single nodes, and each node
+of the resulting DAG gets a 2-hop label (pruned landmark labeling): a list
+of hubs it reaches, ``out``, and a list of hubs reaching it, ``in``, such
+that ``u`` reaches ``v`` exactly when ``out(u)`` and ``in(v)`` share a hub.
+
+Hubs are taken in decreasing order of degree, each one walking forwards and
+backwards from itself, and a walk stops wherever the labels so far already
+connect the hub to the node it got to. On lineage graphs, where a few busy
+datasets and sources sit on most routes, that keeps the labels to a handful
+of hubs per node, and a query is a small set intersection.
+"""
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from layering import csr, strongly_connected_components
+
+INDEX_FORMAT = 1
+
+
+def encode_graph(graph):
+    """Number ``graph``'s paths ``0..P-1`` and its datasets after them.
+
+    Returns ``(paths, src, dst, n)``; edges run path -> reading dataset and
+    dataset -> written path.
+    """
+    paths = list(graph.paths)
+    position = {path: i for i, path in enumerate(paths)}
+    src, dst = [], []
+    for i, name in enumerate(graph.names, start=len(paths)):
+        for path in graph.inputs.get(name, ()):
+            src.append(position[path])
+            dst.append(i)
+        for path in graph.outputs.get(name, ()):
+            src.append(i)
+            dst.append(position[path])
+    n = len(paths) + len(graph)
+    return paths, np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64), n
+
+
+def _encode_names(names):
+    encoded = [name.encode() for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_names(blob, offsets):
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[bounds[i]:bounds[i + 1]].decode() for i in range(len(bounds) - 1)]
+
+
+def fingerprint(paths, src, dst, n):
+    """Digest of the graph's shape; an index is reusable exactly when it matches."""
+    blob, offsets = _encode_names(paths)
+    digest = hashlib.blake2b(digest_size=16)
+    for array in (np.array([n]), offsets, blob, src, dst):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def _adjacency(indptr, targets):
+    indptr, targets = indptr.tolist(), targets.tolist()
+    return [targets[indptr[i]:indptr[i + 1]] for i in range(len(indptr) - 1)]
+
+
+def _flatten(labels):
+    indptr = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum([len(label) for label in labels], out=indptr[1:])
+    hubs = np.fromiter((hub for label in labels for hub in label), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, hubs
+
+
+def two_hop_labels(src, dst, n):
+    """Pruned landmark labels of the DAG ``src -> dst`` over ``n`` nodes.
+
+    Returns ``(in_labels, out_labels)``, one list of hub nodes per node.
+    """
+    successors = _adjacency(*csr(src, dst, n))
+    predecessors = _adjacency(*csr(dst, src, n))
+    # Nodes with many routes through them make the best hubs
+    degree = (np.bincount(src, minlength=n) + 1) * (np.bincount(dst, minlength=n) + 1)
+    in_labels = [[] for _ in range(n)]
+    out_labels = [[] for _ in range(n)]
+    for hub in np.argsort(-degree, kind='stable').tolist():
+        in_labels[hub].append(hub)
+        out_labels[hub].append(hub)
+        # Forwards: nodes the hub reaches get it in their in-label...
+        reaching = set(out_labels[hub])
+        seen = {hub}
+        stack = list(successors[hub])
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if not reaching.isdisjoint(in_labels[node]):
+                continue  # an earlier hub already links the two, and everything past node
+            in_labels[node].append(hub)
+            stack.extend(successors[node])
+        # ...backwards: nodes reaching the hub get it in their out-label
+        reached = set(in_labels[hub])
+        seen = {hub}
+        stack = list(predecessors[hub])
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if not reached.isdisjoint(out_labels[node]):
+                continue
+            out_labels[node].append(hub)
+            stack.extend(predecessors[node])
+    return in_labels, out_labels
+
+
+def _gather(indptr, values, nodes):
+    """``(owner, value)`` for every entry of the segments of ``nodes``; ``owner`` indexes ``nodes``."""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    owner = np.repeat(np.arange(len(nodes)), counts)
+    offsets = np.cumsum(counts) - counts
+    return owner, values[np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))]
+
+
+class ReachabilityIndex:
+    """Labels answering whether one path's data flows into another, built once
+    per graph shape and reusable across processes through :meth:`save`."""
+
+    ARRAYS = ('components', 'cyclic', 'in_indptr', 'in_hubs', 'out_indptr', 'out_hubs')
+
+    def __init__(self, paths, arrays, fingerprint, version=None, build_seconds=None):
+        self.paths = paths
+        self.position = {path: i for i, path in enumerate(paths)}
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.fingerprint = fingerprint
+        self.version = version
+        self.build_seconds = build_seconds
+        self.loaded_from = None
+
+    @classmethod
+    def build(cls, paths, src, dst, n, version=None, graph_fingerprint=None):
+        start = time.perf_counter()
+        if graph_fingerprint is None:
+            graph_fingerprint = fingerprint(paths, src, dst, n)
+        _, condensed = np.unique(strongly_connected_components(src, dst, n), return_inverse=True)
+        count = int(condensed.max()) + 1 if n else 0
+        csrc, cdst = condensed[src], condensed[dst]
+        between = csrc != cdst
+        pairs = np.unique(csrc[between] * count + cdst[between])
+        in_labels, out_labels = two_hop_labels(pairs // count, pairs % count, count)
+        in_indptr, in_hubs = _flatten(in_labels)
+        out_indptr, out_hubs = _flatten(out_labels)
+        arrays = {
+            'components': condensed.astype(np.int32),
+            # A component of several nodes is a cycle, whose members all reach themselves
+            'cyclic': np.bincount(condensed, minlength=count) > 1,
+            'in_indptr': in_indptr,
+            'in_hubs': in_hubs,
+            'out_indptr': out_indptr,
+            'out_hubs': out_hubs,
+        }
+        return cls(paths, arrays, graph_fingerprint, version, time.perf_counter() - start)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the label arrays (the path lookup table not included)."""
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def stats(self):
+        return {
+            'paths': len(self.paths),
+            'components': len(self.cyclic),
+            'label_entries': len(self.in_hubs) + len(self.out_hubs),
+            'bytes': self.nbytes,
+            'build_seconds': self.build_seconds,
+            'loaded_from': self.loaded_from,
+            'version': self.version,
+        }
+
+    def reachable_many(self, sources, targets):
+        """For node positions ``sources[i]``, ``targets[i]``: does data flow from one to the other?
+
+        As with ``LineageGraph.closure``, a path reaches itself only through a cycle.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        cu, cv = self.components[sources], self.components[targets]
+        same = cu == cv
+        # Two members of one cycle reach each other, and each reaches itself
+        result = same & ((sources != targets) | self.cyclic[cu])
+        pending = np.flatnonzero(~same)
+        out_owner, out_hubs = _gather(self.out_indptr, self.out_hubs, cu[pending])
+        in_owner, in_hubs = _gather(self.in_indptr, self.in_hubs, cv[pending])
+        # Each label holds a hub at most once, so a repeated (query, hub) key is a shared hub
+        hubs = len(self.cyclic)
+        keys = np.sort(np.concatenate((out_owner * hubs + out_hubs, in_owner * hubs + in_hubs)))
+        shared = keys[1:][keys[1:] == keys[:-1]] // hubs
+        result[pending[shared]] = True
+        return result
+
+    def reachable(self, source, target):
+        return bool(self.reachable_many([source], [target])[0])
+
+    def save(self, file_path):
+        """Write the index to ``file_path`` atomically."""
+        blob, offsets = _encode_names(self.paths)
+        tmp_path = f'{file_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                format=np.array(INDEX_FORMAT),
+                fingerprint=np.array(self.fingerprint),
+                build_seconds=np.array(self.build_seconds or 0.0),
+                path_blob=blob,
+                path_offsets=offsets,
+                **{name: getattr(self, name) for name in self.ARRAYS},
+            )
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path, expected_fingerprint, version=None):
+        """The index saved at ``file_path`` if it was built for this graph shape, else None."""
+        try:
+            with np.load(file_path) as data:
+                if int(data['format']) != INDEX_FORMAT or str(data['fingerprint']) != expected_fingerprint:
+                    return None
+                paths = _decode_names(data['path_blob'], data['path_offsets'])
+                arrays = {name: data[name] for name in cls.ARRAYS}
+                build_seconds = float(data['build_seconds'])
+        except (OSError, KeyError, ValueError):
+            return None
+        index = cls(paths, arrays, expected_fingerprint, version, build_seconds)
+        index.loaded_from = file_path
+        return index
+
+
+def load_or_build(graph, file_path=None, save=True):
+    """The reachability index of ``graph``, read from ``file_path`` when one
+    was saved for the same graph shape, otherwise built (and saved)."""
+    paths, src, dst, n = encode_graph(graph)
+    graph_fingerprint = fingerprint(paths, src, dst, n)
+    if file_path is not None:
+        index = ReachabilityIndex.load(file_path, graph_fingerprint, graph.version)
+        if index is not None:
+            return index
+    index = ReachabilityIndex.build(paths, src, dst, n, graph.version, graph_fingerprint)
+    if file_path is not None and save:
+        try:
+            index.save(file_path)
+        except OSError:
+            pass  # an unwritable directory only costs the next process a rebuild
+    return index
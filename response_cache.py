@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from functools import wraps
+import gzip
+import hashlib
+import threading
+
+from flask import current_app, g, request
+
+# Bodies smaller than this are not worth a gzip round trip
+GZIP_MIN_SIZE = 1024
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CacheEntry:
+    __slots__ = ('body', 'etag', 'mimetype', '_gzipped')
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        # Content-derived, so writes that leave this body unchanged keep the client's copy valid
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.mimetype = mimetype
+        self._gzipped = None
+
+    @property
+    def size(self):
+        # Reserves room for the gzipped copy up front, which never outgrows the body by much
+        return 2 * len(self.body) if len(self.body) >= GZIP_MIN_SIZE else len(self.body)
+
+    @property
+    def gzipped(self):
+        # Compressed once on first demand, then shared by every client accepting gzip
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+
+class ResponseCache:
+    """LRU cache of serialized JSON responses, keyed by request and data version.
+
+    The body bytes of successful responses are kept until the data version
+    moves on, or until they are the least recently used once the cache holds
+    ``max_entries`` entries or ``max_bytes`` bytes, and served with a strong
+    ETag so clients that already hold the current body get a bodiless
+    ``304 Not Modified``. Large bodies are gzipped once for clients that
+    accept it. Views that negotiate on request headers name them in ``vary``
+    so each variant is cached apart.
+    """
+
+    def __init__(self, version_provider, vary=(), max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.version_provider = version_provider
+        self.vary = tuple(vary)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = None
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key, version):
+        with self._lock:
+            if version != self.version:
+                # Everything cached for an older version is stale
+                self._entries.clear()
+                self.bytes = 0
+                self.version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, version, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key).size
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def skip(self):
+        """Called from a cached view to serve its response without keeping it."""
+        g.skip_response_cache = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def cached(self, view):
+        """Decorator caching a view that returns a JSON response."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = self.version_provider()
+            key = (request.path, request.query_string, *map(request.headers.get, self.vary))
+            entry = self._lookup(key, version)
+            if entry is None:
+                self.misses += 1
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or g.pop('skip_response_cache', False):
+                    return response
+                entry = CacheEntry(response.get_data(), response.mimetype)
+                # A write landing while the view ran may or may not be in the body, so keep it
+                # only when the version it was looked up under still holds
+                if self.version_provider() == version:
+                    self._store(key, version, entry)
+            else:
+                self.hits += 1
+
+            if len(entry.body) >= GZIP_MIN_SIZE and request.accept_encodings['gzip']:
+                response = current_app.response_class(entry.gzipped, mimetype=entry.mimetype)
+                response.content_encoding = 'gzip'
+                response.set_etag(f'{entry.etag}-gzip')
+            else:
+                response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+                response.set_etag(entry.etag)
+            response.vary.update(('Accept-Encoding', *self.vary))
+            # Let browsers keep the body but revalidate it on every use
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
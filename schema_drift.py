@@ -0,0 +1,82 @@
+from lineage_graph import path_layer
+
+
+def column_diff(upstream, downstream):
+    """Field-level difference between two ``{column: type}`` maps, as seen from downstream."""
+    return {
+        'added': [
+            {'name': name, 'type': type_} for name, type_ in sorted(downstream.items()) if name not in upstream
+        ],
+        'removed': [
+            {'name': name, 'type': type_} for name, type_ in sorted(upstream.items()) if name not in downstream
+        ],
+        'changed': [
+            {'name': name, 'from': upstream[name], 'to': downstream[name]}
+            for name in sorted(upstream.keys() & downstream.keys()) if upstream[name] != downstream[name]
+        ],
+    }
+
+
+class SchemaDrift:
+    """The path edges of the lineage graph whose two schemas differ.
+
+    An edge runs from a path a dataset reads to a path it writes. The sweep
+    compares stored (or once-computed) fingerprints only; the columns of a
+    flagged edge are diffed when :meth:`diff` asks for them, from the schema
+    entries as they were when the sweep ran.
+    """
+
+    def __init__(self, drifted, edges, unknown, entries, version=None):
+        # [(upstream_path, downstream_path, [dataset_name, ...])] sorted by path pair
+        self.drifted = drifted
+        self.edges = edges
+        # Edges with a path that has no readable schema, so nothing to compare
+        self.unknown = unknown
+        self.entries = entries
+        self.version = version
+
+    @classmethod
+    def build(cls, graph, schemas, version=None):
+        # The store swaps in a new dict on change, so this one stays consistent
+        entries = schemas.entries
+        fingerprints = {}
+
+        def fingerprint(path):
+            if path not in fingerprints:
+                entry = entries.get(path)
+                fingerprints[path] = entry.fingerprint if entry is not None else None
+            return fingerprints[path]
+
+        datasets_by_edge = {}
+        for name in graph.names:
+            outputs = graph.outputs.get(name, ())
+            for upstream in graph.inputs.get(name, ()):
+                for downstream in outputs:
+                    datasets_by_edge.setdefault((upstream, downstream), []).append(name)
+
+        drifted = []
+        unknown = 0
+        for (upstream, downstream), names in datasets_by_edge.items():
+            before, after = fingerprint(upstream), fingerprint(downstream)
+            if before is None or after is None:
+                unknown += 1
+            elif before != after:
+                drifted.append((upstream, downstream, names))
+        drifted.sort(key=lambda edge: edge[:2])
+        return cls(drifted, len(datasets_by_edge), unknown, entries, version)
+
+    def select(self, from_layer=None, to_layer=None):
+        """The drifted edges from a path of ``from_layer`` into one of ``to_layer``."""
+        return [
+            edge for edge in self.drifted
+            if (from_layer is None or path_layer(edge[0]) == from_layer)
+            and (to_layer is None or path_layer(edge[1]) == to_layer)
+        ]
+
+    def diff(self, upstream, downstream):
+        before, after = self.entries[upstream], self.entries[downstream]
+        return {
+            'from_fingerprint': before.fingerprint,
+            'to_fingerprint': after.fingerprint,
+            **column_diff(before.columns, after.columns),
+        }
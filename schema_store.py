@@ -0,0 +1,228 @@
+import hashlib
+import json
+
+# Delta-log bookkeeping keys that show up in derived schemas but are not columns
+SPECIAL_FIELDS = frozenset({'domainMetadata', 'remove', 'metaData', 'txn', 'add', 'protocol'})
+# Spark's complex types: compared as a whole rather than by their 'type' key
+NESTED_TYPES = frozenset({'struct', 'array', 'map'})
+
+
+def format_fields(schema_def):
+    """Column name -> {'type', 'description'} for the non-special fields of a schema."""
+    fields = {}
+    if isinstance(schema_def, dict):
+        for field_name, field_info in schema_def.items():
+            if field_name in SPECIAL_FIELDS:
+                continue
+            fields[field_name] = {
+                'type': str(field_info) if isinstance(field_info, str) else 'object',
+                'description': ''  # We can add descriptions later if needed
+            }
+    return fields
+
+
+def delta_fields(schema_string):
+    """``{column: type}`` of a Spark struct schema string; nested types stay objects."""
+    struct = json.loads(schema_string) if isinstance(schema_string, str) else schema_string
+    if not isinstance(struct, dict) or not isinstance(struct.get('fields'), list):
+        raise ValueError('schemaString is not a struct with fields')
+    fields = {}
+    for field in struct['fields']:
+        if not isinstance(field, dict) or not isinstance(field.get('name'), str):
+            raise ValueError('schemaString has a field without a name')
+        fields[field['name']] = field.get('type')
+    return fields
+
+
+def normalize_schema(schema_def):
+    """``schema_def`` with its Delta-log actions replaced by the columns they describe.
+
+    Returns the schema itself when there is nothing to normalize. Columns
+    stored alongside the actions win over same-named ones in the log.
+    """
+    if not isinstance(schema_def, dict) or SPECIAL_FIELDS.isdisjoint(schema_def):
+        return schema_def
+    metadata = schema_def.get('metaData')
+    schema_string = metadata.get('schemaString') if isinstance(metadata, dict) else None
+    if schema_string is None:
+        return schema_def
+    fields = delta_fields(schema_string)
+    fields.update((name, info) for name, info in schema_def.items() if name not in SPECIAL_FIELDS)
+    return fields
+
+
+def column_type(field_info):
+    """Comparable type of a column: ``'string'``, ``{'type': 'String', 'description': ...}``
+    and ``' STRING'`` all give ``'string'``; nested types become canonical JSON."""
+    if isinstance(field_info, dict) and isinstance(field_info.get('type'), str) \
+            and field_info['type'].lower() not in NESTED_TYPES:
+        field_info = field_info['type']
+    if isinstance(field_info, str):
+        return field_info.strip().lower()
+    return json.dumps(field_info, sort_keys=True, separators=(',', ':'))
+
+
+def normalized_columns(schema_def):
+    """``{column: comparable type}`` of a schema, Delta-log actions resolved.
+
+    Raises ValueError for an unreadable ``metaData.schemaString``.
+    """
+    schema_def = normalize_schema(schema_def)
+    if not isinstance(schema_def, dict):
+        return {}
+    return {name: column_type(info) for name, info in schema_def.items() if name not in SPECIAL_FIELDS}
+
+
+def schema_fingerprint(columns):
+    """Digest of :func:`normalized_columns`; equal exactly when names and types match."""
+    canonical = json.dumps(sorted(columns.items()), separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def is_empty_schema(schema_def):
+    """True for empty schemas and those holding only Delta-log bookkeeping keys."""
+    if not schema_def:
+        return True
+    return isinstance(schema_def, dict) and all(field in SPECIAL_FIELDS for field in schema_def)
+
+
+class SchemaEntry:
+    """One ``schema_info`` row with its definition parsed once.
+
+    The fingerprint is the stored one when the row has it, and is otherwise
+    computed on first use.
+    """
+
+    __slots__ = ('id', 'path', 'definition', 'schema', 'error', '_fields', '_columns', '_fingerprint')
+
+    def __init__(self, id, path, definition, fingerprint=None):
+        self.id = id
+        self.path = path
+        self.definition = definition
+        self.error = None
+        self._fields = None
+        self._columns = None
+        self._fingerprint = fingerprint
+        try:
+            self.schema = json.loads(definition)
+        except json.JSONDecodeError as e:
+            self.schema = None
+            self.error = str(e)
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            self._fields = format_fields(self.schema)
+        return self._fields
+
+    @property
+    def columns(self):
+        """:func:`normalized_columns` of the schema; None when it cannot be read."""
+        if self._columns is None and self.error is None:
+            try:
+                self._columns = normalized_columns(self.schema)
+            except ValueError as e:
+                self.error = str(e)
+        return self._columns
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None and self.columns is not None:
+            self._fingerprint = schema_fingerprint(self.columns)
+        return self._fingerprint
+
+
+class SchemaStore:
+    """Parsed schemas by dataset path, re-parsing only the definitions that changed.
+
+    Also keeps an inverted column index, ``columns``: field name ->
+    ``{dataset_path: type}``, patched for just the paths that changed.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.entries = {}
+        self.columns = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, path):
+        return self.entries.get(path)
+
+    def paths_with_column(self, field):
+        """``{dataset_path: type}`` of the schemas having column ``field``."""
+        return self.columns.get(field, {})
+
+    def _reindex(self, previous, paths):
+        """Move the column index from the ``previous`` entries to the current ones for ``paths``.
+
+        Touched fields get fresh dicts and the outer dict is swapped in whole, so
+        concurrent readers never see a dict change under them.
+        """
+        columns = dict(self.columns)
+        touched = {}
+
+        def paths_of(field):
+            if field not in touched:
+                touched[field] = dict(columns.get(field, ()))
+            return touched[field]
+
+        for path in paths:
+            old, new = previous.get(path), self.entries.get(path)
+            if old is new:
+                continue
+            if old is not None:
+                for field in old.fields:
+                    paths_of(field).pop(path, None)
+            if new is not None:
+                for field, info in new.fields.items():
+                    paths_of(field)[path] = info['type']
+        for field, field_paths in touched.items():
+            if field_paths:
+                columns[field] = field_paths
+            else:
+                columns.pop(field, None)
+        self.columns = columns
+
+    def refresh(self, rows, version=None):
+        """Reload from ``(id, dataset_path, schema_definition, fingerprint)`` rows in id order.
+
+        Entries whose definition text is unchanged are kept as they are; the
+        paths that were added, changed or removed are returned.
+        """
+        previous = self.entries
+        entries = {}
+        changed = set()
+        for id, path, definition, fingerprint in rows:
+            if path in entries:
+                continue  # first row per path wins, as with .first()
+            entry = previous.get(path)
+            if entry is None or entry.definition != definition:
+                entry = SchemaEntry(id, path, definition, fingerprint)
+                changed.add(path)
+            else:
+                entry.id = id
+            entries[path] = entry
+        changed.update(previous.keys() - entries.keys())
+        self.entries = entries
+        self._reindex(previous, changed)
+        self.version = version
+        return changed
+
+    def apply(self, rows, paths, version=None):
+        """Re-read just ``paths``: ``rows`` holds their current ``(id, dataset_path,
+        schema_definition, fingerprint)`` rows, and paths without a row are dropped.
+
+        A new entries dict is swapped in so concurrent readers keep a consistent view.
+        """
+        previous = self.entries
+        entries = dict(previous)
+        for path in paths:
+            entries.pop(path, None)
+        for id, path, definition, fingerprint in rows:
+            if path not in entries:
+                entries[path] = SchemaEntry(id, path, definition, fingerprint)
+        self.entries = entries
+        self._reindex(previous, paths)
+        self.version = version
@@ -0,0 +1,141 @@
+"""Parse, normalize and classify schema definitions, in parallel over a process pool.
+
+Schemas derived from Delta logs arrive as the log's actions (``add``,
+``remove``, ``metaData``, ``protocol``, ...) rather than as columns; the
+columns are in ``metaData.schemaString``, itself a JSON-encoded Spark
+struct. Normalizing such a schema replaces the actions with those columns,
+in the ``{column: type}`` form every other schema has.
+
+The work is pure JSON and CPU-bound, so rows are validated in chunks on a
+pool of worker processes, which also compute each schema's fingerprint. Only
+the rows that are not fine as they are come back; stored schemas are read by
+the workers themselves, by id range.
+"""
+import collections
+import concurrent.futures
+import itertools
+import json
+import os
+import sqlite3
+
+from schema_store import is_empty_schema, normalize_schema, normalized_columns, schema_fingerprint
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Outcome of validating one definition
+OK = 'ok'                    # an object of columns, stored as it should be
+NORMALIZED = 'normalized'    # columns recovered from metaData.schemaString; rewrite it
+EMPTY = 'empty'              # nothing but Delta-log actions, or a falsy value
+INVALID = 'invalid'          # not JSON, not an object, or an unreadable schemaString
+STATUSES = (OK, NORMALIZED, EMPTY, INVALID)
+
+
+def validate_definition(definition):
+    """``(status, rewritten definition, fingerprint, error)`` for one definition;
+    what does not apply is None."""
+    try:
+        schema_def = json.loads(definition)
+        normalized = normalize_schema(schema_def)
+        fingerprint = schema_fingerprint(normalized_columns(normalized))
+    except ValueError as e:  # json.JSONDecodeError included
+        return INVALID, None, None, str(e)
+    if is_empty_schema(normalized):
+        return EMPTY, None, fingerprint, None
+    if not isinstance(normalized, dict):
+        return INVALID, None, fingerprint, f'expected an object of columns, got {type(normalized).__name__}'
+    if normalized is schema_def:
+        return OK, None, fingerprint, None
+    return NORMALIZED, json.dumps(normalized, separators=(',', ':')), fingerprint, None
+
+
+def validate_chunk(rows):
+    """Validate ``(definition, stored fingerprint)`` rows.
+
+    Returns ``(position, status, rewritten, fingerprint, error)`` for every
+    row that is not OK or whose stored fingerprint is out of date, so the
+    common case costs nothing to send back. ``fingerprint`` is the one to
+    store, and None when the stored one is current and the row stays as it is.
+    """
+    results = []
+    for position, (definition, stored) in enumerate(rows):
+        status, rewritten, fingerprint, error = validate_definition(definition)
+        if fingerprint == stored and rewritten is None:
+            fingerprint = None
+        if status != OK or fingerprint is not None:
+            results.append((position, status, rewritten, fingerprint, error))
+    return results
+
+
+def validate_range(database, low, high, fingerprints=True):
+    """:func:`validate_chunk` of the ``schema_info`` rows with ``low <= id < high``,
+    read from the SQLite file ``database`` by the worker itself.
+
+    Returns the number of rows read and ``(path, status, rewritten,
+    fingerprint, error)`` for the ones reported. Without ``fingerprints``
+    the table predates the column and every fingerprint counts as missing.
+    """
+    connection = sqlite3.connect(f'file:{database}?mode=ro', uri=True)
+    try:
+        rows = connection.execute(
+            f'SELECT dataset_path, schema_definition, {"fingerprint" if fingerprints else "NULL"} '
+            'FROM schema_info WHERE id >= ? AND id < ? ORDER BY id', (low, high)).fetchall()
+    finally:
+        connection.close()
+    results = validate_chunk([row[1:] for row in rows])
+    return len(rows), [(rows[position][0], *outcome) for position, *outcome in results]
+
+
+def chunked(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def worker_count(workers=None):
+    return workers or os.cpu_count() or 1
+
+
+def _map_in_order(fn, tasks, workers):
+    """Yield ``(item, fn(*args))`` for the ``(item, args)`` of ``tasks``, in order,
+    over a pool of ``workers`` processes (or in this process for just one)."""
+    if workers == 1:
+        for item, args in tasks:
+            yield item, fn(*args)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        # A few tasks per worker in flight, rather than the whole table queued up front
+        pending = collections.deque()
+        for item, args in tasks:
+            pending.append((item, pool.submit(fn, *args)))
+            if len(pending) >= 4 * workers:
+                item, future = pending.popleft()
+                yield item, future.result()
+        for item, future in pending:
+            yield item, future.result()
+
+
+def validate_chunks(chunks, workers=None):
+    """Yield ``(chunk, results)`` in order for chunks of ``(key, definition, stored
+    fingerprint)`` rows, ``results`` being :func:`validate_chunk` of the chunk.
+
+    ``workers`` defaults to one per core; with a single worker the chunks are
+    validated in this process, skipping the pool's start-up and transfer costs.
+    """
+    tasks = ((chunk, ([row[1:] for row in chunk],)) for chunk in chunks)
+    return _map_in_order(validate_chunk, tasks, worker_count(workers))
+
+
+def validate_ranges(database, boundaries, workers=None, fingerprints=True):
+    """Yield :func:`validate_range` results, in order, for the id ranges between
+    consecutive ``boundaries`` (the last one exclusive).
+
+    Only the ranges travel to the workers and only the rows that are not OK
+    travel back, so the parent's share of the work stays small however many
+    workers there are.
+    """
+    tasks = ((None, (database, low, high, fingerprints)) for low, high in zip(boundaries, boundaries[1:]))
+    for _, result in _map_in_order(validate_range, tasks, worker_count(workers)):
+        yield result
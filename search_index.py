@@ -0,0 +1,120 @@
+from collections import Counter
+
+import numpy as np
+
+SEARCH_KINDS = ('dataset', 'path', 'field')
+# Characters after which a match counts as the start of a word
+WORD_BOUNDARIES = frozenset('/_.-:@ ')
+FEW_CANDIDATES = 256
+
+
+def trigram_codes(encoded):
+    """Each UTF-8 byte trigram of ``encoded`` packed into one integer."""
+    data = np.frombuffer(encoded, dtype=np.uint8).astype(np.int64)
+    return (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+
+
+class SearchIndex:
+    """Case-insensitive substring search over dataset names, paths and schema
+    field names, backed by a trigram index built once per data version.
+
+    Trigrams are taken over the UTF-8 bytes of the lowercased names, which
+    keeps them fixed-width integers so the whole index is built with a few
+    array sorts: ``grams`` holds the distinct trigrams, and the ids of the
+    documents containing ``grams[i]`` are ``postings[bounds[i]:bounds[i + 1]]``.
+    """
+
+    def __init__(self, documents, version=None):
+        self.version = version
+        # document id -> (kind, name, lowered name, path to show, number of paths)
+        self.documents = documents
+        encoded = [lowered.encode() for _, _, lowered, _, _ in documents]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        owner = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+        codes = trigram_codes(b''.join(encoded))
+        # Drop the trigrams straddling two documents
+        inside = owner[:-2] == owner[2:]
+        pairs = np.unique((codes[inside] << 32) | owner[:-2][inside])
+        self.grams, starts = np.unique(pairs >> 32, return_index=True)
+        self.bounds = np.append(starts, len(pairs))
+        self.postings = pairs & 0xFFFFFFFF
+
+    def __len__(self):
+        return len(self.documents)
+
+    @classmethod
+    def build(cls, graph, schemas, version=None):
+        """Index ``graph``'s datasets and paths and the fields of ``schemas``."""
+        documents = []
+
+        def add(kind, name, path, count=1):
+            documents.append((kind, name, name.lower(), path, count))
+
+        for name in graph.names:
+            # Searching for a dataset leads to the path it writes (or, failing that, reads)
+            add('dataset', name, next(iter(graph.outputs.get(name) or graph.inputs[name])))
+        for path in graph.paths:
+            add('path', path, path)
+        first_paths = {}
+        counts = Counter()
+        for entry in schemas.entries.values():
+            for field in entry.fields.keys() - first_paths.keys():
+                first_paths[field] = entry.path
+            counts.update(entry.fields.keys())
+        for field, path in first_paths.items():
+            add('field', field, path, counts[field])
+        return cls(documents, version)
+
+    def _posting(self, code):
+        i = np.searchsorted(self.grams, code)
+        if i == len(self.grams) or self.grams[i] != code:
+            return self.postings[:0]
+        return self.postings[self.bounds[i]:self.bounds[i + 1]]
+
+    def _candidates(self, query):
+        codes = np.unique(trigram_codes(query.encode()))
+        if not codes.size:
+            # Too short to have a trigram: scan every document
+            return range(len(self.documents))
+        lists = sorted(map(self._posting, codes.tolist()), key=len)
+        candidates = lists[0]
+        for posting in lists[1:]:
+            # Once few candidates are left, checking them beats intersecting long lists
+            if len(candidates) <= FEW_CANDIDATES:
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        return candidates.tolist()
+
+    def search(self, query, limit=20, kinds=SEARCH_KINDS):
+        """Best ``limit`` matches for ``query`` and the total number of matches.
+
+        Exact matches rank first, then prefixes, then matches at the start of
+        a word, then any other substring; shorter names win ties.
+        """
+        query = query.strip().lower()
+        matches = []
+        for document in self._candidates(query):
+            kind, name, lowered, path, count = self.documents[document]
+            if kind not in kinds:
+                continue
+            position = lowered.find(query)
+            if position < 0:
+                continue
+            if lowered == query:
+                rank = 0
+            elif position == 0:
+                rank = 1
+            elif lowered[position - 1] in WORD_BOUNDARIES:
+                rank = 2
+            else:
+                rank = 3
+            matches.append((rank, len(name), SEARCH_KINDS.index(kind), name, document))
+        matches.sort()
+        results = []
+        for rank, _, _, _, document in matches[:limit]:
+            kind, name, _, path, count = self.documents[document]
+            result = {'kind': kind, 'name': name, 'path': path, 'rank': rank}
+            if kind == 'field':
+                result['paths'] = count
+            results.append(result)
+        return results, len(matches)
@@ -0,0 +1,94 @@
+"""Serve the lineage app on a multi-process gunicorn server.
+
+    python serve.py --workers 4 --threads 8 --bind 0.0.0.0:5001
+
+Before forking, the master brings the database up to date, switches it to
+WAL so readers never block on a writer, and builds every in-memory index
+(lineage graph, parsed schemas, search and reachability indexes, the largest
+responses) once.
+Workers inherit them warm and share the pages copy-on-write, and open their
+own SQLite connections read-only.
+"""
+import argparse
+import gc
+import os
+
+from gunicorn.app.base import BaseApplication
+
+# Responses worth serializing once in the master rather than once per worker
+WARM_URLS = ('/api/lineage', '/api/lineage/path_view', '/api/schemas')
+
+
+class LineageServer(BaseApplication):
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def prepare(lineage_app):
+    """Migrate and warm up in the master process; returns the number of datasets."""
+    from migrate_db import migrate
+
+    app, db = lineage_app.app, lineage_app.db
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+        migrate()
+        graph = lineage_app.get_lineage_graph()
+        lineage_app.get_schema_store()
+        lineage_app.get_search_index()
+        lineage_app.get_reachability_index()
+        db.session.remove()
+    client = app.test_client()
+    for url in WARM_URLS:
+        client.get(url)
+    # Workers should report their own traffic, not the warm-up requests
+    lineage_app.metrics.reset()
+
+    # Everything from here on is read-only; connections made after the fork see it
+    app.config['LINEAGE_READ_ONLY'] = True
+    with app.app_context():
+        # Forked children must not share the master's SQLite handles
+        db.engine.dispose()
+    # Keep the collector from touching (and so copying) the inherited objects
+    gc.freeze()
+    return len(graph)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the lineage app with gunicorn')
+    parser.add_argument('--bind', default='0.0.0.0:5001')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=4, help='request threads per worker')
+    parser.add_argument('--timeout', type=int, default=60, help='seconds before a silent worker is restarted')
+    parser.add_argument('--access-log', help="file for the access log, '-' for stdout")
+    args = parser.parse_args()
+
+    # One pooled connection per request thread; read by app.py at import
+    os.environ.setdefault('LINEAGE_POOL_SIZE', str(args.threads))
+    import app as lineage_app
+
+    datasets = prepare(lineage_app)
+    print(f'Loaded {datasets} datasets; starting {args.workers} workers x {args.threads} threads on {args.bind}')
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'timeout': args.timeout,
+    }
+    if args.access_log:
+        options['accesslog'] = args.access_log
+    LineageServer(lineage_app.app, options).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+import sys
+import threading
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def estimate_size(value):
+    """Rough bytes held by ``value`` and the containers and strings inside it.
+
+    Strings shared with the lineage graph are counted again, so this errs
+    on the large side.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class _Entry:
+    __slots__ = ('value', 'footprint', 'size')
+
+    def __init__(self, value, footprint, size):
+        self.value = value
+        self.footprint = footprint
+        self.size = size
+
+
+class SubgraphCache:
+    """LRU cache of computed lineage neighbourhoods, bounded by entry count and bytes.
+
+    Every entry is stored with its footprint, the paths it was computed
+    from, and is valid for the data version the cache is at. When the data
+    moves on with known row changes, :meth:`advance` evicts only the entries
+    whose footprint holds a touched path and carries the rest over to the
+    new version; otherwise everything is dropped. Values are shared between
+    requests and must not be mutated.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = None
+        self.bytes = 0
+        self._entries = OrderedDict()
+        # path -> keys of the entries whose footprint holds it
+        self._keys_by_path = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Entries dropped to stay within bounds, and because their paths changed
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key) if version == self.version else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key, version, value, footprint):
+        """Store ``value`` computed from the paths in ``footprint`` at ``version``."""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # Computed from a graph the cache has already moved past (or not yet reached)
+            if version != self.version:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(value, frozenset(footprint), size)
+            self.bytes += size
+            for path in footprint:
+                self._keys_by_path.setdefault(path, set()).add(key)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        for path in entry.footprint:
+            keys = self._keys_by_path[path]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_path[path]
+
+    def advance(self, version, touched_paths=None):
+        """Move to ``version``, evicting the entries touching ``touched_paths``,
+        or every entry when the changes are unknown (None)."""
+        with self._lock:
+            if touched_paths is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._keys_by_path.clear()
+                self.bytes = 0
+            else:
+                stale = set()
+                for path in touched_paths:
+                    stale.update(self._keys_by_path.get(path, ()))
+                for key in stale:
+                    self._drop(key)
+                self.invalidations += len(stale)
+            self.version = version
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,81 @@
+"""Fixtures shared by the test modules, which all run against one throwaway database.
+
+Every writer bumps the data version, and the app's in-memory indexes key on it,
+so tests load the rows they need through ``load`` rather than resetting tables.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Read by app.py at import time
+os.environ['LINEAGE_DATABASE_URI'] = 'sqlite:///' + os.path.join(
+    tempfile.mkdtemp(prefix='lineage-tests-'), 'lineage.db')
+
+import app as lineage_app
+from ingest import ingest, sync
+
+
+@pytest.fixture(autouse=True)
+def app_context():
+    with lineage_app.app.app_context():
+        lineage_app.db.create_all()
+        yield
+        lineage_app.db.session.remove()
+
+
+@pytest.fixture
+def client():
+    return lineage_app.app.test_client()
+
+
+# kind -> fields of an NDJSON record, in row tuple order
+RECORD_FIELDS = {'datasets': ('name', 'type', 'path'), 'schemas': ('path', 'schema')}
+
+
+@pytest.fixture
+def load(tmp_path):
+    """``load(rows, incremental=False, kind='datasets')`` replaces the ``kind``
+    table with ``rows`` (``(name, type, path)``, or ``(path, schema)`` for
+    schemas), through ingest.py --sync when ``incremental``; returns the data
+    version it left behind."""
+    files = iter(range(1, 1_000_000))
+
+    def load(rows, incremental=False, kind='datasets'):
+        file_path = tmp_path / f'{kind}-{next(files)}.ndjson'
+        with open(file_path, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(dict(zip(RECORD_FIELDS[kind], row))) + '\n')
+        (sync if incremental else ingest)(kind, str(file_path))
+        return lineage_app.current_data_version()
+    return load
+
+
+def random_rows(seed, datasets=30, paths=40):
+    """Dataset rows over a small pool of paths, so the graph is dense and cyclic."""
+    rng = random.Random(seed)
+    pool = [f'/{rng.choice(("bronze", "silver", "gold"))}/path{i}/' for i in range(paths)]
+    rows = []
+    for i in range(datasets):
+        rows += [(f'Dataset{i}', 'upstream', path) for path in rng.sample(pool, rng.randint(1, 3))]
+        rows += [(f'Dataset{i}', 'downstream', path) for path in rng.sample(pool, rng.randint(1, 2))]
+    return rows
+
+
+def graph_rows(graph):
+    """The ``(name, type, path)`` rows ``graph`` holds, as a set."""
+    return {(name, type_, path) for name, rows in graph.rows_by_name.items() for type_, path in rows}
+
+
+def mutate(rows, seed):
+    """``rows`` with some removed and a few new rows, some of them on new paths."""
+    rng = random.Random(seed)
+    kept = [row for row in rows if rng.random() > 0.2]
+    added = [(f'Dataset{rng.randrange(40)}', rng.choice(('upstream', 'downstream')), f'/silver/new{i}/')
+             for i in range(5)]
+    added += rng.sample(random_rows(seed + 100), 10)
+    return kept + added
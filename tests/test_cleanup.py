@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import app as lineage_app
+from cleanup import EMPTY_SCHEMA_SQL, cleanup
+from schema_store import is_empty_schema
+
+DEFINITIONS = [
+    {}, [], None, False, True, 0, 0.0, 1, 2.5, '', 'x', [1], [[]],
+    {'fields': []}, {'metaData': {}}, {'add': 1, 'remove': 2, 'protocol': {}},
+    {'metaData': {}, 'fields': [{'name': 'id'}]}, {'txn': None, 'other': None},
+]
+
+
+@pytest.mark.parametrize('schema', DEFINITIONS, ids=json.dumps)
+def test_the_sql_emptiness_rule_matches_is_empty_schema(schema):
+    with lineage_app.db.engine.connect() as connection:
+        empty = connection.execute(lineage_app.text(
+            f'SELECT {EMPTY_SCHEMA_SQL} FROM (SELECT :definition AS schema_definition)'
+        ), {'definition': json.dumps(schema)}).scalar()
+    assert bool(empty) == is_empty_schema(schema)
+
+
+def test_cleanup_removes_empty_schemas_and_their_datasets(load):
+    load([('/gold/empty/', '{}'), ('/gold/delta/', json.dumps({'metaData': {}})),
+          ('/gold/kept/', json.dumps({'fields': [{'name': 'id'}]})), ('/gold/broken/', '{')], kind='schemas')
+    load([('empty', 'downstream', '/gold/empty/'), ('kept', 'downstream', '/gold/kept/'),
+          ('pump_a', 'upstream', '/gold/kept/')])
+
+    def remaining():
+        with lineage_app.db.engine.connect() as connection:
+            paths = {path for path, in connection.execute(lineage_app.text('SELECT dataset_path FROM schema_info'))}
+            names = {name for name, in connection.execute(lineage_app.text('SELECT dataset_name FROM dataset'))}
+        return paths, names
+
+    before = remaining()
+    version = lineage_app.current_data_version()
+    report = cleanup(empty_schemas=True, dataset_name_like=['pump%'], dry_run=True)
+    assert sorted(report.schema_paths) == ['/gold/delta/', '/gold/empty/']
+    assert sorted(report.dataset_names) == ['delta', 'empty', 'pump_a']
+    assert report.invalid_schemas == 1
+    assert remaining() == before
+    assert lineage_app.current_data_version() == version
+
+    report = cleanup(empty_schemas=True, dataset_name_like=['pump%'])
+    assert (report.deleted_schemas, report.deleted_datasets) == (2, 2)
+    assert remaining() == ({'/gold/kept/', '/gold/broken/'}, {'kept'})
+    assert set(lineage_app.get_lineage_graph().rows_by_name) == {'kept'}
@@ -0,0 +1,66 @@
+import pytest
+
+import app as lineage_app
+from clustering import Clustering, path_prefix
+from conftest import random_rows
+from lineage_graph import LineageGraph
+
+
+def test_prefixes_keep_the_scheme_and_stop_at_the_path():
+    assert path_prefix('/gold/sales/daily/', 2) == '/gold/sales'
+    assert path_prefix('s3://bucket/gold/sales/', 1) == 's3://bucket'
+    assert path_prefix('/gold/', 5) == '/gold'
+
+
+@pytest.mark.parametrize('by', ['layer', 'prefix', 'component'])
+def test_a_clustering_accounts_for_every_dataset_and_edge(by):
+    graph = LineageGraph.from_rows(random_rows(11))
+    clustering = Clustering.build(graph, by)
+    assert sorted(name for members in clustering.members.values() for name in members) == sorted(graph.names)
+    edges = list(graph.dataset_edges())
+    internal = sum(map(len, clustering.internal_edges.values()))
+    assert internal + sum(clustering.cluster_edges.values()) == len(edges)
+
+    # Collapsed, every dataset edge is counted once; fully expanded, the view is the dataset graph
+    clusters, datasets, view = clustering.view()
+    assert sorted(clusters) == sorted(clustering.members) and datasets == []
+    assert sum(view.values()) == len(edges) - internal
+    clusters, datasets, view = clustering.view(clustering.members)
+    assert clusters == [] and sorted(datasets) == sorted(graph.names)
+    assert view == {(('dataset', producer), ('dataset', consumer)): 1 for producer, consumer in edges}
+
+
+def test_components_group_linked_datasets():
+    graph = LineageGraph.from_rows([
+        ('A', 'downstream', '/x/'), ('B', 'upstream', '/x/'), ('C', 'downstream', '/y/')])
+    keys = Clustering.build(graph, 'component').keys
+    assert keys['A'] == keys['B'] != keys['C'] == 'isolated'
+
+
+def test_clusters_endpoint_expands_a_cluster(client, load):
+    load(random_rows(12))
+    body = client.get('/api/lineage/clusters?by=layer').get_json()
+    clusters = {node['cluster'] for node in body['nodes']}
+    assert all(node['group'] == 'cluster' for node in body['nodes'])
+
+    expanded = sorted(clusters)[0]
+    body = client.get(f'/api/lineage/clusters?by=layer&expand={expanded}').get_json()
+    members = [node for node in body['nodes'] if node['group'] != 'cluster']
+    assert members and {node['cluster'] for node in members} == {expanded}
+    assert client.get('/api/lineage/clusters?by=layer&expand=nowhere').status_code == 404
+    assert client.get('/api/lineage/clusters?prefix_depth=0').status_code == 400
+
+
+def test_clusterings_are_bounded_and_share_depths_past_the_deepest_path(load, monkeypatch):
+    load(random_rows(13))
+    monkeypatch.setattr(lineage_app, 'CLUSTERING_CACHE_SIZE', 3)
+    deepest = lineage_app.get_clustering('prefix', 10)
+    assert lineage_app.get_clustering('prefix', 10 ** 9) is deepest
+    for depth in range(1, 6):
+        lineage_app.get_clustering('prefix', depth)
+    assert lineage_app.get_clustering('layer', 7) is lineage_app.get_clustering('layer')
+    assert len(lineage_app._clusterings) == 3
+
+    load(random_rows(14))
+    lineage_app.get_clustering('layer')
+    assert list(lineage_app._clusterings) == [('layer', None)]
@@ -0,0 +1,61 @@
+import json
+import random
+
+import pytest
+
+import app as lineage_app
+
+TYPES = ('string', 'long', 'double')
+
+
+def random_schemas(seed, paths):
+    rng = random.Random(seed)
+    return [(path, json.dumps({f'col{i}': rng.choice(TYPES) for i in rng.sample(range(12), rng.randint(1, 5))}))
+            for path in paths]
+
+
+def scanned_columns(store):
+    columns = {}
+    for path, entry in store.entries.items():
+        for field, info in entry.fields.items():
+            columns.setdefault(field, {})[path] = info['type']
+    return columns
+
+
+def test_the_index_kept_up_across_syncs_matches_a_scan(load, monkeypatch):
+    paths = [f'/gold/table{i}/' for i in range(30)]
+    schemas = random_schemas(0, paths)
+    load(schemas, kind='schemas')
+    store = lineage_app.get_schema_store()
+    # From here on the index must be patched from the change sets, not rebuilt
+    monkeypatch.setattr(store, 'refresh', lambda *args: pytest.fail('schema store was rebuilt'))
+    rng = random.Random(1)
+    for step in range(4):
+        # Change some definitions, drop some paths and add new ones
+        schemas = [row for row in schemas if rng.random() > 0.2]
+        schemas = random_schemas(step + 10, rng.sample(paths, 8)) + schemas
+        schemas = list({path: (path, definition) for path, definition in reversed(schemas)}.values())
+        load(schemas, incremental=True, kind='schemas')
+        assert lineage_app.get_schema_store() is store
+        assert store.columns == scanned_columns(store)
+        assert store.entries.keys() == {path for path, _ in schemas}
+
+
+def test_columns_join_to_lineage(client, load):
+    load([('Raw', 'upstream', '/bronze/raw/'), ('Raw', 'downstream', '/silver/clean/'),
+          ('Mart', 'upstream', '/silver/clean/'), ('Mart', 'downstream', '/gold/mart/')])
+    load([('/bronze/raw/', json.dumps({'customer_id': 'string'})),
+          ('/silver/clean/', json.dumps({'customer_id': 'long'})),
+          ('/gold/mart/', json.dumps({'customer_id': 'long', 'total': 'double'}))], kind='schemas')
+
+    body = client.get('/api/columns/customer_id').get_json()
+    assert [path['path'] for path in body['paths']] == ['/bronze/raw/', '/gold/mart/', '/silver/clean/']
+    body = client.get('/api/columns/customer_id?type=long').get_json()
+    assert body['count'] == 2
+    body = client.get('/api/columns/customer_id?upstream_of=/gold/mart/').get_json()
+    assert [(path['path'], path['hops']) for path in body['paths']] == [('/silver/clean/', 1), ('/bronze/raw/', 2)]
+    body = client.get('/api/columns/customer_id?upstream_of=/gold/mart/&depth=1').get_json()
+    assert [path['path'] for path in body['paths']] == ['/silver/clean/']
+    assert client.get('/api/columns/total?downstream_of=/bronze/raw/').get_json()['count'] == 1
+    assert client.get('/api/columns/x?upstream_of=/a/&downstream_of=/b/').status_code == 400
+    assert client.get('/api/columns/x?upstream_of=/nowhere/').status_code == 404
@@ -0,0 +1,73 @@
+import json
+import random
+
+from conftest import random_rows
+from lineage_graph import LineageGraph
+from schema_drift import column_diff
+from schema_store import normalized_columns
+
+
+def random_schemas(seed, paths):
+    rng = random.Random(seed)
+    # Few columns and types, spelled in different cases, so many edges match
+    return [(path, json.dumps({f'col{i}': rng.choice(('string', 'STRING', 'long')) for i in range(rng.randint(1, 2))}))
+            for path in paths]
+
+
+def test_column_diff_is_seen_from_downstream():
+    assert column_diff({'a': 'long', 'b': 'string', 'c': 'int'}, {'a': 'long', 'b': 'long', 'd': 'date'}) == {
+        'added': [{'name': 'd', 'type': 'date'}],
+        'removed': [{'name': 'c', 'type': 'int'}],
+        'changed': [{'name': 'b', 'from': 'string', 'to': 'long'}],
+    }
+
+
+def test_the_sweep_flags_exactly_the_edges_whose_columns_differ(client, load):
+    rows = random_rows(18)
+    load(rows)
+    paths = sorted({path for _, _, path in rows})
+    schemas = random_schemas(18, paths[:-3]) + [(paths[-3], '{"broken": ')]  # two paths have none
+    load(schemas, kind='schemas')
+
+    columns = {}
+    for path, definition in schemas:
+        try:
+            columns[path] = normalized_columns(json.loads(definition))
+        except ValueError:
+            pass
+    graph = LineageGraph.from_rows(rows)
+    edges = {(upstream, downstream) for name in graph.names
+             for upstream in graph.inputs.get(name, ()) for downstream in graph.outputs.get(name, ())}
+    known = {edge for edge in edges if edge[0] in columns and edge[1] in columns}
+    expected = sorted(edge for edge in known if columns[edge[0]] != columns[edge[1]])
+    assert expected and len(expected) < len(known)
+
+    body = client.get('/api/schemas/drift?limit=1000').get_json()
+    assert (body['edges'], body['unknown'], body['drifted']) == (len(edges), len(edges - known), len(expected))
+    assert [(result['from'], result['to']) for result in body['results']] == expected
+    for result in body['results']:
+        diff = column_diff(columns[result['from']], columns[result['to']])
+        assert {key: result[key] for key in diff} == diff
+
+    page = client.get('/api/schemas/drift?limit=2&offset=1').get_json()
+    assert page['results'] == body['results'][1:3]
+    gold = client.get('/api/schemas/drift?to_layer=gold&limit=1000').get_json()
+    assert [result['to'] for result in gold['results']] == [to for _, to in expected if to.startswith('/gold/')]
+    assert client.get('/api/schemas/drift?from_layer=platinum').status_code == 400
+
+
+def test_diff_compares_normalized_types(client, load):
+    load([('/bronze/a/', json.dumps({'id': 'STRING', 'n': 'long'})),
+          ('/silver/a/', json.dumps({'id': {'type': 'string'}, 'n': 'long'})),
+          ('/gold/a/', json.dumps({'id': 'string', 'total': 'double'})),
+          ('/gold/broken/', '[')], kind='schemas')
+
+    body = client.get('/api/schemas/diff?from=/bronze/a/&to=/silver/a/').get_json()
+    assert body['identical'] and body['from_fingerprint'] == body['to_fingerprint']
+    body = client.get('/api/schemas/diff?from=bronze/a/&to=/gold/a/').get_json()
+    assert not body['identical']
+    assert body['added'] == [{'name': 'total', 'type': 'double'}]
+    assert body['removed'] == [{'name': 'n', 'type': 'long'}]
+    assert client.get('/api/schemas/diff?from=/bronze/a/&to=/nowhere/').status_code == 404
+    assert client.get('/api/schemas/diff?from=/bronze/a/&to=/gold/broken/').status_code == 500
+    assert client.get('/api/schemas/diff?from=/bronze/a/').status_code == 400
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+import app as lineage_app
+from conftest import graph_rows, mutate, random_rows
+
+
+def canonical(value):
+    """``value`` with every list sorted, so patched and rebuilt graphs compare equal
+    whatever order they hold their rows in."""
+    if isinstance(value, dict):
+        return {key: canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return sorted((canonical(item) for item in value), key=lambda item: json.dumps(item, sort_keys=True))
+    return value
+
+
+def schema_rows(rows, step):
+    """One schema per path, whose columns change from step to step on some paths."""
+    paths = sorted({path for _, _, path in rows})
+    return [(path, json.dumps({'id': 'int64', f'c{(i * step) % 3}': 'string'})) for i, path in enumerate(paths)]
+
+
+def snapshot_urls(rows):
+    names = sorted({name for name, _, _ in rows})[:3]
+    paths = sorted({path for _, _, path in rows})[:3]
+    return [
+        '/api/lineage',
+        '/api/lineage/path_view',
+        *(f'/api/lineage/dataset/{name}' for name in names),
+        *(f'/api/lineage/dependencies{path}' for path in paths),
+        *(f'/api/schema{path}' for path in paths),
+    ]
+
+
+def test_as_of_answers_what_the_live_api_answered_at_each_snapshot(client, load):
+    rows = random_rows(20)
+    history = []
+    for step in range(4):
+        if step:
+            rows = mutate(rows, 20 + step)
+        load(rows, incremental=step > 0)
+        version = load(schema_rows(rows, step), incremental=step > 0, kind='schemas')
+        answers = {url: client.get(url).get_json() for url in snapshot_urls(rows)}
+        history.append((version, set(rows), answers))
+
+    for version, rows, answers in history:
+        assert graph_rows(lineage_app.graph_as_of(version)) == rows
+        for url, answer in answers.items():
+            response = client.get(url, query_string={'as_of': version})
+            assert response.status_code == 200, url
+            assert canonical(response.get_json()) == canonical(answer), url
+
+
+def test_as_of_without_a_snapshot_of_the_live_version_reads_the_history(load):
+    rows = random_rows(21)
+    version = load(rows)
+    load(mutate(rows, 21), incremental=True)
+    # Written around the app's writers, so the live version has no snapshot to patch back from
+    with lineage_app.db.engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO dataset (dataset_name, type, path) VALUES ('Shell', 'downstream', '/gold/shell/')")
+    lineage_app._history_graphs.clear()
+
+    assert graph_rows(lineage_app.graph_as_of(version)) == set(rows)
+
+
+def test_as_of_names_the_latest_snapshot_at_or_before_it(client, load):
+    first = load(random_rows(22))
+    with lineage_app.db.engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO dataset (dataset_name, type, path) VALUES ('X', 'upstream', '/x/')")
+    live = lineage_app.current_data_version()
+
+    assert lineage_app.snapshot_version(str(live)) == first
+    assert lineage_app.snapshot_version('2000-01-01') is None
+    body = client.get('/api/lineage/snapshots').get_json()
+    assert body['snapshots'][0]['version'] == first
+
+
+@pytest.mark.parametrize('as_of, status', [('-1', 404), ('1999-12-31T23:00:00Z', 404), ('yesterday', 400)])
+def test_as_of_errors(client, load, as_of, status):
+    load(random_rows(23))
+    assert client.get('/api/lineage', query_string={'as_of': as_of}).status_code == status
+
+
+def test_only_as_of_requests_bypass_the_live_indexes(client, load, monkeypatch):
+    rows = random_rows(23)
+    first = load(rows)
+    load(mutate(rows, 23), incremental=True)
+    live_graph = lineage_app.get_lineage_graph
+
+    def swapped_after_reading():
+        # Another request swaps in a new graph object right after this one read it
+        graph = live_graph()
+        lineage_app._lineage_graph = graph.copy()
+        return graph
+
+    monkeypatch.setattr(lineage_app, 'get_lineage_graph', swapped_after_reading)
+    index_reads = []
+    live_index = lineage_app.get_reachability_index
+    monkeypatch.setattr(lineage_app, 'get_reachability_index', lambda: index_reads.append(1) or live_index())
+    lineage_app._clusterings.clear()
+
+    source, target = sorted(live_graph().paths)[:2]
+    query = {'from': source, 'to': target}
+    assert client.get('/api/lineage/reachable', query_string=query).status_code == 200
+    assert client.get('/api/lineage/clusters').status_code == 200
+    assert len(index_reads) == 1 and len(lineage_app._clusterings) == 1
+
+    old = lineage_app.graph_as_of(first)
+    query = {'from': sorted(old.paths)[0], 'to': sorted(old.paths)[1], 'as_of': first}
+    body = client.get('/api/lineage/reachable', query_string=query).get_json()
+    assert body['reachable'] == (query['to'] in old.closure(query['from'], 'downstream'))
+    assert client.get('/api/lineage/clusters', query_string={'as_of': first}).status_code == 200
+    assert len(index_reads) == 1 and len(lineage_app._clusterings) == 1
@@ -0,0 +1,65 @@
+import random
+from functools import lru_cache
+
+import numpy as np
+import pytest
+
+from layering import levels_by_id, strongly_connected_components
+
+
+def reachable(n, edges):
+    successors = {u: set() for u in range(n)}
+    for u, v in edges:
+        successors[u].add(v)
+    closure = {}
+    for start in range(n):
+        seen, stack = {start}, [start]
+        while stack:
+            for v in successors[stack.pop()] - seen:
+                seen.add(v)
+                stack.append(v)
+        closure[start] = seen
+    return closure
+
+
+def reference_levels(n, edges):
+    """Longest-path levels over the condensation, by brute force."""
+    closure = reachable(n, edges)
+    component = {u: frozenset(v for v in closure[u] if u in closure[v]) for u in range(n)}
+    predecessors = {c: set() for c in component.values()}
+    for u, v in edges:
+        if component[u] != component[v]:
+            predecessors[component[v]].add(component[u])
+
+    @lru_cache(maxsize=None)
+    def level(c):
+        return 1 + max(map(level, predecessors[c])) if predecessors[c] else 0
+    return {u: level(component[u]) for u in range(n)}, component
+
+
+def random_edges(seed, n):
+    rng = random.Random(seed)
+    # Mostly forward edges with a few back edges, so cycles of varying size appear
+    edges = {tuple(sorted(rng.sample(range(n), 2))) for _ in range(n * 2)}
+    edges |= {tuple(sorted(rng.sample(range(n), 2), reverse=True)) for _ in range(rng.randint(0, n // 4))}
+    edges |= {(u, u) for u in rng.sample(range(n), 2)}
+    return sorted(edges)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_levels_match_a_brute_force_condensation(seed):
+    n = 40
+    edges = random_edges(seed, n)
+    expected, component = reference_levels(n, edges)
+    assert levels_by_id(range(n), edges) == expected
+
+    src, dst = (np.array(side, dtype=np.int64) for side in zip(*edges))
+    representatives = strongly_connected_components(src, dst, n).tolist()
+    for u in range(n):
+        assert {v for v in range(n) if representatives[v] == representatives[u]} == component[u]
+
+
+def test_a_cycle_shares_one_level_and_still_layers_what_follows():
+    edges = [('a', 'b'), ('b', 'c'), ('c', 'b'), ('c', 'd'), ('e', 'e')]
+    assert levels_by_id('abcde', edges) == {'a': 0, 'b': 1, 'c': 1, 'd': 2, 'e': 0}
+    assert levels_by_id('ab', []) == {'a': 0, 'b': 0}
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from conftest import graph_rows, random_rows
+from lineage_graph import LineageGraph
+
+
+def assert_same_maps(graph, expected):
+    for attr in ('producers', 'consumers', 'inputs', 'outputs'):
+        assert getattr(graph, attr) == getattr(expected, attr)
+    assert graph.paths.keys() == expected.paths.keys()
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('direction', ['downstream', 'upstream'])
+@pytest.mark.parametrize('depth', [None, 1, 2, 4])
+def test_multi_closure_matches_one_closure_per_source(seed, direction, depth):
+    graph = LineageGraph.from_rows(random_rows(seed))
+    rng = random.Random(seed)
+    # Repeats included: a source listed twice sets both of its bits
+    sources = rng.choices(sorted(graph.paths), k=6)
+
+    expected = {}
+    for i, source in enumerate(sources):
+        for path, hops in graph.closure(source, direction, depth).items():
+            nearest, bits = expected.get(path, (hops, 0))
+            expected[path] = (min(nearest, hops), bits | (1 << i))
+
+    assert graph.multi_closure(sources, direction, depth) == expected
+
+
+def test_apply_on_a_copy_matches_a_rebuild_and_leaves_the_original_alone():
+    before, after = set(random_rows(1)), set(random_rows(2))
+    graph = LineageGraph.from_rows(sorted(before))
+    patched = graph.copy()
+    patched.apply(inserted=sorted(after - before), removed=sorted(before - after))
+
+    assert graph_rows(patched) == after
+    assert graph_rows(graph) == before
+    assert_same_maps(patched, LineageGraph.from_rows(sorted(after)))
+
+
+def test_lineage_answers_from_the_graph(client, load):
+    rows = random_rows(4)
+    load(rows)
+    body = client.get('/api/lineage').get_json()
+    names = {name for name, _, _ in rows}
+    assert {node['label'] for node in body['nodes']} == names
+    # One edge per producer -> consumer pair sharing a path
+    graph = LineageGraph.from_rows(rows)
+    expected = {(f'dataset_{producer}', f'dataset_{consumer}') for producer, consumer in graph.dataset_edges()}
+    assert {(edge['from'], edge['to']) for edge in body['edges']} == expected
+
+
+def test_from_rows_and_from_edges_build_the_same_graph():
+    rows = random_rows(0)
+    rows += rows[:5]  # repeated rows collapse, as they do in the edge table
+    ids = {}
+    for name, _, path in rows:
+        ids.setdefault(('dataset', name), len(ids))
+        ids.setdefault(('path', path), len(ids))
+    edges = {
+        (ids['path', path], ids['dataset', name]) if type_ == 'upstream'
+        else (ids['dataset', name], ids['path', path])
+        for name, type_, path in rows
+    }
+    nodes = {node_id: node for node, node_id in ids.items()}
+
+    from_rows = LineageGraph.from_rows(rows)
+    from_edges = LineageGraph.from_edges(nodes, edges)
+    assert graph_rows(from_rows) == graph_rows(from_edges) == set(rows)
+    assert_same_maps(from_rows, from_edges)
+    for path in from_rows.paths:
+        assert from_rows.first_producer(path) == from_edges.first_producer(path)
+
+
+def test_first_producer_does_not_depend_on_row_order():
+    rows = [('b', 'downstream', '/p/'), ('a', 'downstream', '/p/'), ('c', 'upstream', '/p/')]
+    assert LineageGraph.from_rows(rows).first_producer('/p/') == 'a'
+    assert LineageGraph.from_rows(reversed(rows)).first_producer('/p/') == 'a'
+    assert LineageGraph.from_rows(rows).first_producer('/q/') is None
+
+
+def test_impact_reports_each_reached_path_with_its_sources(client, load):
+    rows = random_rows(5)
+    load(rows)
+    graph = LineageGraph.from_rows(rows)
+    sources = sorted(graph.paths)[:4]
+    body = client.post('/api/lineage/impact', json={'paths': sources + sources[:1] + ['/nowhere/']}).get_json()
+
+    assert body['unknown'] == ['/nowhere/']
+    closures = {source: graph.closure(source, 'downstream') for source in sources}
+    assert [source['reached'] for source in body['sources']] == [len(closures[source]) for source in sources]
+    reached = {path['path']: (path['hops'], path['sources']) for path in body['paths']}
+    assert reached.keys() == set().union(*closures.values())
+    for path, (hops, reaching) in reached.items():
+        assert reaching == [source for source in sources if path in closures[source]]
+        assert hops == min(closures[source][path] for source in reaching)
+    assert client.post('/api/lineage/impact', json={'paths': []}).status_code == 400
+    assert client.post('/api/lineage/impact', json={'paths': sources, 'depth': -1}).status_code == 400
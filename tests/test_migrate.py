@@ -0,0 +1,28 @@
+import app as lineage_app
+from conftest import random_rows
+from migrate_db import migrate
+
+
+def snapshot_versions():
+    return lineage_app.db.session.execute(lineage_app.text('SELECT version FROM snapshot ORDER BY version')).scalars().all()
+
+
+def test_migrating_current_tables_changes_nothing(load):
+    version = load(random_rows(16))
+    snapshots = snapshot_versions()
+    migrate()
+    migrate()
+    assert lineage_app.current_data_version() == version
+    assert snapshot_versions() == snapshots
+
+
+def test_migrating_after_an_outside_write_refreshes_the_edges(load):
+    load(random_rows(17))
+    with lineage_app.db.engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO dataset (dataset_name, type, path) VALUES ('Shell', 'downstream', '/gold/shell/')")
+    migrate()
+    stale = lineage_app.db.session.execute(lineage_app.text('SELECT edges_stale FROM data_version')).scalar()
+    assert not stale
+    assert snapshot_versions()[-1] == lineage_app.current_data_version()
+    assert ('downstream', '/gold/shell/') in lineage_app.load_lineage_graph().rows_by_name['Shell']
@@ -0,0 +1,46 @@
+import json
+
+VALID = {'fields': [{'name': 'id', 'type': 'long'}]}
+PRETTY = {'fields': [{'name': 'name', 'type': 'string'}]}
+
+
+def load_schemas(load):
+    load([('/gold/valid/', json.dumps(VALID)),
+          ('/gold/broken/', '{"fields": ['),
+          ('/gold/pretty/', json.dumps(PRETTY, indent=2))], kind='schemas')
+
+
+def test_pages_cover_every_row_and_report_invalid_definitions(client, load):
+    load_schemas(load)
+    rows, after_id = [], 0
+    while after_id is not None:
+        response = client.get(f'/api/raw_data?table=schemas&limit=2&after_id={after_id}')
+        assert response.status_code == 200
+        body = response.get_json()
+        rows += body['schemas']
+        after_id = body['next_after_id']
+
+    by_path = {row['dataset_path']: row for row in rows}
+    assert by_path.keys() == {'/gold/valid/', '/gold/broken/', '/gold/pretty/'}
+    assert by_path['/gold/valid/']['schema_definition'] == VALID
+    assert by_path['/gold/pretty/']['schema_definition'] == PRETTY
+    assert by_path['/gold/broken/']['schema_definition'] is None
+    assert by_path['/gold/broken/']['error']
+    assert 'error' not in by_path['/gold/valid/']
+    # The full export reports the same rows
+    assert client.get('/api/raw_data').get_json()['schemas'] == rows
+
+
+def test_ndjson_holds_one_record_per_line(client, load):
+    load_schemas(load)
+    load([('Dataset0', 'upstream', '/gold/valid/')])
+    response = client.get('/api/raw_data?format=ndjson')
+    lines = response.get_data(as_text=True).splitlines()
+    records = [json.loads(line) for line in lines]
+
+    schemas = {record['dataset_path']: record for record in records if record['table'] == 'schemas'}
+    assert len(records) == 4 and len(schemas) == 3
+    assert schemas['/gold/valid/']['schema_definition'] == VALID
+    assert schemas['/gold/pretty/']['schema_definition'] == PRETTY
+    assert schemas['/gold/broken/']['schema_definition'] is None
+    assert schemas['/gold/broken/']['error']
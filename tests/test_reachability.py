@@ -0,0 +1,58 @@
+import pytest
+
+import app as lineage_app
+from conftest import random_rows
+from lineage_graph import LineageGraph
+from reachability import ReachabilityIndex, load_or_build
+
+
+def all_pairs(index):
+    n = len(index.paths)
+    sources = [source for source in range(n) for _ in range(n)]
+    targets = list(range(n)) * n
+    return sources, targets
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('datasets', [5, 30, 80])
+def test_two_hop_index_matches_breadth_first_search(seed, datasets):
+    graph = LineageGraph.from_rows(random_rows(seed, datasets=datasets))
+    index = load_or_build(graph)
+    sources, targets = all_pairs(index)
+
+    answers = index.reachable_many(sources, targets).tolist()
+    closures = [graph.closure(path, 'downstream') for path in index.paths]
+    expected = [index.paths[target] in closures[source] for source, target in zip(sources, targets)]
+    assert answers == expected
+
+
+def test_a_saved_index_is_reused_only_for_the_same_edges(tmp_path):
+    file_path = str(tmp_path / 'lineage.reach.npz')
+    graph = LineageGraph.from_rows(random_rows(0))
+    built = load_or_build(graph, file_path)
+    assert built.loaded_from is None
+
+    loaded = load_or_build(graph, file_path)
+    assert loaded.loaded_from == file_path
+    sources, targets = all_pairs(built)
+    assert (loaded.reachable_many(sources, targets) == built.reachable_many(sources, targets)).all()
+
+    changed = LineageGraph.from_rows(random_rows(1))
+    assert load_or_build(changed, file_path).loaded_from is None
+    assert ReachabilityIndex.load(file_path, 'not-a-fingerprint') is None
+
+
+def test_reachable_endpoints_agree_with_the_graph(client, load):
+    load(random_rows(3))
+    graph = lineage_app.get_lineage_graph()
+    paths = sorted(graph.paths)
+    pairs = [[source, target] for source in paths[:10] for target in paths]
+
+    body = client.post('/api/lineage/reachable/batch', json={'pairs': pairs + [['/nowhere/', paths[0]]]}).get_json()
+    expected = [target in graph.closure(source, 'downstream') for source, target in pairs]
+    assert [result['reachable'] for result in body['results']] == expected + [None]
+    assert body['unknown'] == ['/nowhere/']
+
+    source, target = pairs[0]
+    single = client.get('/api/lineage/reachable', query_string={'from': source, 'to': target}).get_json()
+    assert single['reachable'] == expected[0]
@@ -0,0 +1,151 @@
+import gzip
+
+from flask import Flask, jsonify
+import pytest
+
+import app as lineage_app
+from conftest import random_rows
+from response_cache import GZIP_MIN_SIZE, ResponseCache
+from wire_format import COMPACT_MIMETYPE
+
+
+def test_a_matching_etag_gets_a_bodiless_304(client, load):
+    load(random_rows(30))
+    response = client.get('/api/lineage')
+    assert response.status_code == 200
+    assert response.cache_control.no_cache
+    etag, _ = response.get_etag()
+
+    revalidated = client.get('/api/lineage', headers={'If-None-Match': f'"{etag}"'})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.get_etag() == (etag, False)
+
+
+def test_the_etag_follows_the_body_across_writes(client, load):
+    rows = random_rows(31)
+    load(rows)
+    etag, _ = client.get('/api/lineage').get_etag()
+
+    # Same rows again: a new data version, but the same body keeps the client's copy valid
+    load(rows)
+    assert client.get('/api/lineage', headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+
+    load(rows[1:])
+    response = client.get('/api/lineage', headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+
+def test_variants_get_their_own_etags(client, load):
+    load(random_rows(32, datasets=80))
+    plain = client.get('/api/lineage')
+    compact = client.get('/api/lineage', headers={'Accept': COMPACT_MIMETYPE})
+    gzipped = client.get('/api/lineage', headers={'Accept-Encoding': 'gzip'})
+
+    assert len(plain.data) >= GZIP_MIN_SIZE
+    assert gzipped.content_encoding == 'gzip'
+    assert gzip.decompress(gzipped.data) == plain.data
+    etags = {response.get_etag()[0] for response in (plain, compact, gzipped)}
+    assert len(etags) == 3
+    assert {'Accept', 'Accept-Encoding'} <= set(plain.vary)
+    assert client.get('/api/lineage', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag'],
+    }).status_code == 304
+
+
+def test_errors_are_not_cached(client, load):
+    load(random_rows(33))
+    assert client.get('/api/lineage', query_string={'layout': 'spiral'}).status_code == 400
+    assert 'ETag' not in client.get('/api/lineage', query_string={'layout': 'spiral'}).headers
+
+
+@pytest.fixture
+def cached_app():
+    """A bare app with one cached view, ``/<key>``, counting its calls and able to
+    bump the data version while it runs."""
+    app = Flask(__name__)
+    state = {'version': 1, 'calls': 0, 'bump': False, 'skip': False}
+    cache = ResponseCache(lambda: state['version'], max_entries=3, max_bytes=10_000)
+
+    @app.route('/<key>')
+    @cache.cached
+    def view(key):
+        state['calls'] += 1
+        if state['bump']:
+            state['version'] += 1
+        if state['skip']:
+            cache.skip()
+        return jsonify({'key': key, 'padding': 'x' * int(key)})
+
+    return app.test_client(), cache, state
+
+
+def test_the_cache_is_bounded_by_entries(cached_app):
+    client, cache, state = cached_app
+    for key in ('1', '2', '3', '4'):
+        client.get(f'/{key}')
+    assert len(cache) == 3
+    assert cache.stats()['evictions'] == 1
+
+    client.get('/2')  # now the most recently used
+    client.get('/5')
+    client.get('/2')
+    assert state['calls'] == 5
+    client.get('/3')  # evicted by /5
+    assert state['calls'] == 6
+
+
+def test_the_cache_is_bounded_by_bytes(cached_app):
+    client, cache, state = cached_app
+    client.get('/3000')
+    client.get('/3001')
+    assert cache.bytes <= cache.max_bytes
+    assert len(cache) == 1  # bodies this large count twice, for their gzipped copy
+    client.get('/20000')
+    assert len(cache) == 1 and state['calls'] == 3
+    client.get('/20000')
+    assert state['calls'] == 4  # too large to keep at all
+
+
+def test_a_body_is_not_kept_when_the_version_moves_during_the_view(cached_app):
+    client, cache, state = cached_app
+    state['bump'] = True
+    client.get('/1')
+    assert len(cache) == 0
+    state['bump'] = False
+    client.get('/1')
+    client.get('/1')
+    assert state['calls'] == 2 and len(cache) == 1
+
+
+def test_a_view_can_skip_the_cache(cached_app):
+    client, cache, state = cached_app
+    state['skip'] = True
+    response = client.get('/1')
+    assert response.status_code == 200 and 'ETag' not in response.headers
+    assert len(cache) == 0
+
+
+def test_bulk_writers_bump_the_version_once_and_keep_the_triggers(load):
+    rows = random_rows(35)
+    version = load(rows)
+    assert load(rows[1:], incremental=True) == version + 1
+    assert load(rows[1:], incremental=True) == version + 1  # nothing to change
+
+    triggers = lineage_app.db.session.execute(lineage_app.text(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars().all()
+    assert set(lineage_app.VERSION_TRIGGERS) <= set(triggers)
+    with lineage_app.db.engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM dataset WHERE dataset_name = 'Dataset0'")
+    assert lineage_app.current_data_version() > version + 1
+
+
+def test_column_misses_are_not_cached(client, load):
+    rows = random_rows(34)
+    load(rows)
+    load([(path, '{"id": "int64"}') for path in sorted({path for _, _, path in rows})], kind='schemas')
+    assert 'ETag' in client.get('/api/columns/id').headers
+    miss = client.get('/api/columns/no_such_column')
+    assert miss.get_json()['count'] == 0
+    assert 'ETag' not in miss.headers
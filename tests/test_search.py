@@ -0,0 +1,65 @@
+import json
+import random
+
+import pytest
+
+from conftest import random_rows
+from lineage_graph import LineageGraph
+from search_index import SEARCH_KINDS, SearchIndex
+
+
+class Schemas:
+    def __init__(self, entries):
+        self.entries = entries
+
+
+def brute_force(index, query, kinds=SEARCH_KINDS):
+    query = query.strip().lower()
+    return sorted(name for kind, name, lowered, _, _ in index.documents if kind in kinds and query in lowered)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_the_index_finds_what_a_scan_finds(seed):
+    index = SearchIndex.build(LineageGraph.from_rows(random_rows(seed)), Schemas({}))
+    rng = random.Random(seed)
+    names = [name for _, name, _, _, _ in index.documents]
+    # Substrings of real names (long and short), near misses and non-ASCII text
+    queries = [name[start:start + length] for name in rng.sample(names, 20)
+               for start, length in [(rng.randrange(len(name)), rng.randint(1, 8))]]
+    queries += ['', 'ds', 'DATASET1', 'gold/path1', '/silver/', 'zzz', 'pathé', '  path2  ']
+    for query in queries:
+        results, total = index.search(query, limit=len(index))
+        assert sorted(result['name'] for result in results) == brute_force(index, query)
+        assert total == len(results)
+
+
+def test_results_are_ranked_and_limited():
+    graph = LineageGraph.from_rows([
+        ('orders', 'downstream', '/gold/orders/'),
+        ('orders_daily', 'downstream', '/gold/orders_daily/'),
+        ('raw_orders', 'upstream', '/bronze/raw_orders/'),
+        ('backorders', 'downstream', '/silver/backorders/'),
+    ])
+    index = SearchIndex.build(graph, Schemas({}))
+    results, total = index.search('Orders', limit=4, kinds=('dataset',))
+    assert [(result['name'], result['rank']) for result in results] == [
+        ('orders', 0), ('orders_daily', 1), ('raw_orders', 2), ('backorders', 3)]
+    results, total = index.search('orders', limit=2)
+    assert len(results) == 2 and total == 8
+
+
+def test_search_endpoint_covers_schema_fields(client, load):
+    load([('Orders', 'downstream', '/gold/orders/'), ('Customers', 'downstream', '/gold/customers/')])
+    load([('/gold/orders/', json.dumps({'customer_id': 'long'})),
+          ('/gold/customers/', json.dumps({'customer_id': 'long'}))],
+         kind='schemas')
+
+    body = client.get('/api/search?q=customer_id&kind=field').get_json()
+    assert body['results'] == [{'kind': 'field', 'name': 'customer_id', 'path': '/gold/orders/',
+                                'rank': 0, 'paths': 2}]
+    body = client.get('/api/search?q=cust&limit=5').get_json()
+    assert {(result['kind'], result['name']) for result in body['results']} == {
+        ('dataset', 'Customers'), ('path', '/gold/customers/'), ('field', 'customer_id')}
+    assert client.get('/api/search?q=').status_code == 400
+    assert client.get('/api/search?q=a&kind=table').status_code == 400
+    assert client.get('/api/search?q=a&limit=0').status_code == 400
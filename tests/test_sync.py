@@ -0,0 +1,101 @@
+import pytest
+
+import app as lineage_app
+from conftest import graph_rows, mutate, random_rows
+from lineage_graph import LineageGraph
+
+
+def assert_same_graph(graph, expected):
+    assert graph_rows(graph) == graph_rows(expected)
+    for attr in ('producers', 'consumers', 'inputs', 'outputs'):
+        assert getattr(graph, attr) == getattr(expected, attr)
+    assert graph.paths.keys() == expected.paths.keys()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_replayed_change_sets_match_a_full_rebuild(load, monkeypatch, seed):
+    rows = random_rows(seed)
+    load(rows)
+    graph = lineage_app.get_lineage_graph()
+    # Warm the subgraph cache so the sync has entries to carry over or evict
+    graph, cache = lineage_app.get_subgraph_cache()
+    for path in graph.paths:
+        for direction in ('upstream', 'downstream'):
+            lineage_app.cached_closure(graph, cache, path, direction)
+
+    for step in range(3):
+        rows = mutate(rows, seed * 10 + step)
+        load(rows, incremental=True)
+
+    rebuilt = lineage_app.load_lineage_graph()
+    # The graph and the cache must now be brought forward from the change sets alone
+    monkeypatch.setattr(lineage_app, 'load_lineage_graph', lambda: pytest.fail('graph was rebuilt'))
+    patched, cache = lineage_app.get_subgraph_cache()
+
+    assert patched.version == rebuilt.version == lineage_app.current_data_version()
+    assert_same_graph(patched, rebuilt)
+    assert_same_graph(patched, LineageGraph.from_rows(rows))
+    for path in patched.paths:
+        for direction in ('upstream', 'downstream'):
+            assert lineage_app.cached_closure(patched, cache, path, direction) == patched.closure(path, direction)
+
+
+def test_the_edge_tables_match_the_dataset_rows(load):
+    rows = random_rows(6)
+    load(rows)
+    assert_same_graph(lineage_app.load_lineage_graph(), LineageGraph.from_rows(rows))
+
+
+def test_a_sync_evicts_only_the_closures_it_touches(load):
+    rows = [('A', 'upstream', '/bronze/a/'), ('A', 'downstream', '/silver/a/'),
+            ('B', 'upstream', '/bronze/b/'), ('B', 'downstream', '/silver/b/')]
+    load(rows)
+    graph, cache = lineage_app.get_subgraph_cache()
+    for path in ('/silver/a/', '/silver/b/'):
+        lineage_app.cached_closure(graph, cache, path, 'upstream')
+
+    load(rows + [('B', 'upstream', '/bronze/b2/')], incremental=True)
+    graph, cache = lineage_app.get_subgraph_cache()
+    assert cache.get(('closure', '/silver/a/', 'upstream', None), graph.version) == {'/bronze/a/': 1}
+    assert cache.get(('closure', '/silver/b/', 'upstream', None), graph.version) is None
+    assert lineage_app.cached_closure(graph, cache, '/silver/b/', 'upstream') == {'/bronze/b/': 1, '/bronze/b2/': 1}
+
+
+@pytest.mark.parametrize('read_only', [False, True])
+def test_a_write_outside_the_writers_forces_a_rebuild_from_the_dataset_rows(load, monkeypatch, read_only):
+    load(random_rows(7))
+    lineage_app.get_lineage_graph()
+    with lineage_app.db.engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO dataset (dataset_name, type, path) VALUES ('Shell', 'downstream', '/gold/shell/')")
+
+    # A serve.py worker cannot refresh node/edge and reads the dataset rows instead
+    monkeypatch.setitem(lineage_app.app.config, 'LINEAGE_READ_ONLY', read_only)
+    rebuilt = lineage_app.get_lineage_graph()
+    stale = lineage_app.db.session.execute(lineage_app.text('SELECT edges_stale FROM data_version')).scalar()
+    assert stale == read_only
+    assert_same_graph(rebuilt, LineageGraph.from_rows(random_rows(7) + [('Shell', 'downstream', '/gold/shell/')]))
+
+
+def test_a_sync_without_changes_keeps_the_version(load):
+    rows = random_rows(8)
+    version = load(rows)
+    assert load(rows, incremental=True) == version
+
+
+def test_an_older_graph_does_not_roll_the_cache_back(load, monkeypatch):
+    load(random_rows(9))
+    old_graph = lineage_app.get_lineage_graph()
+    load(mutate(random_rows(9), 9), incremental=True)
+    graph, cache = lineage_app.get_subgraph_cache()
+    path = next(iter(graph.paths))
+    hops = lineage_app.cached_closure(graph, cache, path, 'upstream')
+
+    # A request that read the graph before the sync reaches the cache after it
+    monkeypatch.setattr(lineage_app, 'get_lineage_graph', lambda: old_graph)
+    stale_graph, stale_cache = lineage_app.get_subgraph_cache()
+    assert stale_graph is old_graph and stale_cache.version == graph.version
+    for old_path in old_graph.paths:
+        assert lineage_app.cached_closure(old_graph, stale_cache, old_path, 'upstream') == \
+            old_graph.closure(old_path, 'upstream')
+    assert cache.get(('closure', path, 'upstream', None), graph.version) == hops
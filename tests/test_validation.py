@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import app as lineage_app
+from schema_validation import EMPTY, INVALID, NORMALIZED, OK, validate_definition
+from validate_schemas import validate_schemas
+
+STRUCT = {'type': 'struct', 'fields': [{'name': 'id', 'type': 'long', 'nullable': True, 'metadata': {}}]}
+DEFINITIONS = {
+    OK: json.dumps({'id': 'long', 'name': 'string'}),
+    NORMALIZED: json.dumps({'metaData': {'schemaString': json.dumps(STRUCT)}, 'protocol': {}}),
+    EMPTY: json.dumps({'add': {}, 'remove': {}}),
+    INVALID: '{"id": ',
+}
+
+
+@pytest.mark.parametrize('status', DEFINITIONS)
+def test_each_definition_gets_its_status(status):
+    assert validate_definition(DEFINITIONS[status])[0] == status
+    assert validate_definition('[1, 2]')[0] == INVALID
+
+
+def mixed_schemas(count):
+    statuses = list(DEFINITIONS)
+    return [(f'/gold/table{i}/', DEFINITIONS[statuses[i % len(statuses)]]) for i in range(count)]
+
+
+def test_a_pool_of_workers_reports_what_one_process_does(load):
+    load(mixed_schemas(41), kind='schemas')
+    serial = validate_schemas(workers=1, chunk_size=5, dry_run=True)
+    parallel = validate_schemas(workers=3, chunk_size=5, dry_run=True)
+    assert serial.counts == parallel.counts == {OK: 11, NORMALIZED: 10, EMPTY: 10, INVALID: 10}
+    assert serial.errors == parallel.errors
+    assert (serial.rewritten, serial.fingerprinted) == (parallel.rewritten, parallel.fingerprinted) == (10, 31)
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_validation_rewrites_delta_schemas_and_stores_fingerprints(load, workers):
+    version = load(mixed_schemas(12), kind='schemas')
+    report = validate_schemas(workers=workers, chunk_size=5)
+    assert (report.rewritten, report.fingerprinted) == (3, 9)
+    assert lineage_app.current_data_version() > version
+
+    store = lineage_app.get_schema_store()
+    assert store.get('/gold/table1/').schema == {'id': 'long'}
+    assert store.get('/gold/table1/').fingerprint == store.get('/gold/table5/').fingerprint
+    # Everything is as it should be now, so a second run changes nothing
+    version = lineage_app.current_data_version()
+    report = validate_schemas(workers=workers, chunk_size=5)
+    assert (report.rewritten, report.fingerprinted) == (0, 0)
+    assert report.counts[OK] == 6
+    assert lineage_app.current_data_version() == version
@@ -0,0 +1,147 @@
+"""Re-validate every stored schema, normalizing Delta-log ones in place.
+
+    python validate_schemas.py --dry-run
+    python validate_schemas.py --workers 8 --delete-empty
+
+Definitions are parsed and classified on a pool of worker processes, each
+reading its own id ranges of the table (see ``schema_validation.py``).
+Schemas whose columns were only recoverable from ``metaData.schemaString``
+are rewritten with one executemany in a single transaction, missing or
+stale fingerprints are stored along with them, and the writes are recorded
+as a change set so running apps re-read just those paths. ``--delete-empty``
+then hands the schemas left empty to ``cleanup.py``.
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from app import bulk_write, db, record_snapshot
+from cleanup import cleanup
+from ingest import MAX_REPORTED_ERRORS, empty_change_set, record_change_set, tune_connection
+from schema_validation import (
+    DEFAULT_CHUNK_SIZE, EMPTY, INVALID, NORMALIZED, OK, STATUSES,
+    chunked, validate_chunks, validate_ranges, worker_count,
+)
+
+class ValidationReport:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.counts = dict.fromkeys(STATUSES, 0)
+        self.errors = []
+        self.rewritten = 0
+        self.fingerprinted = 0
+        self.seconds = 0.0
+        self.cleanup = None
+
+    def add(self, path, status, error=None):
+        self.counts[status] += 1
+        if error is not None and len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'{path}: {error}')
+
+    def __str__(self):
+        total = sum(self.counts.values())
+        rate = total / self.seconds if self.seconds else 0
+        rewrite, store = ('would rewrite', 'would store') if self.dry_run else ('rewrote', 'stored')
+        lines = [
+            f'Validated {total} schemas in {self.seconds:.2f}s ({rate:,.0f} schemas/s): '
+            + ', '.join(f'{count} {status}' for status, count in self.counts.items())
+            + f'; {rewrite} {self.rewritten}, {store} {self.fingerprinted} fingerprints'
+        ]
+        lines += [f'  - {error}' for error in self.errors]
+        if self.counts[INVALID] > len(self.errors):
+            lines.append(f'  ... and {self.counts[INVALID] - len(self.errors)} more invalid')
+        if self.cleanup is not None:
+            lines.append(str(self.cleanup))
+        return '\n'.join(lines)
+
+def id_boundaries(connection, chunk_size):
+    """Every ``chunk_size``-th schema id, then one past the last: the ranges the workers read."""
+    ids = [id for id, in connection.exec_driver_sql('SELECT id FROM schema_info ORDER BY id')]
+    return ids[::chunk_size] + [ids[-1] + 1] if ids else []
+
+def has_fingerprints(connection):
+    return 'fingerprint' in {row[1] for row in connection.exec_driver_sql('PRAGMA table_info(schema_info)')}
+
+def classify(connection, report, workers, chunk_size):
+    """Validate every schema row.
+
+    Returns ``(path, definition)`` for the schemas to rewrite and ``(path,
+    fingerprint)`` for those whose stored fingerprint is missing or stale.
+    """
+    database = db.engine.url.database
+    # A dry run on a database from before the column leaves it as it is
+    fingerprints = has_fingerprints(connection)
+    if worker_count(workers) > 1 and database and database != ':memory:':
+        batches = validate_ranges(database, id_boundaries(connection, chunk_size), workers, fingerprints)
+    else:
+        rows = connection.exec_driver_sql(
+            f'SELECT dataset_path, schema_definition, {"fingerprint" if fingerprints else "NULL"} '
+            'FROM schema_info ORDER BY id')
+        batches = (
+            (len(chunk), [(chunk[position][0], *outcome) for position, *outcome in results])
+            for chunk, results in validate_chunks(chunked(rows, chunk_size), workers)
+        )
+    rewrites = []
+    fingerprint_updates = []
+    for count, results in batches:
+        for path, status, rewritten, fingerprint, error in results:
+            report.add(path, status, error)
+            if status == NORMALIZED:
+                rewrites.append((path, rewritten))
+            if fingerprint is not None:
+                fingerprint_updates.append((path, fingerprint))
+        report.counts[OK] += count - len(results)
+    return rewrites, fingerprint_updates
+
+def validate_schemas(workers=None, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, delete_empty=False):
+    """Classify every schema and rewrite the normalizable ones; with ``dry_run`` nothing is written."""
+    report = ValidationReport(dry_run)
+    start = time.perf_counter()
+    with db.engine.connect() as connection:
+        if dry_run:
+            rewrites, fingerprint_updates = classify(connection, report, workers, chunk_size)
+        else:
+            tune_connection(connection)
+            with connection.begin():
+                db.metadata.create_all(connection)
+                # Hold the write lock from the read on, so no row changes between validation and rewrite
+                connection.exec_driver_sql('UPDATE data_version SET version = version WHERE id = 1')
+                from_version = connection.execute(text('SELECT version FROM data_version WHERE id = 1')).scalar()
+                rewrites, fingerprint_updates = classify(connection, report, workers, chunk_size)
+                with bulk_write(connection):
+                    if rewrites:
+                        connection.exec_driver_sql(
+                            'UPDATE schema_info SET schema_definition = ? WHERE dataset_path = ?',
+                            [(definition, path) for path, definition in rewrites])
+                    # After the rewrites, whose trigger clears the fingerprints of the rows they touch
+                    if fingerprint_updates:
+                        connection.exec_driver_sql(
+                            'UPDATE schema_info SET fingerprint = ? WHERE dataset_path = ?',
+                            [(fingerprint, path) for path, fingerprint in fingerprint_updates])
+                if rewrites or fingerprint_updates:
+                    changes = empty_change_set()
+                    changes['schemas']['updated'] = sorted(
+                        {path for path, _ in rewrites} | {path for path, _ in fingerprint_updates})
+                    record_change_set(connection, from_version, changes)
+                    record_snapshot(connection, from_version, changes)
+    report.rewritten = len(rewrites)
+    report.fingerprinted = len(fingerprint_updates)
+    report.seconds = time.perf_counter() - start
+    # A dry run has not rewritten anything, so cleanup would still see normalizable schemas as empty
+    if delete_empty and report.counts[EMPTY] and not dry_run:
+        report.cleanup = cleanup(empty_schemas=True)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-validate stored schemas, normalizing Delta-log ones')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per core)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='schemas per task')
+    parser.add_argument('--delete-empty', action='store_true',
+                        help='afterwards delete schemas left empty, as cleanup.py --empty-schemas does')
+    parser.add_argument('--dry-run', action='store_true', help='report what would change without writing')
+    args = parser.parse_args()
+    print(validate_schemas(args.workers, args.chunk_size, args.dry_run, args.delete_empty))
+
+if __name__ == '__main__':
+    main()